@@ -4,8 +4,9 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
 # --- IMPORTS FROM PACKAGE ---
-from src.realestateCH.load import load_rent_data, load_buy_data
-from src.realestateCH.metrics import compute_price_to_rent_ratio, rank_cantons_visual
+from src.realestateCH.load import load_shared_data
+from src.realestateCH.cube import ListingCube, price_to_rent_ratio_from_cubes
+from src.realestateCH.quantiles import median_by_canton
 
 # --- PAGE CONFIGURATION ---
 st.set_page_config(page_title="Swiss Real Estate Dashboard", layout="wide")
@@ -13,18 +14,13 @@ st.set_page_config(page_title="Swiss Real Estate Dashboard", layout="wide")
 # ==========================================
 # 1. LOAD DATA
 # ==========================================
-@st.cache_data
+# Memory-mapped, read-only listings: every session and worker process
+# shares the same pages. cache_resource hands out the frames as they are,
+# where cache_data would copy them on every hit.
+@st.cache_resource
 def get_data():
     try:
-        df_rent = load_rent_data()
-        df_buy = load_buy_data()
-        
-        # Standardize ZIP column names
-        for d in [df_rent, df_buy]:
-            if 'postal_code' in d.columns: d.rename(columns={'postal_code': 'zip_code'}, inplace=True)
-            if 'zip' in d.columns: d.rename(columns={'zip': 'zip_code'}, inplace=True)
-            
-        return df_rent, df_buy
+        return load_shared_data("rent"), load_shared_data("buy")
     except Exception as e:
         st.error(f"Error loading data: {e}")
         return pd.DataFrame(), pd.DataFrame()
@@ -32,6 +28,14 @@ def get_data():
 df_rent, df_buy = get_data()
 if df_rent.empty: st.stop()
 
+# Pre-aggregated cubes: widget changes are answered from these,
+# without filtering the listings again
+@st.cache_resource
+def get_cubes():
+    return ListingCube.from_listings(df_rent, engine="numpy"), ListingCube.from_listings(df_buy, engine="numpy")
+
+rent_cube, buy_cube = get_cubes()
+
 # ==========================================
 # 3. SIDEBAR CONTROLS
 # ==========================================
@@ -39,11 +43,11 @@ st.sidebar.header("Filter Options")
 
 # Market Choice
 market_choice = st.sidebar.radio("Choose Market:", ["Rent", "Buy"])
-df = df_rent if market_choice == "Rent" else df_buy
+cube = rent_cube if market_choice == "Rent" else buy_cube
 price_label = "Monthly Rent (CHF)" if market_choice == "Rent" else "Purchase Price (CHF)"
 
 # Filters
-all_cantons = sorted(df['canton'].astype(str).unique())
+all_cantons = cube.cantons
 selected_cantons = st.sidebar.multiselect("Select Cantons:", all_cantons, default=all_cantons[:3])
 
 st.sidebar.subheader("Rooms")
@@ -60,23 +64,17 @@ max_price = c4.number_input("Max Price", 0, 10000000, 10000, 100)
 # 3. DASHBOARD MAIN VIEW
 # ==========================================
 # Apply Filters
-filtered_df = df.copy()
-if selected_cantons: 
-    filtered_df = filtered_df[filtered_df['canton'].isin(selected_cantons)]
-filtered_df = filtered_df[
-    (filtered_df['rooms'] >= min_rooms) & 
-    (filtered_df['rooms'] <= max_rooms) &
-    (filtered_df['price_chf'] >= min_price) & 
-    (filtered_df['price_chf'] <= max_price)
-]
+rooms_range = (min_rooms, max_rooms)
+price_range = (min_price, max_price)
+filtered = cube.summary(selected_cantons, rooms_range, price_range)
 
 st.title(f"🇨🇭 Swiss Real Estate: {market_choice} Market")
 
 # KPIS
 c1, c2, c3 = st.columns(3)
-c1.metric("Total Listings", f"{len(filtered_df):,}")
-c2.metric("Avg Price", f"CHF {filtered_df['price_chf'].mean():,.0f}" if not filtered_df.empty else "0")
-c3.metric("Avg Area", f"{filtered_df['area_m2'].mean():,.0f} m²" if not filtered_df.empty and 'area_m2' in filtered_df.columns else "0")
+c1.metric("Total Listings", f"{filtered['listings']:,}")
+c2.metric("Avg Price", f"CHF {filtered['avg_price']:,.0f}" if filtered['listings'] else "0")
+c3.metric("Avg Area", f"{filtered['avg_area']:,.0f} m²" if filtered['listings'] else "0")
 
 st.divider()
 
@@ -84,25 +82,23 @@ st.divider()
 # 4. RANKING SECTION (Using Package)
 # ==========================================
 if market_choice == "Rent":
-    # We pass the filtered dataframe so the ranking respects the sidebar
-    rank_source = filtered_df
+    # The ranking uses the same filters as the sidebar
     metric_label = "Avg Rent/m²"
     rank_title = "🏆 Top Cantons by Rent: Price per m² (Filtered)"
     rank_info = "Most expensive cantons based on your filters."
 else:
-    rank_source = filtered_df
     metric_label = "Avg Buy Price/m²"
     rank_title = "🏆 Top Cantons by Buy: Price per m² (Filtered)"
     rank_info = "Most expensive cantons based on your filters."
 
 st.subheader(rank_title)
 
-if not rank_source.empty:
+if filtered['listings']:
     col_rank_table, col_rank_desc = st.columns([1, 2])
     
     with col_rank_table:
         # CALLING PACKAGE FUNCTION HERE
-        ranking_display = rank_cantons_visual(rank_source, metric_name=metric_label)
+        ranking_display = cube.rank_cantons_visual(metric_label, selected_cantons, rooms_range, price_range)
         
         st.dataframe(
             ranking_display,
@@ -114,20 +110,17 @@ if not rank_source.empty:
     
     with col_rank_desc:
         st.info(rank_info)
-        # Chart Logic
-        if 'area_m2' in rank_source.columns:
-            chart_df = rank_source.copy()
-            chart_df['metric'] = chart_df['price_chf'] / chart_df['area_m2']
-            chart_rank = chart_df.groupby('canton')['metric'].mean().reset_index().sort_values('metric', ascending=False).head(10)
-            
-            fig_top = go.Figure(go.Bar(
-                x=chart_rank['canton'], 
-                y=chart_rank['metric'],
-                marker_color='gold',
-                name=market_choice
-            ))
-            fig_top.update_layout(title=f"Visual Representation ({market_choice}/m²)", height=300, margin=dict(l=0, r=0, t=30, b=0))
-            st.plotly_chart(fig_top, use_container_width=True)
+        # Chart Logic (top 10 of the ranking above)
+        chart_rank = ranking_display.head(10)
+        
+        fig_top = go.Figure(go.Bar(
+            x=chart_rank['Canton'], 
+            y=chart_rank[metric_label],
+            marker_color='gold',
+            name=market_choice
+        ))
+        fig_top.update_layout(title=f"Visual Representation ({market_choice}/m²)", height=300, margin=dict(l=0, r=0, t=30, b=0))
+        st.plotly_chart(fig_top, use_container_width=True)
 else:
     st.warning("No listings match your current filters.")
 
@@ -139,21 +132,12 @@ st.divider()
 st.subheader("📊 Market Comparison: Rent vs. Buy")
 
 # Filter logic for comparison (Strict on Rooms/Canton, Loose on Price)
-m_rent = (df_rent['rooms'] >= min_rooms) & (df_rent['rooms'] <= max_rooms)
-m_buy = (df_buy['rooms'] >= min_rooms) & (df_buy['rooms'] <= max_rooms)
-
-if selected_cantons:
-    m_rent &= df_rent['canton'].isin(selected_cantons)
-    m_buy &= df_buy['canton'].isin(selected_cantons)
-
 # Apply Price filter ONLY to the active market to keep comparison valid
-if market_choice == "Rent":
-    m_rent &= (df_rent['price_chf'] >= min_price) & (df_rent['price_chf'] <= max_price)
-elif market_choice == "Buy":
-    m_buy &= (df_buy['price_chf'] >= min_price) & (df_buy['price_chf'] <= max_price)
+rent_price_range = price_range if market_choice == "Rent" else (None, None)
+buy_price_range = price_range if market_choice == "Buy" else (None, None)
 
-r_stats = df_rent[m_rent].groupby('canton')['price_chf'].mean().reset_index(name='Avg Rent')
-b_stats = df_buy[m_buy].groupby('canton')['price_chf'].mean().reset_index(name='Avg Buy')
+r_stats = rent_cube.mean_price('canton', selected_cantons, rooms_range, rent_price_range).rename(columns={'price_chf': 'Avg Rent'})
+b_stats = buy_cube.mean_price('canton', selected_cantons, rooms_range, buy_price_range).rename(columns={'price_chf': 'Avg Buy'})
 merged = pd.merge(r_stats, b_stats, on='canton', how='outer')
 
 if not merged.empty:
@@ -175,14 +159,13 @@ st.divider()
 st.subheader("📈 Investment Analysis: Price-to-Rent Ratio")
 
 if 'zip_code' in df_rent.columns:
-    r_agg = df_rent[m_rent].groupby(['zip_code', 'canton'])['price_chf'].mean().reset_index()
-    b_agg = df_buy[m_buy].groupby(['zip_code', 'canton'])['price_chf'].mean().reset_index()
-    
-    # CALLING PACKAGE FUNCTION HERE
-    ratio_df = compute_price_to_rent_ratio(b_agg, r_agg)
+    # CALLING PACKAGE FUNCTION HERE (mean prices per zip code from the cubes)
+    ratio_df = price_to_rent_ratio_from_cubes(
+        buy_cube, rent_cube, selected_cantons, rooms_range, buy_price_range, rent_price_range
+    )
     
     if not ratio_df.empty:
-        rank_df = ratio_df.groupby('canton')['price_to_rent_ratio'].median().reset_index().sort_values('price_to_rent_ratio', ascending=False)
+        rank_df = median_by_canton(ratio_df, 'price_to_rent_ratio').rename(columns={'p50': 'price_to_rent_ratio'}).sort_values('price_to_rent_ratio', ascending=False)
         
         c_left, c_right = st.columns([1, 2])
         with c_left:
@@ -0,0 +1,106 @@
+"""
+Import time of the package, from ``python -X importtime``.
+
+Each statement runs in fresh interpreters (``--repeat`` times, the best
+run is kept). The report gives the total import time, the wall time of
+the interpreter, whether matplotlib was imported, and the modules with
+the largest self time.
+
+Usage:
+    python benchmarks/bench_import.py [--repeat 5] [--save imports.json] [--compare imports.json]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+# Statement -> what it stands for
+STATEMENTS = {
+    "import realestateCH": "bare package import",
+    "from realestateCH import clean_data": "batch worker: cleaning",
+    "from realestateCH import compute_rent_per_m2, rank_cantons_by_rent": "batch worker: metrics",
+    "from realestateCH import load_rent_data": "batch worker: loading",
+    "from realestateCH import plot_average_rent_per_canton": "plotting",
+}
+
+N_TOP = 5
+
+
+def parse_importtime(stderr: str) -> list:
+    """(module, self µs, cumulative µs, depth) for each line of -X importtime output."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return entries
+
+
+def measure(statement: str) -> dict:
+    check = "; import sys; print('matplotlib' in sys.modules)"
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", statement + check],
+                         check=True, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    entries = parse_importtime(out.stderr)
+    # The imports of the statement are the top-level entries logged after
+    # the interpreter's own start-up imports (encodings, site, ...)
+    startup = {"encodings", "site", "_frozen_importlib_external", "zipimport", "codecs", "io", "abc",
+               "_signal", "_abc", "time", "_io", "marshal", "posix", "winreg", "_codecs"}
+    top = [e for e in entries if e[3] == 0 and e[0] not in startup]
+    return {
+        "import_seconds": sum(e[2] for e in top) / 1e6,
+        "wall_seconds": wall,
+        "matplotlib": out.stdout.strip() == "True",
+        "modules": len(entries),
+        "top": [{"module": e[0], "self_seconds": e[1] / 1e6}
+                for e in sorted(entries, key=lambda e: e[1], reverse=True)[:N_TOP]],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5, help="runs per statement (the best one is kept)")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="results JSON file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs the baseline")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'statement':<70}{'import s':>10}{'wall s':>10}{'modules':>9}  matplotlib")
+    for statement in STATEMENTS:
+        runs = [measure(statement) for _ in range(args.repeat)]
+        best = min(runs, key=lambda r: r["import_seconds"])
+        best["wall_seconds"] = min(r["wall_seconds"] for r in runs)
+        results.append({"statement": statement, **best})
+        print(f"{statement:<70}{best['import_seconds']:>10.3f}{best['wall_seconds']:>10.3f}"
+              f"{best['modules']:>9}  {'yes' if best['matplotlib'] else 'no'}")
+        print("    slowest: " + ", ".join(f"{t['module']} {t['self_seconds'] * 1000:.0f}ms" for t in best["top"]))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"python": sys.version.split()[0], "results": results}, f, indent=1)
+            f.write("\n")
+
+    if args.compare:
+        with open(args.compare) as f:
+            reference = {r["statement"]: r for r in json.load(f)["results"]}
+        regressions = [
+            r for r in results
+            if r["statement"] in reference
+            and r["import_seconds"] > max(reference[r["statement"]]["import_seconds"], 0.005) * (1 + args.tolerance)
+        ]
+        for r in regressions:
+            print(f"REGRESSION {r['statement']!r}: {r['import_seconds']:.3f}s vs "
+                  f"{reference[r['statement']]['import_seconds']:.3f}s")
+        if regressions:
+            sys.exit(1)
+        print(f"No regression beyond {args.tolerance:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Peak memory of the per-m² metric functions: full copy vs copy-free variants.
+
+The listings are generated once and saved to a Feather file. Each variant
+then runs in its own Python process that reads the file back, resets the
+kernel's peak-RSS counter (Linux only, through /proc/self/clear_refs) and
+reports how much the peak resident set size grew during the call, on top
+of the input frame.
+
+Usage:
+    python benchmarks/bench_metrics_memory.py [--rows 1000000]
+"""
+
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from realestateCH.metrics import (
+    compute_rent_per_m2,
+    price_per_m2,
+    rank_cantons_visual,
+)
+
+VARIANTS = {
+    # What the metrics did before: deep copy, then add the column
+    "deep_copy": lambda df: _deep_copy_rent_per_m2(df),
+    "compute_rent_per_m2": lambda df: compute_rent_per_m2(df),
+    "compute_rent_per_m2_inplace": lambda df: compute_rent_per_m2(df, inplace=True),
+    "price_per_m2_series": lambda df: price_per_m2(df),
+    "rank_cantons_visual": lambda df: rank_cantons_visual(df),
+}
+
+
+def _deep_copy_rent_per_m2(df):
+    df = df.copy()
+    df["rent_per_m2"] = df["price_chf"] / df["area_m2"]
+    return df
+
+
+def make_listings(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    ids = rng.integers(4_000_000_000, 4_100_000_000, rows)
+    return pd.DataFrame({
+        "zip": rng.integers(1000, 9999, rows).astype("uint16"),
+        "url": "https://www.homegate.ch/louer/" + pd.Series(ids).astype(str),
+        "price_chf": rng.normal(2500, 800, rows).clip(500),
+        "rooms": rng.choice(np.arange(1, 8, 0.5), rows).astype("float32"),
+        "area_m2": rng.normal(80, 30, rows).clip(15).astype("float32"),
+        "canton": pd.Categorical(rng.choice(["BE", "GE", "SG", "TI", "VD", "ZH"], rows)),
+    })
+
+
+def _status_mib(field: str) -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError(f"{field} not found in /proc/self/status")
+
+
+def run_variant(name: str, path: str) -> dict:
+    df = pd.read_feather(path)
+
+    # Give back the memory used while reading, then restart the peak from here
+    gc.collect()
+    pa.default_memory_pool().release_unused()
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+    before = _status_mib("VmRSS")
+
+    result = VARIANTS[name](df)
+    peak = _status_mib("VmHWM")
+    del result
+    return {"variant": name, "peak_rss_mib": peak, "peak_increase_mib": peak - before}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--variant", choices=sorted(VARIANTS), help=argparse.SUPPRESS)
+    parser.add_argument("--data", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        print(json.dumps(run_variant(args.variant, args.data)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "listings.feather")
+        make_listings(args.rows).to_feather(path)
+
+        print(f"pandas {pd.__version__}, {args.rows:,} listings")
+        print(f"{'variant':<30}{'peak RSS (MiB)':>16}{'increase (MiB)':>16}")
+        for name in VARIANTS:
+            out = subprocess.run(
+                [sys.executable, __file__, "--variant", name, "--data", path],
+                check=True, capture_output=True, text=True,
+            )
+            res = json.loads(out.stdout)
+            print(f"{name:<30}{res['peak_rss_mib']:>16.1f}{res['peak_increase_mib']:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+Time and peak memory of the package functions at 10k, 1M and 10M listings.
+
+Synthetic rent and buy listings (see ``synthetic.py``) are generated once
+per size and saved as CSV (for ``load_data``) and Feather. Each case then
+runs in its own Python process that reads the Feather files, runs the
+case's setup, resets the kernel's peak-RSS counter (Linux only, through
+/proc/self/clear_refs) and reports the best time over ``--repeat`` calls
+and how much the peak resident set size grew during the first one.
+
+Cases cover ``load_data``, ``clean_data``, every function of
+``realestateCH.metrics`` and the dashboard paths of ``app.py`` (cube
+build, the per-rerun cube queries, and filtering + ranking the listings
+as ``batch.run_spec`` does, with masks or with a ``ListingIndex``). Functions with an ``engine`` option are run
+with both engines; the ``*_numpy`` cases use the integer-coded kernels of
+``realestateCH.kernels``. The ``memo_*_hit`` cases time a call answered
+by a ``memo.MetricCache`` (fingerprinting the inputs, then a lookup).
+
+Usage:
+    python benchmarks/bench_scale.py [--sizes 10k 1M 10M] [--save baseline.json]
+    python benchmarks/bench_scale.py --sizes 10k 1M --compare benchmarks/baseline.json
+
+With ``--compare``, cases slower or heavier than the baseline by more than
+``--tolerance`` (default 25%), and cases missing from the baseline at one
+of the sizes run, are listed and the exit status is 1.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from realestateCH.batch import run_spec
+from realestateCH.clean import clean_data
+from realestateCH.cube import ListingCube, price_to_rent_ratio_from_cubes
+from realestateCH.listingindex import ListingIndex
+from realestateCH.load import load_data
+from realestateCH.memo import MetricCache
+from realestateCH.metrics import (
+    average_rent_per_m2_by_canton,
+    compute_buy_price_per_m2,
+    compute_price_to_rent_ratio,
+    compute_rent_per_m2,
+    price_per_m2,
+    rank_cantons_by_rent,
+    rank_cantons_visual,
+)
+from realestateCH.quantiles import median_by_canton
+from realestateCH.schema import LISTING_DTYPES
+from synthetic import make_listings, parse_rows
+
+DEFAULT_SIZES = ["10k", "1M", "10M"]
+
+# Dashboard state used by the app cases: default cantons, rooms and rent band
+APP_CANTONS = ["GE", "VD", "ZH"]
+APP_ROOMS = (1.0, 10.0)
+APP_PRICE = (0, 10000)
+APP_SPEC = {"market": "rent", "cantons": APP_CANTONS, "rooms": APP_ROOMS, "price": APP_PRICE}
+APP_FILTERS = (APP_CANTONS, APP_ROOMS, APP_PRICE)
+# A selective query: one canton, a narrow rooms and rent band
+NARROW_FILTERS = (["ZH"], (3.5, 4.0), (2000, 2500))
+
+
+def _by_zip_code(df):
+    return df.rename(columns={"zip": "zip_code"})
+
+
+def _app_rerun(data):
+    """What ``app.py`` computes on each widget change (rent market selected)."""
+    rent_cube, buy_cube = data["cubes"]
+    rent_cube.summary(APP_CANTONS, APP_ROOMS, APP_PRICE)
+    rent_cube.rank_cantons_visual("Avg Rent/m²", APP_CANTONS, APP_ROOMS, APP_PRICE)
+    rent_cube.mean_price("canton", APP_CANTONS, APP_ROOMS, APP_PRICE)
+    buy_cube.mean_price("canton", APP_CANTONS, APP_ROOMS, (None, None))
+    ratio = price_to_rent_ratio_from_cubes(buy_cube, rent_cube, APP_CANTONS, APP_ROOMS, (None, None), APP_PRICE)
+    return median_by_canton(ratio, "price_to_rent_ratio")
+
+
+def _mask_rows(df, cantons, rooms, price):
+    """Rows of a filter through boolean masks over the whole frame."""
+    mask = df["canton"].isin(cantons) & df["rooms"].between(*rooms) & df["price_chf"].between(*price)
+    return np.flatnonzero(mask.to_numpy())
+
+
+def _by_zip_codes(data):
+    data.update(buy_z=_by_zip_code(data["buy"]), rent_z=_by_zip_code(data["rent"]))
+
+
+def _build_indexes(data):
+    _by_zip_codes(data)
+    data["indexes"] = (ListingIndex(data["rent_z"]), ListingIndex(data["buy_z"]))
+
+
+def _prime_cache(data):
+    """Memoized metrics with their result for the case's frames already cached."""
+    _by_zip_codes(data)
+    cache = MetricCache()
+    data["rank"] = cache.wrap(rank_cantons_visual)
+    data["ratio"] = cache.wrap(compute_price_to_rent_ratio)
+    data["rank"](data["rent"])
+    data["ratio"](data["buy_z"], data["rent_z"], duplicates="aggregate")
+
+
+def _build_cubes(data, engine="pandas"):
+    data["cubes"] = (ListingCube.from_listings(data["rent"], engine=engine),
+                     ListingCube.from_listings(data["buy"], engine=engine))
+
+
+# name -> (setup, call). setup(data) runs before the measurement; call(data)
+# is measured. data holds the 'rent' and 'buy' frames and the 'csv' path.
+CASES = {
+    "load_data_csv": (None, lambda d: load_data(d["csv"], dtype=LISTING_DTYPES, cache=False)),
+    "load_data_cached": (lambda d: load_data(d["csv"], dtype=LISTING_DTYPES),
+                         lambda d: load_data(d["csv"], dtype=LISTING_DTYPES)),
+    "clean_data": (None, lambda d: clean_data(d["rent"])),
+    "price_per_m2": (None, lambda d: price_per_m2(d["rent"])),
+    "compute_rent_per_m2": (None, lambda d: compute_rent_per_m2(d["rent"])),
+    "compute_buy_price_per_m2": (None, lambda d: compute_buy_price_per_m2(d["buy"])),
+    "compute_price_to_rent_ratio": (
+        _by_zip_codes,
+        lambda d: compute_price_to_rent_ratio(d["buy_z"], d["rent_z"], duplicates="aggregate"),
+    ),
+    "compute_price_to_rent_ratio_numpy": (
+        _by_zip_codes,
+        lambda d: compute_price_to_rent_ratio(d["buy_z"], d["rent_z"], duplicates="aggregate", engine="numpy"),
+    ),
+    "average_rent_per_m2_by_canton": (None, lambda d: average_rent_per_m2_by_canton(d["rent"])),
+    "average_rent_per_m2_by_canton_numpy": (None, lambda d: average_rent_per_m2_by_canton(d["rent"], "numpy")),
+    "rank_cantons_by_rent": (None, lambda d: rank_cantons_by_rent(d["rent"])),
+    "rank_cantons_by_rent_numpy": (None, lambda d: rank_cantons_by_rent(d["rent"], "numpy")),
+    "rank_cantons_visual": (None, lambda d: rank_cantons_visual(d["rent"])),
+    "rank_cantons_visual_numpy": (None, lambda d: rank_cantons_visual(d["rent"], engine="numpy")),
+    "memo_rank_cantons_visual_hit": (_prime_cache, lambda d: d["rank"](d["rent"])),
+    "memo_compute_price_to_rent_ratio_hit": (
+        _prime_cache,
+        lambda d: d["ratio"](d["buy_z"], d["rent_z"], duplicates="aggregate"),
+    ),
+    "app_build_cubes": (None, _build_cubes),
+    "app_build_cubes_numpy": (None, lambda d: _build_cubes(d, "numpy")),
+    "app_rerun": (_build_cubes, _app_rerun),
+    "app_filter_rank_listings": (
+        _by_zip_codes,
+        lambda d: run_spec(APP_SPEC, d["rent_z"], d["buy_z"]),
+    ),
+    "listing_index_build": (None, _build_indexes),
+    "app_filter_rank_listings_index": (_build_indexes, lambda d: run_spec(APP_SPEC, *d["indexes"])),
+    "listing_index_filter": (_build_indexes, lambda d: d["indexes"][0].rows(*APP_FILTERS)),
+    "listing_mask_filter": (None, lambda d: _mask_rows(d["rent"], *APP_FILTERS)),
+    "listing_index_filter_narrow": (_build_indexes, lambda d: d["indexes"][0].rows(*NARROW_FILTERS)),
+    "listing_mask_filter_narrow": (None, lambda d: _mask_rows(d["rent"], *NARROW_FILTERS)),
+}
+
+
+def _status_mib(field: str) -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError(f"{field} not found in /proc/self/status")
+
+
+def run_case(name: str, data_dir: str, repeat: int) -> dict:
+    data = {
+        "rent": pd.read_feather(os.path.join(data_dir, "rent.feather")),
+        "buy": pd.read_feather(os.path.join(data_dir, "buy.feather")),
+        "csv": os.path.join(data_dir, "rent.csv"),
+    }
+    setup, call = CASES[name]
+    if setup is not None:
+        setup(data)
+
+    # Give back the memory used while reading, then restart the peak from here
+    gc.collect()
+    pa.default_memory_pool().release_unused()
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+    before = _status_mib("VmRSS")
+
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        result = call(data)
+        times.append(time.perf_counter() - start)
+        if i == 0:
+            peak = _status_mib("VmHWM")
+        del result
+    return {"case": name, "seconds": min(times), "peak_increase_mib": peak - before}
+
+
+def write_data(rows: int, data_dir: str) -> None:
+    for market, seed in (("rent", 0), ("buy", 1)):
+        df = make_listings(rows, market, seed)
+        df.to_feather(os.path.join(data_dir, f"{market}.feather"))
+        if market == "rent":
+            df.to_csv(os.path.join(data_dir, "rent.csv"), index=False)
+
+
+def compare(results: list, baseline: dict, tolerance: float) -> list:
+    """
+    Cases of ``results`` slower or heavier than in ``baseline``, and cases
+    the baseline has no entry for at that size (metric 'missing'): those
+    must be added to the baseline rather than go unchecked.
+    """
+    reference = {(r["case"], r["rows"]): r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        ref = reference.get((r["case"], r["rows"]))
+        if ref is None:
+            regressions.append({**r, "metric": "missing", "baseline": None})
+            continue
+        for key in ("seconds", "peak_increase_mib"):
+            # Ignore noise on tiny values (sub-millisecond, sub-MiB)
+            floor = 1e-3 if key == "seconds" else 1.0
+            if r[key] > max(ref[key], floor) * (1 + tolerance):
+                regressions.append({**r, "metric": key, "baseline": ref[key]})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, help="numbers of listings, e.g. 10k 1M")
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=list(CASES))
+    parser.add_argument("--repeat", type=int, default=3, help="calls per case (the best time is kept)")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown/growth vs the baseline")
+    parser.add_argument("--case", choices=sorted(CASES), help=argparse.SUPPRESS)
+    parser.add_argument("--data", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(args.case, args.data, args.repeat)))
+        return
+
+    results = []
+    print(f"pandas {pd.__version__}, numpy {np.__version__}, {os.cpu_count()} CPU(s)")
+    print(f"{'case':<40}{'rows':>12}{'seconds':>12}{'peak +MiB':>12}")
+    for size in args.sizes:
+        rows = parse_rows(size)
+        with tempfile.TemporaryDirectory() as tmp:
+            write_data(rows, tmp)
+            for name in args.cases:
+                out = subprocess.run(
+                    [sys.executable, __file__, "--case", name, "--data", tmp, "--repeat", str(args.repeat)],
+                    check=True, capture_output=True, text=True,
+                )
+                res = {**json.loads(out.stdout), "rows": rows}
+                results.append(res)
+                print(f"{name:<40}{rows:>12,}{res['seconds']:>12.4f}{res['peak_increase_mib']:>12.1f}")
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "pyarrow": pa.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=1)
+            f.write("\n")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for r in regressions:
+            if r["metric"] == "missing":
+                print(f"MISSING BASELINE {r['case']} at {r['rows']:,} rows")
+                continue
+            print(f"REGRESSION {r['case']} at {r['rows']:,} rows: {r['metric']} "
+                  f"{r[r['metric']]:.4g} vs {r['baseline']:.4g}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regression beyond {args.tolerance:.0%} against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
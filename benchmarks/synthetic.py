@@ -0,0 +1,95 @@
+"""
+Synthetic Swiss listings with the distributions of the bundled data.
+
+Rows are drawn from the real listings of a market in ``data_raw/``, so the
+joint distribution of zip code, canton and rooms, and the share of missing
+values, are those of the real data. Prices and areas get a small
+multiplicative noise so that the synthetic rows are not exact copies. The
+listing IDs in the URLs repeat in the same proportion as in the real file
+(the same listing scraped under several zip codes).
+
+Usage:
+    python benchmarks/synthetic.py --rows 1000000 --market rent out.csv
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from realestateCH.load import MARKET_FILES, _raw_data_path, load_data
+from realestateCH.clean import extract_listing_ids
+from realestateCH.schema import LISTING_DTYPES
+
+LISTING_PATHS = {"rent": "/louer/", "buy": "/acheter/"}
+
+# Standard deviation of the log-noise applied to prices and areas
+NOISE = 0.05
+
+
+def make_listings(rows: int, market: str = "rent", seed: int = 0) -> pd.DataFrame:
+    """
+    ``rows`` synthetic listings of a market, with the listing schema.
+
+    Parameters
+    ----------
+    rows : int
+        Number of listings.
+    market : str, optional
+        'rent' or 'buy': whose listings the distributions are taken from.
+    seed : int, optional
+        Random seed; the same seed gives the same listings.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Columns zip, url, price_chf, rooms, area_m2 and canton.
+    """
+    if market not in MARKET_FILES:
+        raise ValueError(f"market must be one of {sorted(MARKET_FILES)}")
+    real = load_data(_raw_data_path(MARKET_FILES[market]), dtype=LISTING_DTYPES)
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(real), rows)
+
+    def noisy(col):
+        values = real[col].to_numpy(dtype="float64", na_value=np.nan)[picks]
+        return (values * np.exp(rng.normal(0, NOISE, rows))).round(0 if col == "price_chf" else 1)
+
+    # The first `unique` rows get distinct IDs, the rest repeat one of them
+    real_ids = extract_listing_ids(real["url"])
+    unique = max(1, round(rows * real_ids.nunique() / max(1, real_ids.notna().sum())))
+    ids = np.concatenate([np.arange(unique), rng.integers(0, unique, rows - unique)])
+    ids = 4_000_000_000 + rng.permutation(ids)
+    urls = "https://www.homegate.ch" + LISTING_PATHS[market] + pd.Series(ids).astype(str)
+
+    df = pd.DataFrame({
+        "zip": real["zip"].to_numpy()[picks],
+        "url": urls.to_numpy(),
+        "price_chf": noisy("price_chf"),
+        "rooms": real["rooms"].to_numpy()[picks],
+        "area_m2": noisy("area_m2").astype("float32"),
+        "canton": pd.Categorical.from_codes(real["canton"].cat.codes.to_numpy()[picks],
+                                            dtype=LISTING_DTYPES["canton"]),
+    })
+    return df
+
+
+def parse_rows(text: str) -> int:
+    """'10k' -> 10000, '1M' -> 1000000, '2500' -> 2500."""
+    text = text.strip()
+    factor = {"k": 1_000, "m": 1_000_000}.get(text[-1:].lower(), 1)
+    return int(float(text[:-1] if factor > 1 else text) * factor)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("output", help="CSV file to write")
+    parser.add_argument("--rows", type=parse_rows, default=1_000_000)
+    parser.add_argument("--market", choices=sorted(MARKET_FILES), default="rent")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    make_listings(args.rows, args.market, args.seed).to_csv(args.output, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,46 @@
 """
 realestateCH: Tools for analysing Swiss real estate data.
+
+The public functions below are imported from their submodule on first
+access, so ``import realestateCH`` is almost free and a worker that only
+uses ``clean_data`` or the metrics never imports matplotlib. Plotting
+needs the ``plot`` extra (``pip install realestateCH[plot]``).
 """
 
-from .load import load_data, load_rent_data, load_buy_data
-from .clean import clean_data
-from .metrics import (
-    compute_rent_per_m2,
-    compute_buy_price_per_m2,
-    compute_price_to_rent_ratio,
-    average_rent_per_m2_by_canton,
-    rank_cantons_by_rent,
-)
-from .plots import plot_average_rent_per_canton
+import importlib
+
+# Public name -> submodule that defines it
+_EXPORTS = {
+    "load_data": "load",
+    "load_rent_data": "load",
+    "load_buy_data": "load",
+    "clean_data": "clean",
+    "compute_rent_per_m2": "metrics",
+    "compute_buy_price_per_m2": "metrics",
+    "compute_price_to_rent_ratio": "metrics",
+    "average_rent_per_m2_by_canton": "metrics",
+    "rank_cantons_by_rent": "metrics",
+    "price_per_m2": "metrics",
+    "plot_average_rent_per_canton": "plots",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    else:
+        try:
+            # Submodules (realestateCH.metrics, ...) without an explicit import
+            value = importlib.import_module(f".{name}", __name__)
+        except ModuleNotFoundError as e:
+            if e.name != f"{__name__}.{name}":
+                raise
+            raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,160 @@
+import itertools
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .listingindex import ListingIndex
+from .load import _map_shared, _write_shared, load_shared_data, shared_data_path
+from .metrics import rank_cantons_visual
+from .zipindex import price_to_rent_ratio_by_zip
+
+# Ranking column label per market, as on the dashboard
+METRIC_LABELS = {"rent": "Avg Rent/m²", "buy": "Avg Buy Price/m²"}
+
+# Listing frames of the current worker process, mapped from the shared files
+_frames = {}
+
+
+def filter_grid(rooms_ranges, price_bands, markets=("rent", "buy"), cantons=None) -> list:
+    """
+    Every combination of rooms range x price band x market, as filter specs.
+
+    Parameters
+    ----------
+    rooms_ranges : list of tuple
+        (min, max) number of rooms; None for an open bound.
+    price_bands : list of tuple
+        (min, max) price in CHF; None for an open bound.
+    markets : sequence of str, optional
+        'rent' and/or 'buy'.
+    cantons : list, optional
+        Cantons kept in every spec (all cantons if None).
+
+    Returns
+    -------
+    list of dict
+        Filter specs for ``run_batch``.
+    """
+    return [
+        {"market": market, "cantons": cantons, "rooms": rooms, "price": price}
+        for market, rooms, price in itertools.product(markets, rooms_ranges, price_bands)
+    ]
+
+
+def _init_worker(paths: dict) -> None:
+    for market, path in paths.items():
+        _frames[market] = _map_shared(path)
+
+
+def _select(df: pd.DataFrame, cantons, rooms, price) -> pd.DataFrame:
+    if isinstance(df, ListingIndex):
+        return df.select(cantons, rooms, price)
+    mask = np.ones(len(df), dtype=bool)
+    if cantons:
+        mask &= df["canton"].isin(cantons).to_numpy()
+    for col, (low, high) in (("rooms", rooms), ("price_chf", price)):
+        if low is not None:
+            mask &= (df[col] >= low).to_numpy()
+        if high is not None:
+            mask &= (df[col] <= high).to_numpy()
+    return df[mask]
+
+
+def run_spec(spec: dict, rent_df: pd.DataFrame, buy_df: pd.DataFrame) -> dict:
+    """
+    Canton ranking and price-to-rent table for one filter spec.
+
+    The spec's market gets all filters; the other market is only filtered
+    on cantons and rooms, as in the dashboard's comparison. ``rent_df`` and
+    ``buy_df`` may be ``ListingIndex`` objects: when many specs run on the
+    same listings, the filters are then answered from the index instead of
+    masks over the whole frames.
+
+    Returns
+    -------
+    dict
+        - spec: the filter spec
+        - ranking: ``rank_cantons_visual`` of the filtered market
+        - ratio: ``price_to_rent_ratio_by_zip`` of both filtered markets
+    """
+    market = spec["market"]
+    if market not in METRIC_LABELS:
+        raise ValueError(f"market must be one of {sorted(METRIC_LABELS)}")
+    cantons = spec.get("cantons")
+    rooms = spec.get("rooms") or (None, None)
+    price = spec.get("price") or (None, None)
+    frames = {"rent": rent_df, "buy": buy_df}
+
+    selected = {
+        name: _select(df, cantons, rooms, price if name == market else (None, None))
+        for name, df in frames.items()
+    }
+    return {
+        "spec": spec,
+        "ranking": rank_cantons_visual(selected[market], metric_name=METRIC_LABELS[market]),
+        "ratio": price_to_rent_ratio_by_zip(selected["buy"], selected["rent"]),
+    }
+
+
+def _run_in_worker(spec: dict) -> dict:
+    return run_spec(spec, _frames["rent"], _frames["buy"])
+
+
+def run_batch(specs: list, rent_df: pd.DataFrame = None, buy_df: pd.DataFrame = None,
+              processes: int = None) -> list:
+    """
+    Compute the canton ranking and price-to-rent table of many filter specs
+    in parallel.
+
+    Every worker process maps the listing frames read-only from
+    memory-mappable Feather files, so the operating system shares the same
+    pages between workers and the frames are never pickled. Only the specs
+    and the (small) results travel between processes. Without frames, the
+    shared listing files of ``load.shared_data_path`` are used, the same
+    ones the dashboard maps; given frames are written once to a temporary
+    folder.
+
+    Parameters
+    ----------
+    specs : list of dict
+        Filter specs with keys 'market' ('rent' or 'buy'), and optionally
+        'cantons' (list), 'rooms' and 'price' ((min, max) tuples, None for an
+        open bound). See ``filter_grid``.
+    rent_df, buy_df : pandas.DataFrame, optional
+        Rent and buy listings with canton, zip (or zip_code), rooms,
+        price_chf and area_m2. By default the bundled listings
+        (``load.load_shared_data``).
+    processes : int, optional
+        Number of worker processes (default: number of CPUs). With 0 or 1
+        the specs are computed in this process.
+
+    Returns
+    -------
+    list of dict
+        One result per spec, in the same order (see ``run_spec``).
+    """
+    given = {"rent": rent_df, "buy": buy_df}
+    processes = os.cpu_count() if processes is None else processes
+    if processes <= 1 or len(specs) <= 1:
+        frames = {
+            name: load_shared_data(name) if df is None else df.rename(columns={"zip": "zip_code"})
+            for name, df in given.items()
+        }
+        return [run_spec(spec, frames["rent"], frames["buy"]) for spec in specs]
+
+    with tempfile.TemporaryDirectory(prefix="realestateCH-batch-") as tmp:
+        paths = {}
+        for name, df in given.items():
+            if df is None:
+                paths[name] = shared_data_path(name)
+            else:
+                paths[name] = os.path.join(tmp, f"{name}.feather")
+                _write_shared(df, paths[name])
+
+        processes = min(processes, len(specs))
+        chunksize = max(1, len(specs) // (4 * processes))
+        with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(paths,)) as pool:
+            return list(pool.map(_run_in_worker, specs, chunksize=chunksize))
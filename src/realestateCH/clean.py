@@ -1,6 +1,75 @@
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 
-def clean_data(df: pd.DataFrame) -> pd.DataFrame:
+# Homegate listing URLs end with the numeric listing ID,
+# e.g. https://www.homegate.ch/louer/4002691179
+_LISTING_ID_PATTERN = r"/(?P<listing_id>\d+)/?(?:[?#].*)?$"
+
+# Set on row fingerprints so they never equal a listing ID (IDs are far below 2**63)
+_FINGERPRINT_BIT = np.uint64(1 << 63)
+
+
+def extract_listing_ids(urls: pd.Series) -> pd.Series:
+    """
+    Numeric homegate listing ID at the end of each URL.
+
+    Parameters
+    ----------
+    urls : pandas.Series
+        Listing URLs.
+
+    Returns
+    -------
+    pandas.Series
+        Nullable UInt64 Series, missing where the URL holds no ID ('N/A').
+    """
+    # Arrow's regex kernel is several times faster than Series.str.extract
+    try:
+        matches = pc.extract_regex(pa.array(urls.astype("str"), from_pandas=True), _LISTING_ID_PATTERN)
+        ids = pc.cast(pc.struct_field(matches, [0]), pa.uint64())
+    except pa.ArrowInvalid:
+        # ID too large for 64 bits: not a homegate listing ID
+        ids = pd.to_numeric(urls.astype("str").str.extract(_LISTING_ID_PATTERN, expand=False), errors="coerce")
+        return ids.where(ids < 2**63).astype("UInt64")
+    return pd.Series(ids.to_pandas(types_mapper={pa.uint64(): pd.UInt64Dtype()}.get).array,
+                     index=urls.index, name="listing_id")
+
+
+def listing_keys(df: pd.DataFrame) -> np.ndarray:
+    """
+    One 64-bit deduplication key per row.
+
+    The key is the listing ID (column 'listing_id', else taken from 'url').
+    Rows without an ID get a hash of all their values instead, so two such
+    rows share a key only when they are identical.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+
+    Returns
+    -------
+    numpy.ndarray
+        uint64 keys, aligned with the rows of ``df``.
+    """
+    if "listing_id" in df.columns:
+        ids = df["listing_id"]
+    elif "url" in df.columns:
+        ids = extract_listing_ids(df["url"])
+    else:
+        ids = pd.Series(pd.NA, index=df.index, dtype="UInt64")
+
+    keys = ids.to_numpy(dtype=np.uint64, na_value=0)
+    missing = ids.isna().to_numpy()
+    if missing.any():
+        rows = df.loc[missing, [col for col in df.columns if col != "listing_id"]]
+        keys[missing] = pd.util.hash_pandas_object(rows, index=False).to_numpy() | _FINGERPRINT_BIT
+    return keys
+
+
+def clean_data(df: pd.DataFrame, keep: str = "first") -> pd.DataFrame:
     """
     Clean and preprocess the raw real estate dataset.
 
@@ -8,34 +77,47 @@ def clean_data(df: pd.DataFrame) -> pd.DataFrame:
     - Convert numeric columns to numeric values
     - Replace invalid values with NaN
     - Remove rows with missing or zero area (cannot compute m2 metrics)
-    - Drop duplicate rows
+    - Add the homegate listing ID taken from 'url' as 'listing_id'
+    - Drop duplicate listings (same listing ID, or identical rows when
+      there is no ID)
     - Standardize canton names if present
 
     Parameters
     ----------
     df : pandas.DataFrame
+    keep : str, optional
+        Which row of a duplicated listing to keep: 'first' (default) or
+        'last', i.e. the latest scrape when batches were appended in order.
 
     Returns
     -------
     pandas.DataFrame
     """
+    if keep not in ("first", "last"):
+        raise ValueError("keep must be 'first' or 'last'.")
     df = df.copy()
 
     # Convert numeric columns
     numeric_cols = ["price_chf", "rooms", "area_m2"]
     for col in numeric_cols:
-        if col in df.columns:
+        # Columns typed at load time (see schema.LISTING_DTYPES) are kept as is
+        if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
             df[col] = pd.to_numeric(df[col], errors="coerce")
 
     # Remove entries with no area
     if "area_m2" in df.columns:
         df = df[df["area_m2"].notna() & (df["area_m2"] > 0)]
 
-    # Remove duplicate rows
-    df = df.drop_duplicates()
+    # Remove duplicate listings, comparing one integer key per row
+    # instead of every column
+    if "url" in df.columns and "listing_id" not in df.columns:
+        df["listing_id"] = extract_listing_ids(df["url"])
+    keys = listing_keys(df)
+    df = df[~pd.Series(keys).duplicated(keep=keep).to_numpy()]
 
-    # Standardize canton names if present (optional)
-    if "canton" in df.columns:
+    # Standardize canton names if present (optional).
+    # A categorical canton already holds the official abbreviations.
+    if "canton" in df.columns and not isinstance(df["canton"].dtype, pd.CategoricalDtype):
         df["canton"] = df["canton"].str.strip().str.upper()
 
     return df
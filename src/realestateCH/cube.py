@@ -0,0 +1,424 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from .kernels import GroupIndex, _check_engine
+from .metrics import _medal_ranking
+from .zipindex import price_to_rent_ratio_by_zip
+
+# Measures aggregated in every cell of the cube
+MEASURES = ("price_chf", "area_m2", "price_per_m2")
+
+# Bucket used for listings with a missing rooms / price value. It is below
+# any real bucket, so these listings only count when the range is not filtered.
+MISSING_BUCKET = np.iinfo(np.int32).min
+
+# Default bucket widths: the steps of the dashboard's rooms and price inputs
+ROOMS_STEP = 0.5
+PRICE_STEP = 100
+
+
+def _bucketize(values: pd.Series, step: float):
+    """
+    Bucket number and "on the edge" flag of each value.
+
+    A value v falls in bucket floor(v / step). The flag is True when v is
+    exactly the lower edge of its bucket (v == bucket * step); it lets range
+    queries include an upper bound exactly.
+    """
+    values = values.to_numpy(dtype="float64", na_value=np.nan)
+    missing = np.isnan(values)
+    buckets = np.floor(np.where(missing, 0, values) / step)
+    edge = (buckets * step == values) & ~missing
+    buckets = np.where(missing, MISSING_BUCKET, buckets).astype(np.int32)
+    return buckets, edge
+
+
+def _range_mask(buckets, edge, bounds, step):
+    """
+    Cells whose values all lie within ``bounds = (low, high)`` (inclusive).
+
+    Bounds on the bucket grid (multiples of ``step``) are answered exactly.
+    A bound in the middle of a bucket is moved inwards to the grid; the
+    listings of that bucket which are in range are added by the cube (see
+    ``ListingCube._off_grid_sums``).
+    """
+    low, high = bounds
+    mask = np.ones(len(buckets), dtype=bool)
+    if low is not None:
+        mask &= buckets >= math.ceil(low / step)
+    if high is not None:
+        high_bucket = math.floor(high / step)
+        mask &= (buckets < high_bucket) | ((buckets == high_bucket) & edge)
+    return mask
+
+
+def _off_grid(bounds, step) -> bool:
+    """Whether a bound of ``bounds`` lies in the middle of a bucket."""
+    return any(b is not None and math.floor(b / step) * step != b for b in bounds)
+
+
+def _in_range(values, bounds):
+    """Values within ``bounds = (low, high)`` (inclusive), as a mask on the listings would give."""
+    low, high = bounds
+    mask = np.ones(len(values), dtype=bool)
+    if low is not None:
+        mask &= values >= low
+    if high is not None:
+        mask &= values <= high
+    return mask
+
+
+# Additive columns of a cell
+_SUM_COLUMNS = ["listings"] + [f"{m}_{s}" for m in MEASURES for s in ("count", "sum", "sumsq")]
+
+
+def _listing_sums(price, area):
+    """Cell sums (columns as in _SUM_COLUMNS) of single listings."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        per_m2 = price / area
+    columns = [np.ones(len(price))]
+    for values in (price, area, per_m2):
+        present = ~np.isnan(values)
+        values = np.where(present, values, 0.0)
+        columns += [present, values, values * values]
+    return np.column_stack(columns).astype("float64")
+
+
+def _mean_std(totals, name):
+    """Mean and sample standard deviation (ddof=1) of a measure from its sums."""
+    j = _SUM_COLUMNS.index(name + "_count")
+    count, total, sumsq = totals[:, j], totals[:, j + 1], totals[:, j + 2]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.where(count > 0, total / count, np.nan)
+        var = (sumsq - count * mean * mean) / (count - 1)
+        std = np.where(count > 1, np.sqrt(np.clip(var, 0, None)), np.nan)
+    return mean, std
+
+
+class ListingCube:
+    """
+    Pre-aggregated listings, keyed by canton x zip x rooms bucket x price bucket.
+
+    Each cell holds the number of listings and, for every measure (price,
+    area and price per m²), the count of non-missing values, their sum and
+    their sum of squares. Dashboard filters (cantons, rooms range, price
+    range) and groupings (canton, zip) are answered by rolling up the cells,
+    without going back to the listings.
+
+    Range bounds on the bucket grid are answered from the cells alone. For a
+    bound in the middle of a bucket, the listings of that bucket are scanned
+    (``listings``, the frames the cube was built from, kept by reference);
+    a cube without them only accepts bounds on the grid.
+
+    Build it with ``ListingCube.from_listings``.
+    """
+
+    def __init__(self, cells: pd.DataFrame, rooms_step: float = ROOMS_STEP, price_step: float = PRICE_STEP,
+                 listings=None):
+        # Cells sorted by canton then zip: every canton and every (canton,
+        # zip) pair is a contiguous block of rows, so rollups are segment sums
+        cells = cells.assign(canton=cells["canton"].astype("category"))
+        cells = cells.sort_values(["canton", "zip_code"], kind="stable").reset_index(drop=True)
+        self.cells = cells
+        self.rooms_step = rooms_step
+        self.price_step = price_step
+        self.listings = listings
+
+        # Plain NumPy views of the cells, so queries avoid pandas overhead
+        canton = cells["canton"]
+        self._canton_dtype = canton.dtype
+        self._canton_codes = canton.cat.codes.to_numpy()
+        self._canton_index = {c: i for i, c in enumerate(canton.cat.categories)}
+        self._rooms = (cells["rooms_bucket"].to_numpy(), cells["rooms_edge"].to_numpy())
+        self._price = (cells["price_bucket"].to_numpy(), cells["price_edge"].to_numpy())
+        self._sums_t = np.ascontiguousarray(cells[_SUM_COLUMNS].to_numpy(dtype="float64").T)
+
+        zip_codes = cells["zip_code"].to_numpy()
+        new_canton = np.diff(self._canton_codes, prepend=-1) != 0
+        new_zip = new_canton | (np.diff(zip_codes, prepend=-1) != 0)
+        self._segments = {}
+        for by, starts in [(("canton",), new_canton), (("canton", "zip_code"), new_zip)]:
+            starts = np.flatnonzero(starts)
+            self._segments[by] = (starts, {"canton": self._canton_codes[starts], "zip_code": zip_codes[starts]})
+
+    @classmethod
+    def from_listings(cls, df: pd.DataFrame, rooms_step: float = ROOMS_STEP,
+                      price_step: float = PRICE_STEP, engine: str = "pandas") -> "ListingCube":
+        """
+        Aggregate a listings DataFrame into a cube.
+
+        Parameters
+        ----------
+        df : pandas.DataFrame
+            Listings with 'canton', 'zip' (or 'zip_code'), 'rooms',
+            'price_chf' and 'area_m2'.
+        rooms_step : float, optional
+            Width of the rooms buckets. Rooms filters on multiples of this
+            step are answered from the cells; other bounds also scan the
+            listings.
+        price_step : float, optional
+            Width of the price buckets (CHF), as for ``rooms_step``.
+        engine : {'pandas', 'numpy'}, optional
+            'pandas' aggregates the cells with a groupby; 'numpy' codes the
+            cell keys once and sums with ``np.bincount`` (see
+            ``kernels.GroupIndex``). The cells hold the same values, up to
+            floating-point rounding.
+
+        Returns
+        -------
+        ListingCube
+        """
+        zip_col = "zip_code" if "zip_code" in df.columns else "zip"
+        required_cols = {"canton", zip_col, "rooms", "price_chf", "area_m2"}
+        if not required_cols.issubset(df.columns):
+            raise ValueError("DataFrame must contain canton, zip, rooms, price_chf and area_m2 columns.")
+        _check_engine(engine)
+
+        rooms_bucket, rooms_edge = _bucketize(df["rooms"], rooms_step)
+        price_bucket, price_edge = _bucketize(df["price_chf"], price_step)
+        price = df["price_chf"].to_numpy(dtype="float64", na_value=np.nan)
+        area = df["area_m2"].to_numpy(dtype="float64", na_value=np.nan)
+
+        canton = df["canton"].astype("category")
+        columns = {
+            "canton": canton.array,
+            "zip_code": df[zip_col].to_numpy(),
+            "rooms_bucket": rooms_bucket,
+            "rooms_edge": rooms_edge,
+            "price_bucket": price_bucket,
+            "price_edge": price_edge,
+        }
+        keys = list(columns)
+        measures = dict(zip(MEASURES, (price, area, price / area)))
+
+        if engine == "numpy":
+            # The canton's category codes are its key codes
+            groups = GroupIndex(pd.DataFrame(columns), keys)
+            cells = groups.to_frame(listings=groups.size())
+            for name, values in measures.items():
+                cells[name + "_count"] = groups.count(values)
+                cells[name + "_sum"] = groups.sum(values)
+                cells[name + "_sumsq"] = groups.sum(values * values)
+            # As with pandas, the cube's categories are the cantons with listings
+            cells["canton"] = cells["canton"].to_numpy()
+            return cls(cells, rooms_step, price_step, [df])
+
+        work = pd.DataFrame({**columns, "canton": canton.to_numpy()})
+        work["listings"] = 1
+        for name, values in measures.items():
+            work[name] = values
+            work[name + "_sq"] = values * values
+
+        grouped = work.groupby(keys, observed=True, sort=False)
+        cells = grouped["listings"].sum().to_frame()
+        for name in MEASURES:
+            cells[name + "_count"] = grouped[name].count()
+            cells[name + "_sum"] = grouped[name].sum()
+            cells[name + "_sumsq"] = grouped[name + "_sq"].sum()
+
+        return cls(cells.reset_index(), rooms_step, price_step, [df])
+
+    def append(self, df: pd.DataFrame) -> "ListingCube":
+        """
+        Cube of the current listings plus the listings in ``df``.
+
+        Only the new listings are aggregated; their cells are then added to
+        the existing ones, so the cost grows with ``df`` and the number of
+        cells, not with the number of listings already in the cube.
+        """
+        new = ListingCube.from_listings(df, self.rooms_step, self.price_step)
+        keys = ["canton", "zip_code", "rooms_bucket", "rooms_edge", "price_bucket", "price_edge"]
+        cells = pd.concat([self.cells, new.cells], ignore_index=True)
+        cells["canton"] = cells["canton"].astype(str)
+        cells = cells.groupby(keys, sort=False, as_index=False)[_SUM_COLUMNS].sum()
+        listings = None if self.listings is None else self.listings + [df]
+        return ListingCube(cells, self.rooms_step, self.price_step, listings)
+
+    @property
+    def cantons(self) -> list:
+        """Cantons that have at least one listing, sorted."""
+        return sorted(self.cells["canton"].astype(str).unique())
+
+    def _select(self, cantons=None, rooms=(None, None), price=(None, None)):
+        mask = _range_mask(*self._rooms, rooms, self.rooms_step)
+        mask &= _range_mask(*self._price, price, self.price_step)
+        if cantons:
+            allowed = np.zeros(len(self._canton_index), dtype=bool)
+            allowed[[self._canton_index[c] for c in cantons if c in self._canton_index]] = True
+            mask &= allowed[self._canton_codes]
+        return mask
+
+    def rollup(self, by=None, cantons=None, rooms=(None, None), price=(None, None)) -> pd.DataFrame:
+        """
+        Aggregate the cells that match the filters.
+
+        Parameters
+        ----------
+        by : str or list of str, optional
+            'canton', or 'zip_code' and 'canton' together. If None, everything is rolled up
+            into a single row.
+        cantons : list, optional
+            Only keep these cantons (all cantons if None or empty).
+        rooms : tuple, optional
+            (min, max) number of rooms, inclusive; None for an open bound.
+        price : tuple, optional
+            (min, max) price in CHF, inclusive; None for an open bound.
+
+        Returns
+        -------
+        pandas.DataFrame
+            One row per group with listings, sorted by the group columns,
+            with the number of listings and, for each measure, its count,
+            sum, mean and standard deviation (``<measure>_count``, ``_sum``,
+            ``_mean``, ``_std``).
+        """
+        keys, totals = self._rollup_arrays(by, cantons, rooms, price)
+
+        columns = self._key_columns(keys)
+        for j, col in enumerate(_SUM_COLUMNS):
+            if col == "listings" or col.endswith("_count"):
+                columns[col] = totals[:, j].astype(np.int64)
+            elif col.endswith("_sum"):
+                columns[col] = totals[:, j]
+        for name in MEASURES:
+            mean, std = _mean_std(totals, name)
+            columns[name + "_mean"] = mean
+            columns[name + "_std"] = std
+        return pd.DataFrame(columns)
+
+    def _rollup_arrays(self, by, cantons, rooms, price):
+        """
+        Group keys (dict of arrays) and summed cells (2D array, one row per
+        group with listings, columns as in _SUM_COLUMNS).
+        """
+        mask = self._select(cantons, rooms, price)
+        off_grid = self._off_grid_sums(cantons, rooms, price)
+
+        if by is None:
+            totals = (self._sums_t @ mask)[None, :]
+            if off_grid is not None:
+                totals += off_grid[2].sum(axis=0)
+            return {}, totals
+
+        by = [by] if isinstance(by, str) else list(by)
+        segment = ("canton",) if by == ["canton"] else ("canton", "zip_code")
+        if set(by) != set(segment):
+            raise ValueError("by must be 'canton', 'zip_code' or both.")
+        starts, keys = self._segments[segment]
+        if len(starts) == 0:
+            return {col: keys[col] for col in by}, np.zeros((0, len(_SUM_COLUMNS)))
+
+        totals = np.add.reduceat(self._sums_t * mask, starts, axis=1).T
+        if off_grid is not None:
+            # Segment of each listing: segments are sorted by canton code, then zip
+            codes, zip_codes, sums = off_grid
+            if segment == ("canton",):
+                position = np.searchsorted(keys["canton"], codes)
+            else:
+                segment_keys = keys["canton"].astype(np.int64) << 32 | keys["zip_code"].astype(np.int64)
+                position = np.searchsorted(segment_keys, codes.astype(np.int64) << 32 | zip_codes)
+            np.add.at(totals, position, sums)
+        keep = totals[:, 0] > 0
+        keys = {col: keys[col][keep] for col in by}
+        totals = totals[keep]
+
+        # Segments are ordered by canton then zip; sort on the requested order
+        order = np.lexsort([keys[col] for col in reversed(by)])
+        return {col: values[order] for col, values in keys.items()}, totals[order]
+
+    def _off_grid_sums(self, cantons, rooms, price):
+        """
+        Listings in range that lie in a bucket cut by an off-grid bound.
+
+        Returns None when both ranges are on the bucket grid; otherwise the
+        canton codes, zip codes and cell sums (one row per listing) of the
+        listings that are in range but not in the cells selected by
+        ``_select``.
+        """
+        if not (_off_grid(rooms, self.rooms_step) or _off_grid(price, self.price_step)):
+            return None
+        if self.listings is None:
+            raise ValueError(
+                f"Rooms bounds must be multiples of {self.rooms_step} and price bounds multiples of "
+                f"{self.price_step} for a cube without its listings."
+            )
+
+        allowed = np.zeros(len(self._canton_index), dtype=bool)
+        allowed[[self._canton_index[c] for c in (cantons or self._canton_index) if c in self._canton_index]] = True
+        found = []
+        for df in self.listings:
+            zip_col = "zip_code" if "zip_code" in df.columns else "zip"
+            canton = df["canton"].astype("category")
+            # Cube canton code of each listing (-1: canton without cells)
+            recode = np.append(self._canton_dtype.categories.get_indexer(canton.cat.categories), -1)
+            codes = recode[canton.cat.codes.to_numpy()]
+            zip_codes = df[zip_col].to_numpy(dtype="float64", na_value=np.nan)
+            rooms_values = df["rooms"].to_numpy(dtype="float64", na_value=np.nan)
+            price_values = df["price_chf"].to_numpy(dtype="float64", na_value=np.nan)
+
+            # In range, as a mask on the listings gives, but not in a selected cell
+            in_range = (codes >= 0) & ~np.isnan(zip_codes)
+            in_range &= _in_range(rooms_values, rooms) & _in_range(price_values, price)
+            in_range &= allowed[codes]
+            in_cells = _range_mask(*_bucketize(df["rooms"], self.rooms_step), rooms, self.rooms_step)
+            in_cells &= _range_mask(*_bucketize(df["price_chf"], self.price_step), price, self.price_step)
+            rows = np.flatnonzero(in_range & ~in_cells)
+
+            area = df["area_m2"].to_numpy(dtype="float64", na_value=np.nan)
+            found.append((codes[rows], zip_codes[rows].astype(np.int64), _listing_sums(price_values[rows], area[rows])))
+        return tuple(np.concatenate(parts) for parts in zip(*found))
+
+    def summary(self, cantons=None, rooms=(None, None), price=(None, None)) -> dict:
+        """
+        Number of listings, average price and average area of the selection.
+        """
+        _, totals = self._rollup_arrays(None, cantons, rooms, price)
+        return {
+            "listings": int(totals[0, 0]),
+            "avg_price": _mean_std(totals, "price_chf")[0][0],
+            "avg_area": _mean_std(totals, "area_m2")[0][0],
+        }
+
+    def rank_cantons_visual(self, metric_name="Avg Rent/m²", cantons=None,
+                            rooms=(None, None), price=(None, None)) -> pd.DataFrame:
+        """
+        Same table as ``metrics.rank_cantons_visual`` on the filtered listings.
+        """
+        totals = self.rollup("canton", cantons, rooms, price)
+        means = totals.set_index("canton")["price_per_m2_mean"]
+        return _medal_ranking(means, metric_name)
+
+    def mean_price(self, by, cantons=None, rooms=(None, None), price=(None, None)) -> pd.DataFrame:
+        """
+        Mean price per group, with the group columns and 'price_chf', as
+        ``df.groupby(by)['price_chf'].mean().reset_index()`` would give.
+        """
+        keys, totals = self._rollup_arrays(by, cantons, rooms, price)
+        columns = self._key_columns(keys)
+        columns["price_chf"] = _mean_std(totals, "price_chf")[0]
+        return pd.DataFrame(columns)
+
+    def _key_columns(self, keys: dict) -> dict:
+        """Group key arrays with the dtypes of the listings."""
+        columns = {}
+        for col, values in keys.items():
+            if col == "canton":
+                columns[col] = pd.Categorical.from_codes(values, dtype=self._canton_dtype)
+            else:
+                columns[col] = values
+        return columns
+
+
+def price_to_rent_ratio_from_cubes(buy_cube: ListingCube, rent_cube: ListingCube, cantons=None,
+                                   rooms=(None, None), buy_price=(None, None),
+                                   rent_price=(None, None)) -> pd.DataFrame:
+    """
+    Price-to-rent ratio per zip code from the mean prices per zip code and
+    canton of a buy cube and a rent cube (see
+    ``zipindex.price_to_rent_ratio_by_zip``).
+    """
+    b_agg = buy_cube.mean_price(["zip_code", "canton"], cantons, rooms, buy_price)
+    r_agg = rent_cube.mean_price(["zip_code", "canton"], cantons, rooms, rent_price)
+    return price_to_rent_ratio_by_zip(b_agg, r_agg)
@@ -0,0 +1,326 @@
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from .load import (
+    CACHE_DIRNAME,
+    MARKET_FILES,
+    MAX_CACHE_DELTAS,
+    _append_cache_delta,
+    _cache_path,
+    _raw_data_path,
+    _read_tables,
+    _same_state,
+    _stat_fingerprint,
+    _write_cache,
+)
+from .clean import listing_keys
+from .schema import CANTON_DTYPE, LISTING_DTYPES, apply_listing_schema
+from .zipindex import MIXED_CANTONS, NO_CANTON, N_ZIP_SLOTS
+
+# Columns of a scraper output file (buy_results.csv / rent_results.csv)
+SCRAPER_COLUMNS = ["zip", "url", "price_chf", "rooms", "area_m2"]
+
+# Columns of the stored listing files (scraper output + canton)
+LISTING_COLUMNS = SCRAPER_COLUMNS + ["canton"]
+
+ZIP_CODES_FILE = "zip_codes_selected.csv"
+
+
+def load_zip_cantons(path: str = None) -> pd.Series:
+    """
+    Canton of each zip code, from ``data_raw/zip_codes_selected.csv``.
+
+    Returns
+    -------
+    pandas.Series
+        Canton abbreviations indexed by zip code.
+    """
+    path = path or _raw_data_path(ZIP_CODES_FILE)
+    zip_codes = pd.read_csv(path, usecols=["zip", "canton"])
+    return zip_codes.drop_duplicates("zip").set_index("zip")["canton"]
+
+
+class CantonAssignmentWarning(UserWarning):
+    """Some listings got no canton from their zip code."""
+
+
+# Zip-to-canton arrays already built, by (zip code file, modification time)
+_ZIP_CANTON_CODES = {}
+
+
+def zip_canton_codes(zip_cantons: pd.DataFrame) -> np.ndarray:
+    """
+    Dense zip-to-canton array: slot ``z`` holds the code of the canton of zip
+    code ``z`` in ``schema.CANTONS``, ``NO_CANTON`` if the zip code is not in
+    the table and ``MIXED_CANTONS`` if it is listed in several cantons.
+
+    Parameters
+    ----------
+    zip_cantons : pandas.DataFrame
+        Table with 'zip' and 'canton' columns (one row per zip code and canton).
+
+    Returns
+    -------
+    numpy.ndarray
+        int8 array of ``N_ZIP_SLOTS`` codes.
+    """
+    zips = pd.to_numeric(zip_cantons["zip"], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    codes = pd.Categorical(zip_cantons["canton"], dtype=CANTON_DTYPE).codes
+    valid = (codes >= 0) & (zips >= 0) & (zips < N_ZIP_SLOTS)
+    zips, codes = zips[valid].astype(np.intp), codes[valid].astype(np.int8)
+
+    low = np.full(N_ZIP_SLOTS, np.iinfo(np.int8).max, dtype=np.int8)
+    high = np.full(N_ZIP_SLOTS, NO_CANTON, dtype=np.int8)
+    np.minimum.at(low, zips, codes)
+    np.maximum.at(high, zips, codes)
+    seen = high != NO_CANTON
+    table = np.full(N_ZIP_SLOTS, NO_CANTON, dtype=np.int8)
+    table[seen] = np.where(low[seen] == high[seen], high[seen], MIXED_CANTONS)
+    return table
+
+
+def load_zip_canton_codes(path: str = None) -> np.ndarray:
+    """
+    ``zip_canton_codes`` of ``data_raw/zip_codes_selected.csv`` (or ``path``).
+    The array is built once per file version and kept in memory.
+    """
+    path = os.path.abspath(path or _raw_data_path(ZIP_CODES_FILE))
+    key = (path, os.stat(path).st_mtime_ns)
+    if key not in _ZIP_CANTON_CODES:
+        _ZIP_CANTON_CODES[key] = zip_canton_codes(pd.read_csv(path, usecols=["zip", "canton"]))
+    return _ZIP_CANTON_CODES[key]
+
+
+def assign_canton(df: pd.DataFrame, zip_codes_path: str = None, codes: np.ndarray = None,
+                  errors: str = "warn") -> pd.DataFrame:
+    """
+    Add the canton of each listing, looked up from its zip code.
+
+    The lookup is a single gather in a dense zip-to-canton array
+    (``load_zip_canton_codes``), so its cost is linear in the number of
+    rows and does not depend on the size of the zip code table. Existing
+    'canton' values are replaced.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Listings with a 'zip' column, e.g. a scraper output file.
+    zip_codes_path : str, optional
+        Zip code to canton table. By default ``data_raw/zip_codes_selected.csv``.
+    codes : numpy.ndarray, optional
+        Prebuilt ``zip_canton_codes`` array (``zip_codes_path`` is then unused).
+    errors : str, optional
+        What to do with zip codes that are not in the table (unmapped) or lie
+        in several cantons (ambiguous); their listings get no canton either
+        way. 'warn' (default) emits a ``CantonAssignmentWarning`` listing
+        them, 'raise' raises a ValueError, 'ignore' does nothing.
+        ``canton_coverage`` returns the same zip codes.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Copy of ``df`` with a categorical 'canton' column.
+    """
+    if errors not in ("warn", "raise", "ignore"):
+        raise ValueError("errors must be 'warn', 'raise' or 'ignore'")
+    if "zip" not in df.columns:
+        raise ValueError("DataFrame must contain a 'zip' column.")
+    if codes is None:
+        codes = load_zip_canton_codes(zip_codes_path)
+
+    row_codes = _lookup_codes(df["zip"], codes)
+    out = df.copy()
+    out["canton"] = pd.Categorical.from_codes(np.maximum(row_codes, NO_CANTON), dtype=CANTON_DTYPE)
+
+    if errors != "ignore" and (row_codes < 0).any():
+        coverage = canton_coverage(df["zip"], codes=codes)
+        parts = [f"{len(zips)} {kind} zip code(s): {_head(zips)}" for kind, zips in coverage.items() if len(zips)]
+        message = f"{int((row_codes < 0).sum())} listing(s) without canton; " + "; ".join(parts)
+        if errors == "raise":
+            raise ValueError(message)
+        warnings.warn(message, CantonAssignmentWarning, stacklevel=2)
+    return out
+
+
+def canton_coverage(zips, zip_codes_path: str = None, codes: np.ndarray = None) -> dict:
+    """
+    Zip codes of listings that ``assign_canton`` cannot place in a canton.
+
+    Parameters
+    ----------
+    zips : array-like
+        Zip codes of the listings.
+    zip_codes_path, codes : optional
+        As in ``assign_canton``.
+
+    Returns
+    -------
+    dict
+        - unmapped: sorted zip codes missing from the table (or invalid)
+        - ambiguous: sorted zip codes listed in several cantons
+    """
+    if codes is None:
+        codes = load_zip_canton_codes(zip_codes_path)
+    zips = pd.Series(zips)
+    row_codes = _lookup_codes(zips, codes)
+    values = pd.to_numeric(zips, errors="coerce")
+    return {
+        "unmapped": np.unique(values[row_codes == NO_CANTON].dropna().to_numpy()).astype(np.int64),
+        "ambiguous": np.unique(values[row_codes == MIXED_CANTONS].to_numpy()).astype(np.int64),
+    }
+
+
+def _lookup_codes(zips: pd.Series, codes: np.ndarray) -> np.ndarray:
+    """Canton code of each zip code (``NO_CANTON`` for missing or invalid ones)."""
+    values = pd.to_numeric(zips, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    valid = (values >= 0) & (values < N_ZIP_SLOTS)
+    slots = np.where(valid, values, 0).astype(np.intp)
+    return np.where(valid, codes[slots], NO_CANTON).astype(np.int8)
+
+
+def _head(values, n: int = 10) -> str:
+    shown = ", ".join(str(int(v)) for v in values[:n])
+    return shown + (", ..." if len(values) > n else "")
+
+
+def _read_listings(path: str) -> pd.DataFrame:
+    """Listing columns of a scraper or stored file, typed as in ``read_scraper_batch``."""
+    # The url is text even in a file where no listing has one, so that
+    # listing_keys hashes the same row the same way in any file
+    dtype = {col: t for col, t in LISTING_DTYPES.items() if col in SCRAPER_COLUMNS}
+    dtype["url"] = "str"
+    return pd.read_csv(path, usecols=SCRAPER_COLUMNS, dtype=dtype, na_values=["N/A"])[SCRAPER_COLUMNS]
+
+
+def read_scraper_batch(path: str, canton: bool = False, zip_codes_path: str = None) -> pd.DataFrame:
+    """
+    Read a scraper output file with the listing schema.
+
+    Missing values written by the scraper ('N/A') are read as NaN. With
+    ``canton=True`` the canton is added on the fly from the zip code (see
+    ``assign_canton``), so no enriched copy of the file needs to be kept.
+    """
+    df = _read_listings(path)
+    if canton:
+        df = assign_canton(df, zip_codes_path)
+    return df
+
+
+def _keys_path(target: str) -> str:
+    """Location of the listing-key index of a stored listing file."""
+    directory, filename = os.path.split(os.path.abspath(target))
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, CACHE_DIRNAME, stem + "-keys.feather")
+
+
+def _known_keys(target: str) -> list:
+    """
+    Listing keys (``clean.listing_keys``) already stored in ``target``, as
+    sorted arrays.
+
+    The keys are kept in a small index next to the columnar cache: one file
+    for the keys of the stored rows plus one delta per ingested batch, so
+    they are read back without parsing the listing file and each batch only
+    writes its own keys. Past ``MAX_CACHE_DELTAS`` batches the index is
+    rewritten as one file. It is rebuilt from the listing file if that was
+    modified outside of ``ingest_batch``.
+    """
+    path = _keys_path(target)
+    if os.path.exists(path):
+        try:
+            tables, stored = _read_tables(path)
+            if _same_state(stored, _stat_fingerprint(target)):
+                if len(tables) - 1 > MAX_CACHE_DELTAS:
+                    keys = np.unique(np.concatenate([t.column("key").to_numpy() for t in tables]))
+                    _write_cache(pd.DataFrame({"key": keys}), path, stored)
+                    return [keys]
+                return [chunk.to_numpy() for t in tables for chunk in t.column("key").chunks]
+        except Exception:
+            pass
+
+    keys = np.unique(listing_keys(_read_listings(target)))
+    _write_cache(pd.DataFrame({"key": keys}), path, _stat_fingerprint(target))
+    return [keys]
+
+
+def _is_known(known: list, keys: np.ndarray) -> np.ndarray:
+    """Whether each key is in one of the sorted arrays of ``known`` (binary search)."""
+    found = np.zeros(len(keys), dtype=bool)
+    for values in known:
+        if len(values):
+            positions = np.searchsorted(values, keys).clip(max=len(values) - 1)
+            found |= values[positions] == keys
+    return found
+
+
+def ingest_batch(batch_path: str, market: str, target_path: str = None,
+                 zip_codes_path: str = None) -> pd.DataFrame:
+    """
+    Append the new listings of a scraper output file to a stored listing file.
+
+    Listings are matched on their key (``clean.listing_keys``): the homegate
+    listing ID in ``url``, or for rows without an ID a hash of all their
+    values. Rows whose key is already stored, or repeated within the batch,
+    are skipped, so ingesting the same file twice adds nothing. New rows get
+    their canton from their zip code and are appended to the CSV. The
+    columnar cache of the file and the index of stored keys each get the
+    new rows as a delta file, merged when read, so the cost of a batch
+    grows with the batch rather than with the history.
+
+    The returned rows can be used to bring aggregates up to date as well
+    (``ListingCube.append``, ``ZipIndex.append``, ``QuantileSketch.update``).
+
+    Parameters
+    ----------
+    batch_path : str
+        Scraper output (columns zip, url, price_chf, rooms, area_m2).
+    market : str
+        'rent' or 'buy'.
+    target_path : str, optional
+        Stored listing file. By default the market's file in ``data_raw/``.
+    zip_codes_path : str, optional
+        Zip code to canton table. By default ``data_raw/zip_codes_selected.csv``.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The appended rows, with the listing schema.
+    """
+    if market not in MARKET_FILES:
+        raise ValueError(f"market must be one of {sorted(MARKET_FILES)}")
+    target = target_path or _raw_data_path(MARKET_FILES[market])
+
+    batch = read_scraper_batch(batch_path)
+    keys = listing_keys(batch)
+
+    # Skip keys already stored and repeats within the batch
+    known = _known_keys(target) if os.path.exists(target) else []
+    keep = ~_is_known(known, keys) & ~pd.Series(keys).duplicated().to_numpy()
+    rows = batch[keep].reset_index(drop=True)
+
+    rows = assign_canton(rows, zip_codes_path)
+    rows = apply_listing_schema(rows)[LISTING_COLUMNS]
+    if rows.empty:
+        return rows
+
+    if not os.path.exists(target):
+        rows.to_csv(target, index=False)
+        return rows
+
+    before = _stat_fingerprint(target)
+    with open(target, "rb+") as f:
+        # Start the new rows on their own line
+        if f.seek(0, os.SEEK_END) > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+    rows.to_csv(target, mode="a", header=False, index=False)
+
+    after = _stat_fingerprint(target)
+    _append_cache_delta(rows, _cache_path(target, LISTING_DTYPES), before, after)
+    # Without an up-to-date index to extend, it is rebuilt at the next batch
+    _append_cache_delta(pd.DataFrame({"key": np.sort(keys[keep])}), _keys_path(target), before, after)
+    return rows
@@ -0,0 +1,181 @@
+import numpy as np
+import pandas as pd
+
+# Aggregation engines of the metric functions: 'pandas' runs a generic
+# groupby, 'numpy' the integer-coded reductions of this module
+ENGINES = ("pandas", "numpy")
+
+# Integer keys whose range is below this limit are coded by offset and
+# counted in a dense array; wider ones (or other dtypes) are hashed
+DENSE_LIMIT = 1 << 22
+
+
+def _check_engine(engine: str) -> None:
+    if engine not in ENGINES:
+        raise ValueError("engine must be 'pandas' or 'numpy'.")
+
+
+def _column_codes(values: pd.Series):
+    """
+    Integer code of each value (-1 when missing) and the number of codes.
+
+    Codes follow the order pandas sorts the groups in: category order for a
+    categorical (canton), numeric order for integers (zip code, buckets).
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), len(values.cat.categories)
+    if isinstance(values.dtype, np.dtype) and values.dtype.kind in "iub" and len(values):
+        array = values.to_numpy()
+        low, high = int(array.min()), int(array.max())
+        if high - low < DENSE_LIMIT:
+            return array.astype(np.int64) - low, high - low + 1
+    codes, uniques = pd.factorize(values, sort=True)
+    return codes.astype(np.int64), len(uniques)
+
+
+def _compress(combined: np.ndarray, size: int):
+    """Renumber the used codes of ``combined`` as 0..n-1, keeping their order."""
+    valid = combined >= 0
+    all_valid = bool(valid.all())
+    used = combined if all_valid else combined[valid]
+    if size <= max(DENSE_LIMIT, 2 * len(combined)):
+        present = np.bincount(used, minlength=size) > 0
+        if present.all():
+            return combined, size
+        n, remap = int(present.sum()), np.cumsum(present) - 1
+        used = remap[used]
+    else:
+        used, uniques = pd.factorize(used, sort=True)
+        n = len(uniques)
+    if all_valid:
+        return used, n
+    codes = np.full(len(combined), -1, dtype=np.int64)
+    codes[valid] = used
+    return codes, n
+
+
+def _combine(columns: list):
+    """Group code of each row from the (codes, size) of each key column."""
+    combined, size = columns[0]
+    for codes, n in columns[1:]:
+        # Renumber first if the mixed-radix code could overflow int64
+        if size * n >= 1 << 62:
+            combined, size = _compress(combined, size)
+        missing = (combined < 0) | (codes < 0)
+        combined = np.where(missing, -1, combined.astype(np.int64) * n + codes)
+        size *= n
+    return _compress(combined, size)
+
+
+class GroupIndex:
+    """
+    Rows of a DataFrame coded by group, for repeated aggregations.
+
+    The key columns are turned once into small integer codes: a categorical
+    canton keeps its category codes, integer keys such as the zip code are
+    offset into a dense range, and several keys are combined into a single
+    code. Sums, counts and means per group are then ``np.bincount``
+    reductions, and medians come from one sort of the values by group.
+    Nothing is hashed again from one reduction to the next.
+
+    Groups are those of ``df.groupby(by, observed=True)``: only key
+    combinations present in the data, rows with a missing key left out, in
+    sorted key order.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Data with the key columns.
+    by : str or list of str
+        Grouping column(s), e.g. 'canton' or ['zip_code', 'canton'].
+    """
+
+    def __init__(self, df: pd.DataFrame, by):
+        by = [by] if isinstance(by, str) else list(by)
+        missing = [col for col in by if col not in df.columns]
+        if missing:
+            raise ValueError(f"DataFrame must contain the grouping columns {missing}.")
+        self.by = by
+        codes, self.n_groups = _combine([_column_codes(df[col]) for col in by])
+        # np.bincount counts intp codes directly; narrower ones are cast on every call
+        self.codes = codes.astype(np.intp, copy=False)
+        valid = self.codes >= 0
+        # None when every row has a group: reductions then skip the filtering
+        self._valid = None if valid.all() else valid
+
+        self._size = None
+
+        # Any row of a group has the group's keys: take one per group
+        rows = np.empty(self.n_groups, dtype=np.int64)
+        rows[self.codes[valid]] = np.flatnonzero(valid)
+        self.keys = df[by].iloc[rows].reset_index(drop=True)
+
+    def __len__(self) -> int:
+        return self.n_groups
+
+    def _float(self, values) -> np.ndarray:
+        if isinstance(values, pd.Series) and values.dtype != np.float64:
+            values = values.to_numpy(dtype="float64", na_value=np.nan)
+        values = np.asarray(values, dtype="float64")
+        if len(values) != len(self.codes):
+            raise ValueError("values must have one entry per row of the grouped DataFrame.")
+        return values
+
+    def size(self) -> np.ndarray:
+        """Number of rows of each group."""
+        if self._size is None:
+            codes = self.codes if self._valid is None else self.codes[self._valid]
+            self._size = np.bincount(codes, minlength=self.n_groups)
+        return self._size.copy()
+
+    def count(self, values) -> np.ndarray:
+        """Number of non-missing values of each group."""
+        missing = np.isnan(self._float(values))
+        if self._valid is None:
+            # Usually few values are missing: count those rather than the others
+            return self.size() - np.bincount(self.codes[missing], minlength=self.n_groups)
+        return np.bincount(self.codes[self._valid & ~missing], minlength=self.n_groups)
+
+    def sum(self, values) -> np.ndarray:
+        """Sum of the non-missing values of each group (0 if none)."""
+        values = self._float(values)
+        missing = np.isnan(values)
+        if self._valid is None:
+            # Missing values weigh 0, so all the codes are used as they are
+            if missing.any():
+                values = values.copy()
+                values[missing] = 0.0
+            return np.bincount(self.codes, weights=values, minlength=self.n_groups)
+        keep = self._valid & ~missing
+        return np.bincount(self.codes[keep], weights=values[keep], minlength=self.n_groups)
+
+    def mean(self, values) -> np.ndarray:
+        """Mean of the non-missing values of each group (NaN if none)."""
+        values = self._float(values)
+        counts, sums = self.count(values), self.sum(values)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+    def median(self, values) -> np.ndarray:
+        """Median of the non-missing values of each group (NaN if none)."""
+        values = self._float(values)
+        keep = ~np.isnan(values)
+        if self._valid is not None:
+            keep &= self._valid
+        codes, values = self.codes[keep], values[keep]
+
+        # Sort by group, then by value: each group is a sorted segment
+        values = values[np.lexsort((values, codes))]
+        counts = np.bincount(codes, minlength=self.n_groups)
+        starts = np.cumsum(counts) - counts
+
+        out = np.full(self.n_groups, np.nan)
+        has_values = counts > 0
+        lower = (starts + (counts - 1) // 2)[has_values]
+        upper = (starts + counts // 2)[has_values]
+        out[has_values] = (values[lower] + values[upper]) / 2
+        return out
+
+    def to_frame(self, **columns) -> pd.DataFrame:
+        """The group keys, one row per group, with extra per-group columns."""
+        return self.keys.assign(**columns)
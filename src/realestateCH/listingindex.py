@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+
+# Range filter -> indexed column
+RANGE_COLUMNS = {"rooms": "rooms", "price": "price_chf", "area": "area_m2"}
+
+
+def _float_values(values: pd.Series) -> np.ndarray:
+    """Float values of a column (NaN when missing), without a copy for float columns."""
+    if isinstance(values.dtype, np.dtype) and values.dtype.kind == "f":
+        return values.to_numpy()
+    return values.to_numpy(dtype="float64", na_value=np.nan)
+
+
+class ListingIndex:
+    """
+    Canton and range index over a listings DataFrame.
+
+    Rows are grouped by canton, and within each canton the positions of the
+    rows are kept sorted by rooms, by price and by area. A range filter on
+    one column is then two binary searches per canton, giving a contiguous
+    run of positions. With several range filters, the narrowest run is
+    scanned and its rows are checked against the other ranges, so a query
+    costs time in proportion to the rows it touches, not to the size of the
+    frame.
+
+    The frame itself is neither copied nor reordered: queries return row
+    positions (``rows``), and ``select`` takes just those rows.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Listings with 'canton' and any of 'rooms', 'price_chf' and
+        'area_m2'.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        if "canton" not in df.columns:
+            raise ValueError("DataFrame must contain a 'canton' column.")
+        self.frame = df
+
+        canton = df["canton"].astype("category")
+        self._canton_index = {c: i for i, c in enumerate(canton.cat.categories)}
+        # Segment 0 holds the rows without a canton, segment k + 1 canton k
+        # (int16, so that the stable sorts by segment below are radix sorts)
+        segment = canton.cat.codes.to_numpy().astype(np.int16) + 1
+        counts = np.bincount(segment, minlength=len(self._canton_index) + 1)
+        self._starts = np.concatenate([[0], np.cumsum(counts)])
+
+        dtype = np.int32 if len(df) < np.iinfo(np.int32).max else np.int64
+        self._by_canton = np.argsort(segment, kind="stable").astype(dtype)
+        self._values, self._positions, self._sorted, self._ends = {}, {}, {}, {}
+        for name, col in RANGE_COLUMNS.items():
+            if col not in df.columns:
+                continue
+            values = _float_values(df[col])
+            # Sort by value, then stably by canton: each canton is a run of
+            # positions sorted by value, missing values at the end
+            order = np.argsort(values)
+            order = order[np.argsort(segment[order], kind="stable")]
+            missing = np.bincount(segment[np.isnan(values)], minlength=len(counts))
+            self._values[name] = values
+            self._positions[name] = order.astype(dtype)
+            self._sorted[name] = values[order]
+            self._ends[name] = self._starts[1:] - missing
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def _segments(self, cantons) -> list:
+        if not cantons:
+            return list(range(len(self._starts) - 1))
+        return [self._canton_index[c] + 1 for c in dict.fromkeys(cantons) if c in self._canton_index]
+
+    def _run(self, name: str, segment: int, low, high):
+        """Positions (into the sorted column) of a canton's values within [low, high]."""
+        start, end = self._starts[segment], self._ends[name][segment]
+        values = self._sorted[name][start:end]
+        first = start + (np.searchsorted(values, low, "left") if low is not None else 0)
+        last = start + (np.searchsorted(values, high, "right") if high is not None else len(values))
+        return first, max(first, last)
+
+    def rows(self, cantons=None, rooms=(None, None), price=(None, None), area=(None, None)) -> np.ndarray:
+        """
+        Positions of the listings that match the filters.
+
+        Parameters
+        ----------
+        cantons : list, optional
+            Only keep these cantons (all cantons if None or empty).
+        rooms, price, area : tuple, optional
+            (min, max) number of rooms, price in CHF and area in m²,
+            inclusive; None for an open bound. Listings with a missing value
+            only match when both bounds are open.
+
+        Returns
+        -------
+        numpy.ndarray
+            Increasing row positions in ``frame``, as
+            ``np.flatnonzero(mask)`` for the equivalent boolean mask.
+        """
+        ranges = {
+            name: bounds for name, bounds in (("rooms", rooms), ("price", price), ("area", area))
+            if bounds is not None and tuple(bounds) != (None, None)
+        }
+        for name in ranges:
+            if name not in self._positions:
+                raise ValueError(f"DataFrame has no '{RANGE_COLUMNS[name]}' column to filter on.")
+
+        parts = []
+        for segment in self._segments(cantons):
+            if not ranges:
+                parts.append(self._by_canton[self._starts[segment]:self._starts[segment + 1]])
+                continue
+
+            # Scan the narrowest run, check the other ranges on its rows
+            runs = {name: self._run(name, segment, *bounds) for name, bounds in ranges.items()}
+            narrowest = min(runs, key=lambda name: runs[name][1] - runs[name][0])
+            rows = self._positions[narrowest][slice(*runs[narrowest])]
+            for name, (low, high) in ranges.items():
+                if name == narrowest or len(rows) == 0:
+                    continue
+                values = self._values[name][rows]
+                keep = np.ones(len(rows), dtype=bool)
+                if low is not None:
+                    keep &= values >= low
+                if high is not None:
+                    keep &= values <= high
+                rows = rows[keep]
+            parts.append(rows)
+
+        rows = np.concatenate(parts) if parts else np.empty(0, dtype=self._by_canton.dtype)
+        rows.sort()
+        return rows
+
+    def select(self, cantons=None, rooms=(None, None), price=(None, None), area=(None, None)) -> pd.DataFrame:
+        """
+        Listings that match the filters (see ``rows``), as ``df[mask]``
+        would give them. Only the matching rows are copied.
+        """
+        return self.frame.take(self.rows(cantons, rooms, price, area))
+
+    def count(self, cantons=None, rooms=(None, None), price=(None, None), area=(None, None)) -> int:
+        """Number of listings that match the filters."""
+        return len(self.rows(cantons, rooms, price, area))
@@ -1,43 +1,463 @@
-import pandas as pd
+import hashlib
+import json
 import os
 
-def load_data(path: str):
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+# Cached copies of the CSV files are written as uncompressed Feather
+# (Arrow IPC) files in this folder, next to the source CSV.
+CACHE_DIRNAME = ".cache"
+
+# Key under which the source CSV fingerprint is stored in the Arrow metadata
+_CACHE_META_KEY = b"realestateCH.source"
+
+# Rows appended to a cached CSV are cached in delta files merged on read;
+# past this many deltas the cache is rewritten as a single file
+MAX_CACHE_DELTAS = 16
+
+
+def load_data(path: str, dtype: dict = None, columns: list = None, cache: bool = True):
     """
     Load a CSV file into a pandas DataFrame.
 
+    The first load writes a typed columnar copy of the CSV (Feather / Arrow
+    IPC) into a ``.cache`` folder next to the file. Later loads read that copy
+    instead of parsing the CSV again. The copy is rebuilt only when the CSV's
+    modification time and content hash change.
+
     Parameters
     ----------
     path : str
         Path to the CSV file.
+    dtype : dict, optional
+        Column types applied while parsing, e.g. ``schema.LISTING_DTYPES``.
+        Each dtype mapping gets its own cache file.
+    columns : list, optional
+        Only return these columns. With the cache, the other columns are not
+        read from disk at all.
+    cache : bool, optional
+        Read and write the columnar cache (default True). Use False to always
+        parse the CSV.
 
     Returns
     -------
     pandas.DataFrame
         Loaded dataset.
     """
-    return pd.read_csv(path)
+    if not cache:
+        return pd.read_csv(path, dtype=dtype, usecols=columns)
+
+    cache_path = _cache_path(path, dtype)
+    df = _read_cache(path, cache_path, columns)
+    if df is None:
+        df = pd.read_csv(path, dtype=dtype)
+        _write_cache(df, cache_path, _source_fingerprint(path))
+        if columns is not None:
+            df = df[list(columns)]
+    return df
+
+
+def _cache_path(path, dtype: dict = None) -> str:
+    """Location of the columnar cache file for a given CSV and dtype mapping."""
+    directory, filename = os.path.split(os.path.abspath(path))
+    stem = os.path.splitext(filename)[0]
+    if dtype:
+        signature = repr(sorted((col, repr(t)) for col, t in dtype.items()))
+        stem += "-" + hashlib.sha256(signature.encode()).hexdigest()[:12]
+    return os.path.join(directory, CACHE_DIRNAME, stem + ".feather")
+
+
+def _file_sha256(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _source_fingerprint(path) -> dict:
+    """Size, modification time and content hash of the source CSV."""
+    stat = os.stat(path)
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": _file_sha256(path),
+    }
+
+
+def _delta_paths(cache_path) -> list:
+    """Delta files appended to a cache file, in the order they were written."""
+    directory, filename = os.path.split(cache_path)
+    prefix = filename + ".delta-"
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    return sorted(
+        os.path.join(directory, name) for name in names
+        if name.startswith(prefix) and not name.endswith(".tmp")
+    )
+
+
+def _same_state(a: dict, b: dict) -> bool:
+    return a.get("size") == b.get("size") and a.get("mtime_ns") == b.get("mtime_ns")
+
+
+def _read_tables(cache_path, columns: list = None):
+    """
+    Tables of a cache file and of its deltas, and the source fingerprint they
+    add up to.
+
+    Each delta holds the rows appended to the source between two states of
+    the file ('before' and 'after' fingerprints). Deltas are chained from
+    the fingerprint of the cache file; a delta that does not continue the
+    chain (left over from an older cache) ends it.
+    """
+    base = feather.read_table(cache_path, columns=columns, memory_map=True)
+    stored = json.loads(base.schema.metadata[_CACHE_META_KEY])
+    tables = [base]
+    for delta_path in _delta_paths(cache_path):
+        delta = feather.read_table(delta_path, columns=columns, memory_map=True)
+        states = json.loads(delta.schema.metadata[_CACHE_META_KEY])
+        if not _same_state(states["before"], stored):
+            break
+        tables.append(delta.replace_schema_metadata(base.schema.metadata))
+        stored = states["after"]
+    return tables, stored
+
+
+def _read_cache(path, cache_path, columns: list = None):
+    """
+    Return the cached DataFrame for ``path``, or None if the cache is missing
+    or stale.
+
+    The cheap check (size + mtime) is tried first. If only the mtime changed
+    but the content hash is identical, the cache is still used and its
+    fingerprint is refreshed so the hash is not recomputed next time. Rows
+    appended by ``ingest.ingest_batch`` are kept in delta files merged here;
+    past ``MAX_CACHE_DELTAS`` of them the cache is rewritten as one file.
+    """
+    if not os.path.exists(cache_path):
+        return None
+
+    try:
+        tables, stored = _read_tables(cache_path, columns)
+    except Exception:
+        # Unreadable or foreign file: rebuild it
+        return None
+
+    stat = os.stat(path)
+    if stored.get("size") == stat.st_size and stored.get("mtime_ns") == stat.st_mtime_ns:
+        df = pa.concat_tables(tables).to_pandas()
+        if len(tables) - 1 > MAX_CACHE_DELTAS:
+            full = df if columns is None else _read_full_cache(cache_path)
+            _write_cache(full, cache_path, stored)
+        return df
+
+    current = _source_fingerprint(path)
+    if stored.get("sha256") != current["sha256"]:
+        return None
+
+    # Same content, new mtime: refresh the fingerprint of the full file
+    _write_cache(_read_full_cache(cache_path), cache_path, current)
+    return pa.concat_tables(tables).to_pandas()
+
+
+def _read_full_cache(cache_path) -> pd.DataFrame:
+    return pa.concat_tables(_read_tables(cache_path)[0]).to_pandas()
+
+
+def _write_cache(df: pd.DataFrame, cache_path, fingerprint: dict):
+    """
+    Write ``df`` to the columnar cache together with the source fingerprint.
+
+    The file is written to a temporary name and moved into place so readers
+    never see a half-written cache; its deltas, now part of it, are removed.
+    Failing to write the cache (read-only folder, unsupported column
+    type...) is not an error: the data was already loaded from the CSV.
+    """
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[_CACHE_META_KEY] = json.dumps(fingerprint).encode()
+        table = table.replace_schema_metadata(metadata)
+        feather.write_feather(table, tmp_path, compression="uncompressed")
+        os.replace(tmp_path, cache_path)
+        for delta_path in _delta_paths(cache_path):
+            os.remove(delta_path)
+    except (OSError, pa.ArrowException):
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _append_cache_delta(df: pd.DataFrame, cache_path, before: dict, after: dict) -> bool:
+    """
+    Add the rows of ``df``, appended to the source file between the states
+    ``before`` and ``after``, to its cache as a new delta file.
+
+    Only the new rows are written, so the cost grows with them rather than
+    with the cache. Nothing is written (and False returned) if the cache
+    was not up to date with ``before``: it is then rebuilt at the next load.
+    """
+    try:
+        tables, stored = _read_tables(cache_path)
+        if not _same_state(stored, before):
+            return False
+        schema = tables[0].schema
+        table = pa.Table.from_pandas(df, preserve_index=False).select(schema.names).cast(schema)
+        metadata = dict(schema.metadata)
+        metadata[_CACHE_META_KEY] = json.dumps({"before": before, "after": after}).encode()
+        table = table.replace_schema_metadata(metadata)
+    except Exception:
+        return False
+
+    deltas = _delta_paths(cache_path)
+    number = int(deltas[-1].rsplit("-", 1)[1]) + 1 if deltas else 1
+    delta_path = f"{cache_path}.delta-{number:06d}"
+    tmp_path = f"{delta_path}.{os.getpid()}.tmp"
+    try:
+        feather.write_feather(table, tmp_path, compression="uncompressed")
+        os.replace(tmp_path, delta_path)
+    except (OSError, pa.ArrowException):
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+    return True
+
 
 from .clean import clean_data
+from .schema import CANTON_DTYPE, CANTONS, LISTING_DTYPES
 
-def load_rent_data():
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_root = os.path.dirname(os.path.dirname(script_dir))
-    
-    # FIXED: changed 'Cantons' to 'Canton'
-    file_path = os.path.join(project_root, 'data_raw', 'Total-Rent-WithCanton.csv')
-    
-    print(f"Loading rent data from: {file_path}")
-    df = pd.read_csv(file_path)
-    return df
+# Listing files shipped in data_raw/, by market
+MARKET_FILES = {
+    "rent": "Total-Rent-WithCanton.csv",
+    "buy": "Total-Buy-WithCanton.csv",
+}
 
-def load_buy_data():
+def _raw_data_path(filename: str) -> str:
     script_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.dirname(os.path.dirname(script_dir))
-    
+    return os.path.join(project_root, 'data_raw', filename)
+
+def _load_market(market: str, include_url: bool) -> pd.DataFrame:
     # FIXED: changed 'Cantons' to 'Canton'
-    file_path = os.path.join(project_root, 'data_raw', 'Total-Buy-WithCanton.csv')
-    
-    print(f"Loading buy data from: {file_path}")
-    df = pd.read_csv(file_path)
-    return df
+    file_path = _raw_data_path(MARKET_FILES[market])
+
+    print(f"Loading {market} data from: {file_path}")
+    columns = None
+    if not include_url:
+        # Every listing column except url is part of the schema
+        columns = list(LISTING_DTYPES)
+    return load_data(file_path, dtype=LISTING_DTYPES, columns=columns)
 
+def load_rent_data(include_url: bool = True):
+    """
+    Load the rent listings with the declared listing schema
+    (see ``realestateCH.schema.LISTING_DTYPES``).
+
+    Parameters
+    ----------
+    include_url : bool, optional
+        Set to False to skip the ``url`` column, by far the largest one.
+        It can be fetched later with ``load_listing_urls("rent")``.
+
+    Returns
+    -------
+    pandas.DataFrame
+    """
+    return _load_market("rent", include_url)
+
+def load_buy_data(include_url: bool = True):
+    """
+    Load the buy listings with the declared listing schema
+    (see ``realestateCH.schema.LISTING_DTYPES``).
+
+    Parameters
+    ----------
+    include_url : bool, optional
+        Set to False to skip the ``url`` column, by far the largest one.
+        It can be fetched later with ``load_listing_urls("buy")``.
+
+    Returns
+    -------
+    pandas.DataFrame
+    """
+    return _load_market("buy", include_url)
+
+def load_listing_urls(market: str) -> pd.Series:
+    """
+    Load only the listing URLs of a market ("rent" or "buy").
+
+    The returned Series shares the row index of ``load_rent_data`` /
+    ``load_buy_data``, so it can be joined back onto a frame loaded with
+    ``include_url=False`` (also after filtering).
+    """
+    if market not in MARKET_FILES:
+        raise ValueError(f"market must be one of {sorted(MARKET_FILES)}")
+    file_path = _raw_data_path(MARKET_FILES[market])
+    return load_data(file_path, dtype=LISTING_DTYPES, columns=["url"])["url"]
+
+
+# Columns of the shared (memory-mapped) listing files
+SHARED_COLUMNS = ["canton", "zip_code", "rooms", "price_chf", "area_m2"]
+
+# Shared frames mapped by this process, by market: (source fingerprint, frame)
+_shared_frames = {}
+
+
+def _write_shared(df: pd.DataFrame, path: str, fingerprint: dict = None) -> None:
+    """
+    Write a listings frame as an uncompressed Feather file that workers can
+    memory-map without copying.
+
+    Missing floats are stored as NaN rather than Arrow nulls, the canton as
+    dictionary codes (those of ``CANTON_DTYPE`` when every value is a
+    canton abbreviation), and the whole table as a single record batch (Feather
+    otherwise splits it every 64K rows), so every column is one contiguous
+    buffer of the file that maps straight onto a NumPy array. The file is
+    written to a temporary name and moved into place, so processes mapping
+    the previous version keep a consistent view.
+    """
+    df = df.rename(columns={"zip": "zip_code"})
+    arrays, names = [], []
+    for col in SHARED_COLUMNS:
+        if col not in df.columns:
+            continue
+        values = df[col]
+        if col == "canton":
+            canton = values.astype("category")
+            if canton.cat.categories.isin(CANTONS).all():
+                # Codes of the listing schema, so the mapped column needs no recoding
+                canton = canton.astype(CANTON_DTYPE)
+            array = pa.DictionaryArray.from_arrays(
+                pa.array(canton.cat.codes.to_numpy()), pa.array(list(canton.cat.categories.astype(str)))
+            )
+        elif col == "zip_code":
+            array = pa.array(values.to_numpy())
+        else:
+            dtype = values.dtype if pd.api.types.is_float_dtype(values) else "float64"
+            array = pa.array(values.to_numpy(dtype=dtype, na_value=np.nan), from_pandas=False)
+        arrays.append(array)
+        names.append(col)
+
+    table = pa.table(arrays, names=names)
+    if fingerprint is not None:
+        table = table.replace_schema_metadata({_CACHE_META_KEY: json.dumps(fingerprint).encode()})
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        feather.write_feather(table, tmp_path, compression="uncompressed", chunksize=max(1, len(table)))
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _map_shared(path: str) -> pd.DataFrame:
+    """
+    Zero-copy DataFrame over a file written by ``_write_shared``.
+
+    Each column is a NumPy view of its buffer in the mapped file: nothing is
+    combined or converted, which would copy the column into this process.
+    """
+    table = feather.read_table(path, memory_map=True)
+    columns = {}
+    for name in table.column_names:
+        chunks = table.column(name).chunks
+        if len(chunks) > 1:
+            raise ValueError(f"{path} is not a single record batch: rewrite it with _write_shared.")
+        array = chunks[0] if chunks else table.column(name).combine_chunks()
+        if name == "canton":
+            codes = array.indices.to_numpy(zero_copy_only=True)
+            categories = array.dictionary.to_pylist()
+            if categories == list(CANTONS):
+                columns[name] = pd.Categorical.from_codes(codes, dtype=CANTON_DTYPE)
+            else:
+                columns[name] = pd.Categorical.from_codes(codes, categories=categories)
+        else:
+            columns[name] = array.to_numpy(zero_copy_only=True)
+    return pd.DataFrame(columns, copy=False)
+
+
+def _stat_fingerprint(path) -> dict:
+    """
+    Size and modification time of a file, without the content hash of
+    ``_source_fingerprint``, which would cost a full read of the file.
+    """
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def shared_data_path(market: str) -> str:
+    """
+    Location of the shared listing file of a market ("rent" or "buy"),
+    written from the listing CSV if missing or older than the CSV.
+
+    The file sits in the ``.cache`` folder next to the CSV, so every process
+    on the machine (dashboard workers, batch jobs) maps the same file.
+    """
+    if market not in MARKET_FILES:
+        raise ValueError(f"market must be one of {sorted(MARKET_FILES)}")
+    source = _raw_data_path(MARKET_FILES[market])
+    directory, filename = os.path.split(source)
+    path = os.path.join(directory, CACHE_DIRNAME, os.path.splitext(filename)[0] + "-shared.feather")
+
+    fingerprint = _stat_fingerprint(source)
+    if os.path.exists(path):
+        try:
+            table = feather.read_table(path, memory_map=True)
+            stored = json.loads((table.schema.metadata or {})[_CACHE_META_KEY])
+            # Files of older versions were split in record batches, which
+            # cannot be mapped without a copy, or had a canton dictionary
+            # other than the schema's: rewrite those too
+            cantons = table.column("canton").chunks if "canton" in table.column_names else []
+            current = table.column(0).num_chunks <= 1 and all(
+                chunk.dictionary.to_pylist() == list(CANTONS) for chunk in cantons
+            )
+            if stored == fingerprint and current:
+                return path
+        except Exception:
+            # Unreadable or foreign file: rebuild it
+            pass
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _write_shared(_load_market(market, include_url=False), path, fingerprint)
+    return path
+
+
+def load_shared_data(market: str) -> pd.DataFrame:
+    """
+    Listings of a market ("rent" or "buy") as a read-only DataFrame over a
+    memory-mapped file.
+
+    The columns are NumPy views of the file pages (the canton as categorical
+    codes), so the operating system shares one copy of the data between all
+    the processes that map it: adding a dashboard replica or a batch worker
+    costs almost no extra memory. Within a process the same frame is
+    returned until the listing CSV changes; hold it with
+    ``st.cache_resource`` rather than ``st.cache_data``, which would copy it.
+
+    Parameters
+    ----------
+    market : str
+        'rent' or 'buy'.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Columns canton, zip_code, rooms, price_chf and area_m2, with the
+        listing schema dtypes (the canton as ``CANTON_DTYPE``). The arrays are read-only: copy the frame
+        before modifying it.
+    """
+    if market not in MARKET_FILES:
+        raise ValueError(f"market must be one of {sorted(MARKET_FILES)}")
+    fingerprint = _stat_fingerprint(_raw_data_path(MARKET_FILES[market]))
+    cached = _shared_frames.get(market)
+    if cached is None or cached[0] != fingerprint:
+        cached = (fingerprint, _map_shared(shared_data_path(market)))
+        _shared_frames[market] = cached
+    return cached[1]
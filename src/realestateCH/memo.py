@@ -0,0 +1,325 @@
+import copy
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# Part of every cache key: bump it when a metric's results change, so that
+# results stored on disk by an older version are not reused
+CACHE_VERSION = 1
+
+# Default size budgets of the in-memory and on-disk tiers
+DEFAULT_MAX_BYTES = 256 * 2**20
+DEFAULT_MAX_DISK_BYTES = 2 * 2**30
+
+# Columns a metric reads from its input frames. Only these are hashed for
+# the cache key; functions not listed here have all their columns hashed.
+METRIC_COLUMNS = {
+    "average_rent_per_m2_by_canton": ("canton", "price_chf", "area_m2"),
+    "rank_cantons_by_rent": ("canton", "price_chf", "area_m2"),
+    "rank_cantons_visual": ("canton", "price_chf", "area_m2"),
+}
+
+
+def _update_with_values(digest, values) -> None:
+    """Feed the contents of a Series or Index to a hash."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        categorical = values.array
+        digest.update(repr(list(categorical.categories)).encode())
+        digest.update(np.ascontiguousarray(categorical.codes).data)
+    elif isinstance(values.dtype, np.dtype) and values.dtype != object:
+        # Plain NumPy buffers are hashed as they are, without a copy
+        digest.update(np.ascontiguousarray(values.to_numpy()).data)
+    elif hasattr(values.array, "__arrow_array__"):
+        # Arrow-backed columns (strings such as 'url'): hash the Arrow buffers
+        chunks = values.array.__arrow_array__()
+        for chunk in chunks.chunks if isinstance(chunks, pa.ChunkedArray) else [chunks]:
+            digest.update(repr((chunk.offset, len(chunk))).encode())
+            for buffer in chunk.buffers():
+                if buffer is not None:
+                    digest.update(buffer)
+    else:
+        digest.update(pd.util.hash_pandas_object(values, index=False).to_numpy().data)
+
+
+def frame_fingerprint(df, columns=None) -> str:
+    """
+    Content fingerprint of a DataFrame or Series.
+
+    Column names, dtypes, the index and the raw values are hashed (SHA-256).
+    NumPy and Arrow columns are hashed straight from their buffers, so the
+    cost is one pass over the bytes of the hashed columns.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame or pandas.Series
+        Frame to fingerprint.
+    columns : sequence of str, optional
+        Only hash these columns (those present in ``df``); the list of all
+        column names is always part of the fingerprint.
+
+    Returns
+    -------
+    str
+        Hex digest; equal frames have equal fingerprints.
+    """
+    digest = hashlib.sha256()
+    if isinstance(df, pd.Series):
+        df = df.to_frame(name=("series", df.name))
+    digest.update(repr((len(df), list(df.columns))).encode())
+
+    index = df.index
+    if isinstance(index, pd.RangeIndex):
+        digest.update(repr((index.start, index.stop, index.step)).encode())
+    else:
+        for level in range(index.nlevels):
+            _update_with_values(digest, index.get_level_values(level))
+
+    for col in df.columns if columns is None else [c for c in columns if c in df.columns]:
+        digest.update(repr((col, str(df[col].dtype))).encode())
+        _update_with_values(digest, df[col])
+    return digest.hexdigest()
+
+
+def _nbytes(result) -> int:
+    if isinstance(result, pd.DataFrame):
+        return int(result.memory_usage(deep=True).sum())
+    if isinstance(result, pd.Series):
+        return int(result.memory_usage(deep=True))
+    return len(pickle.dumps(result))
+
+
+def _copy(result):
+    # Callers get their own copy: changing it must not change the cache
+    if isinstance(result, (pd.DataFrame, pd.Series)):
+        return result.copy()
+    return copy.deepcopy(result)
+
+
+class MetricCache:
+    """
+    Memoized results of metric functions, keyed on their inputs' content.
+
+    The key of a call is the function, the fingerprint of every DataFrame
+    or Series argument (see ``frame_fingerprint``) and the repr of the
+    other arguments, so the same data gives a hit whichever session, batch
+    job or notebook loaded it. Results live in a bounded in-memory LRU tier and, with a
+    ``directory``, in a pickle file per result that other processes reuse.
+    Both tiers evict their least recently used results once over their
+    size budget.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        Size budget of the in-memory tier. Results larger than this are not
+        kept in memory.
+    directory : str, optional
+        Folder of the on-disk tier (none by default). Only point it at a
+        folder you trust: results are read back with pickle.
+    max_disk_bytes : int, optional
+        Size budget of the on-disk tier.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, directory: str = None,
+                 max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        # Dashboard sessions run in threads of the same process
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "disk_evictions": 0}
+
+    def wrap(self, function, columns=None):
+        """
+        Memoized version of ``function``.
+
+        ``columns`` are the input columns the function reads (default: from
+        ``METRIC_COLUMNS``, else all columns).
+        """
+        if columns is None:
+            columns = METRIC_COLUMNS.get(function.__name__)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            return self._call(function, columns, args, kwargs)
+
+        wrapper.cache = self
+        return wrapper
+
+    def _key(self, function, columns, args, kwargs) -> str:
+        bound = inspect.signature(function).bind(*args, **kwargs)
+        bound.apply_defaults()
+        parts = [CACHE_VERSION, function.__module__, function.__qualname__]
+        for name, value in bound.arguments.items():
+            if isinstance(value, (pd.DataFrame, pd.Series)):
+                parts.append((name, frame_fingerprint(value, columns)))
+            elif isinstance(value, np.ndarray):
+                # The repr of a large array elides values
+                array = np.ascontiguousarray(value)
+                parts.append((name, array.dtype.str, array.shape, hashlib.sha256(array.data).hexdigest()))
+            else:
+                parts.append((name, repr(value)))
+        return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+    def _call(self, function, columns, args, kwargs):
+        key = self._key(function, columns, args, kwargs)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._counts["hits"] += 1
+                return _copy(self._entries[key][0])
+
+        result = self._read_disk(key)
+        if result is not None:
+            with self._lock:
+                self._counts["disk_hits"] += 1
+        else:
+            with self._lock:
+                self._counts["misses"] += 1
+            result = function(*args, **kwargs)
+            self._write_disk(key, result)
+        self._remember(key, result)
+        return _copy(result)
+
+    def _remember(self, key: str, result) -> None:
+        nbytes = _nbytes(result)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = (result, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                _, (_, size) = self._entries.popitem(last=False)
+                self._bytes -= size
+                self._counts["evictions"] += 1
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".pkl")
+
+    def _read_disk(self, key: str):
+        if self.directory is None:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                result = pickle.load(f)
+            # The modification time orders the files for eviction
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Truncated file, or pickled by a version whose classes moved or
+            # changed: a miss, and the file is replaced by the new result
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return result
+
+    def _write_disk(self, key: str, result) -> None:
+        """
+        Store a result on disk, then evict the oldest files over budget.
+
+        As for the columnar cache of ``load_data``, the file is moved into
+        place once written, and failing to write it is not an error.
+        """
+        if self.directory is None:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            self._trim_disk()
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _trim_disk(self) -> None:
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pkl"):
+                stat = entry.stat()
+                files.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self._counts["disk_evictions"] += 1
+
+    def stats(self) -> dict:
+        """
+        Hit and miss counters of the cache.
+
+        Returns
+        -------
+        dict
+            - hits, disk_hits, misses: calls answered from memory, from
+              disk, and computed
+            - hit_rate: share of calls not computed
+            - evictions, disk_evictions: results dropped for size
+            - entries, bytes: results held in memory and their size
+        """
+        with self._lock:
+            stats = dict(self._counts, entries=len(self._entries), bytes=self._bytes)
+        calls = stats["hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + stats["disk_hits"]) / calls if calls else 0.0
+        return stats
+
+    def clear(self, disk: bool = False) -> None:
+        """Drop the in-memory results (and the on-disk ones with ``disk=True``)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if disk and self.directory is not None and os.path.isdir(self.directory):
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".pkl"):
+                    os.remove(entry.path)
+
+
+# Shared by the functions memoized with ``cached`` without an explicit cache
+default_cache = MetricCache()
+
+
+def cached(function, cache: MetricCache = None, columns=None):
+    """
+    Memoized version of a metric function, e.g.
+    ``rank = cached(metrics.rank_cantons_visual)``.
+
+    Parameters
+    ----------
+    function : callable
+        Function of ``realestateCH.metrics`` (or any function whose result
+        depends only on its arguments).
+    cache : MetricCache, optional
+        Cache holding the results (default: ``default_cache``, in memory
+        only).
+    columns : sequence of str, optional
+        Input columns the function reads (see ``MetricCache.wrap``).
+
+    Returns
+    -------
+    callable
+        Same signature as ``function``; ``.cache`` is the cache used.
+    """
+    return (default_cache if cache is None else cache).wrap(function, columns)
@@ -1,51 +1,78 @@
 import pandas as pd
 
-def compute_rent_per_m2(df: pd.DataFrame) -> pd.DataFrame:
+from .kernels import GroupIndex, _check_engine
+
+
+def price_per_m2(df: pd.DataFrame) -> pd.Series:
     """
-    Compute the monthly rent price per square meter.
+    Price per square meter of each listing, as a bare Series.
+
+    Nothing is copied: use this when only the values are needed, e.g. to
+    group them or to add them to a frame yourself.
 
     Parameters
     ----------
     df : pandas.DataFrame
-        Cleaned dataset containing at least 'price_chf' and 'area_m2'.
+        Dataset containing at least 'price_chf' and 'area_m2'.
 
     Returns
     -------
-    pandas.DataFrame
-        DataFrame with an additional column 'rent_per_m2'.
+    pandas.Series
+        price_chf / area_m2, aligned on the index of ``df``.
     """
-    df = df.copy()
-
     if "price_chf" not in df.columns or "area_m2" not in df.columns:
         raise ValueError("DataFrame must contain 'price_chf' and 'area_m2' columns.")
 
-    df["rent_per_m2"] = df["price_chf"] / df["area_m2"]
+    return df["price_chf"] / df["area_m2"]
 
-    return df
+
+def _add_column(df: pd.DataFrame, name: str, values: pd.Series, inplace: bool):
+    if inplace:
+        df[name] = values
+        return None
+    # assign() only copies the existing columns lazily under copy-on-write
+    # (the default from pandas 3.0); on older pandas it deep-copies like copy().
+    return df.assign(**{name: values})
 
 
-def compute_buy_price_per_m2(df: pd.DataFrame) -> pd.DataFrame:
+def compute_rent_per_m2(df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
     """
-    Compute the purchase price per square meter.
+    Compute the monthly rent price per square meter.
 
     Parameters
     ----------
     df : pandas.DataFrame
-        Dataset containing at least 'price_chf' and 'area_m2'.
+        Cleaned dataset containing at least 'price_chf' and 'area_m2'.
+    inplace : bool, optional
+        Add the column to ``df`` itself and return None, instead of returning
+        a new DataFrame.
 
     Returns
     -------
-    pandas.DataFrame
-        DataFrame with an additional column 'buy_price_per_m2'.
+    pandas.DataFrame or None
+        DataFrame with an additional column 'rent_per_m2'.
     """
-    df = df.copy()
+    return _add_column(df, "rent_per_m2", price_per_m2(df), inplace)
 
-    if "price_chf" not in df.columns or "area_m2" not in df.columns:
-        raise ValueError("DataFrame must contain 'price_chf' and 'area_m2' columns.")
 
-    df["buy_price_per_m2"] = df["price_chf"] / df["area_m2"]
+def compute_buy_price_per_m2(df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
+    """
+    Compute the purchase price per square meter.
 
-    return df
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Dataset containing at least 'price_chf' and 'area_m2'.
+    inplace : bool, optional
+        Add the column to ``df`` itself and return None, instead of returning
+        a new DataFrame.
+
+    Returns
+    -------
+    pandas.DataFrame or None
+        DataFrame with an additional column 'buy_price_per_m2'.
+    """
+    return _add_column(df, "buy_price_per_m2", price_per_m2(df), inplace)
 
 
 def compute_price_to_rent_ratio(buy_df: pd.DataFrame, rent_df: pd.DataFrame) -> pd.DataFrame:
@@ -94,7 +121,7 @@ def compute_price_to_rent_ratio(buy_df: pd.DataFrame, rent_df: pd.DataFrame) ->
     return df
 
 
-def average_rent_per_m2_by_canton(df: pd.DataFrame) -> pd.DataFrame:
+def average_rent_per_m2_by_canton(df: pd.DataFrame, engine: str = "pandas") -> pd.DataFrame:
     """
     Compute the average rent price per square meter for each canton.
 
@@ -102,6 +129,10 @@ def average_rent_per_m2_by_canton(df: pd.DataFrame) -> pd.DataFrame:
     ----------
     df : pandas.DataFrame
         Cleaned rent dataset containing 'canton', 'price_chf', and 'area_m2'.
+    engine : {'pandas', 'numpy'}, optional
+        'pandas' runs a groupby; 'numpy' averages with integer canton codes
+        (see ``kernels.GroupIndex``). Both give the same table, up to
+        floating-point rounding.
 
     Returns
     -------
@@ -111,27 +142,25 @@ def average_rent_per_m2_by_canton(df: pd.DataFrame) -> pd.DataFrame:
         - avg_rent_per_m2
     """
 
-    df = df.copy()
-
     required_cols = {"canton", "price_chf", "area_m2"}
     if not required_cols.issubset(df.columns):
         raise ValueError("DataFrame must contain canton, price_chf and area_m2 columns.")
+    _check_engine(engine)
 
-    # Compute rent per m2
-    df["rent_per_m2"] = df["price_chf"] / df["area_m2"]
+    # Compute rent per m2 (as a Series, the input frame is not copied)
+    rent_per_m2 = price_per_m2(df).rename("rent_per_m2")
 
     # Group by canton
-    result = (
-        df.groupby("canton")["rent_per_m2"]
-        .mean()
-        .reset_index(name="avg_rent_per_m2")
-        .sort_values("avg_rent_per_m2", ascending=False)
-    )
+    if engine == "numpy":
+        groups = GroupIndex(df, "canton")
+        result = groups.to_frame(avg_rent_per_m2=groups.mean(rent_per_m2))
+    else:
+        result = rent_per_m2.groupby(df["canton"], observed=True).mean().reset_index(name="avg_rent_per_m2")
 
-    return result
+    return result.sort_values("avg_rent_per_m2", ascending=False)
 
 
-def rank_cantons_by_rent(df: pd.DataFrame) -> pd.DataFrame:
+def rank_cantons_by_rent(df: pd.DataFrame, engine: str = "pandas") -> pd.DataFrame:
     """
     Rank cantons by average rent per square meter (descending).
 
@@ -139,6 +168,8 @@ def rank_cantons_by_rent(df: pd.DataFrame) -> pd.DataFrame:
     ----------
     df : pandas.DataFrame
         Cleaned rent dataset.
+    engine : {'pandas', 'numpy'}, optional
+        Aggregation engine (see ``average_rent_per_m2_by_canton``).
 
     Returns
     -------
@@ -149,18 +180,36 @@ def rank_cantons_by_rent(df: pd.DataFrame) -> pd.DataFrame:
     """
 
     # Reuse the previous function
-    result = average_rent_per_m2_by_canton(df)
+    result = average_rent_per_m2_by_canton(df, engine)
 
     # Already sorted by highest rent, but ensure sorting:
     result = result.sort_values("avg_rent_per_m2", ascending=False).reset_index(drop=True)
 
     return result
 
-def compute_price_to_rent_ratio(buy_df: pd.DataFrame, rent_df: pd.DataFrame) -> pd.DataFrame:
+def compute_price_to_rent_ratio(buy_df: pd.DataFrame, rent_df: pd.DataFrame,
+                                duplicates: str = "allow", engine: str = "pandas") -> pd.DataFrame:
     """
     Compute the price-to-rent ratio by merging buy and rent datasets based on zip code.
     Formula: ratio = buy_price_chf / (12 * monthly_rent_chf)
+
+    The inputs are expected to hold one price per zip code (and canton).
+    Listing-level frames make the merge many-to-many; ``duplicates`` decides
+    what happens then:
+    - 'allow': merge as is (every buy x rent pair of a zip becomes a row)
+    - 'raise': raise a ValueError
+    - 'aggregate': average the prices per key first
+
+    ``engine`` ('pandas' or 'numpy') is how the 'aggregate' mode averages,
+    see ``average_rent_per_m2_by_canton``.
+
+    For listing-level input, ``zipindex.price_to_rent_ratio_by_zip`` gives
+    the aggregated result without any join.
     """
+    if duplicates not in ("allow", "raise", "aggregate"):
+        raise ValueError("duplicates must be 'allow', 'raise' or 'aggregate'.")
+    _check_engine(engine)
+
     # Validation check: ensure essential columns exist
     cols_buy = {"price_chf", "zip_code"}
     cols_rent = {"price_chf", "zip_code"}
@@ -177,6 +226,20 @@ def compute_price_to_rent_ratio(buy_df: pd.DataFrame, rent_df: pd.DataFrame) ->
     if "canton" in b.columns and "canton" in r.columns:
         on_cols.append("canton")
 
+    # Guarded mode: one row per key on each side
+    if duplicates != "allow":
+        for name, frame in (("buy", b), ("rent", r)):
+            if not frame.duplicated(on_cols).any():
+                continue
+            if duplicates == "raise":
+                raise ValueError(
+                    f"{name} data has several rows per {' / '.join(on_cols)}; "
+                    "aggregate it first or pass duplicates='aggregate'."
+                )
+        if duplicates == "aggregate":
+            b = _group_mean(b, on_cols, "buy_price_chf", engine)
+            r = _group_mean(r, on_cols, "rent_price_chf", engine)
+
     # Inner join finds only locations where both Buy and Rent data exist
     df = pd.merge(b, r, on=on_cols, how="inner")
     
@@ -185,22 +248,43 @@ def compute_price_to_rent_ratio(buy_df: pd.DataFrame, rent_df: pd.DataFrame) ->
     
     return df
 
-def rank_cantons_visual(df: pd.DataFrame, metric_name="Avg Rent/m²") -> pd.DataFrame:
+def _group_mean(df: pd.DataFrame, by: list, column: str, engine: str) -> pd.DataFrame:
+    """Group columns and mean of ``column``, as ``groupby(by, as_index=False)[column].mean()``."""
+    if engine == "numpy":
+        groups = GroupIndex(df, by)
+        return groups.to_frame(**{column: groups.mean(df[column])})
+    return df.groupby(by, observed=True, as_index=False)[column].mean()
+
+def rank_cantons_visual(df: pd.DataFrame, metric_name="Avg Rent/m²", engine: str = "pandas") -> pd.DataFrame:
     """
     Generates a ranking DataFrame with Gold/Silver/Bronze medals.
     Calculates Price per m² automatically.
+    ``engine`` is 'pandas' (groupby) or 'numpy' (integer canton codes).
     """
-    df = df.copy()
-    
+    _check_engine(engine)
     # Safety Check
     if 'area_m2' not in df.columns or 'price_chf' not in df.columns:
         return pd.DataFrame()
     
-    # 1. Calculate Metric
-    df['calculated_metric'] = df['price_chf'] / df['area_m2']
+    # 1. Calculate Metric (as a Series, no copy of the input frame)
+    metric = price_per_m2(df).rename('calculated_metric')
     
-    # 2. Group by Canton and Sort
-    rank_df = df.groupby('canton')['calculated_metric'].mean().reset_index()
+    # 2. Group by Canton
+    if engine == "numpy":
+        groups = GroupIndex(df, 'canton')
+        means = pd.Series(groups.mean(metric), index=pd.Index(groups.keys['canton']))
+    else:
+        means = metric.groupby(df['canton'], observed=True).mean()
+
+    return _medal_ranking(means, metric_name)
+
+def _medal_ranking(means: pd.Series, metric_name: str) -> pd.DataFrame:
+    """
+    Turn a Series of per-canton values into the Rank / Canton / metric table
+    shown on the dashboard.
+    """
+    # 2. Sort
+    rank_df = means.rename_axis('canton').rename('calculated_metric').reset_index()
     rank_df = rank_df.sort_values('calculated_metric', ascending=False).reset_index(drop=True)
     
     # 3. Add Ranking (1, 2, 3...)
@@ -1,6 +1,10 @@
-import matplotlib.pyplot as plt
 import pandas as pd
 
+try:
+    import matplotlib.pyplot as plt
+except ImportError as e:
+    raise ImportError("Plotting needs matplotlib: pip install 'realestateCH[plot]'") from e
+
 from .metrics import average_rent_per_m2_by_canton
 
 
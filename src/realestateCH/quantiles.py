@@ -0,0 +1,393 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from .stream import DEFAULT_CHUNKSIZE, iter_clean_chunks
+
+# Default number of t-digest scale units. Higher keeps more centroids per
+# group and gives more accurate quantiles; groups with fewer than roughly
+# compression / 2 values are summarised exactly.
+DEFAULT_COMPRESSION = 200
+
+
+def _quantile_label(q: float) -> str:
+    """Column name of a quantile: 0.5 -> 'p50', 0.95 -> 'p95'."""
+    return f"p{q * 100:g}"
+
+
+def _check_quantiles(q) -> None:
+    if not all(0 <= quantile <= 1 for quantile in q):
+        raise ValueError("Quantiles must be between 0 and 1.")
+
+
+def _group_codes(df: pd.DataFrame, by, sort: bool):
+    """
+    Integer code of each row's group (-1 for a missing key) and the group
+    labels, with the dtype of the key columns (e.g. the canton categorical).
+    """
+    by = [by] if isinstance(by, str) else list(by)
+
+    # Factorize each key column, then the combination of their codes
+    combined = np.zeros(len(df), dtype=np.int64)
+    missing = np.zeros(len(df), dtype=bool)
+    labels = []
+    for col in by:
+        codes, uniques = pd.factorize(df[col], sort=sort)
+        missing |= codes < 0
+        combined = combined * (len(uniques) + 1) + codes
+        labels.append((pd.Index(uniques), len(uniques) + 1))
+    combined[missing] = -1
+
+    codes, uniques = pd.factorize(combined, sort=sort)
+    if sort and len(uniques) and uniques[0] == -1:
+        codes, uniques = codes - 1, uniques[1:]
+    elif not sort and missing.any():
+        # Drop the code of the missing-key "group" and shift the others
+        missing_code = codes[np.argmax(missing)]
+        codes = np.where(codes > missing_code, codes - 1, codes)
+        uniques = np.delete(uniques, missing_code)
+    codes[missing] = -1
+
+    arrays = []
+    for values, size in reversed(labels):
+        uniques, position = np.divmod(uniques, size)
+        arrays.append(values.take(position))
+    arrays.reverse()
+    if len(by) == 1:
+        return codes, arrays[0].rename(by[0])
+    return codes, pd.MultiIndex.from_arrays(arrays, names=by)
+
+
+def group_quantiles(df: pd.DataFrame, by, column: str, q=(0.5,), method: str = "exact",
+                    compression: int = DEFAULT_COMPRESSION) -> pd.DataFrame:
+    """
+    Quantiles of a column for each group.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Listings dataset.
+    by : str or list of str
+        Grouping column(s), e.g. 'canton' or ['zip_code', 'canton'].
+    column : str
+        Column whose quantiles are computed. Missing values are skipped.
+    q : sequence of float, optional
+        Quantiles to compute, between 0 and 1 (default: the median).
+    method : {'exact', 'sketch'}, optional
+        'exact' sorts the values once for all groups and interpolates
+        linearly, like ``groupby(...).quantile()``. 'sketch' summarises each
+        group with a t-digest (see ``QuantileSketch``).
+    compression : int, optional
+        t-digest compression for ``method='sketch'``.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per group, sorted, with the group columns (same dtypes as in
+        ``df``) and one column per quantile ('p50', 'p90', ...). Groups
+        without values get NaN.
+    """
+    if column not in df.columns:
+        raise ValueError(f"DataFrame must contain a '{column}' column.")
+    _check_quantiles(q)
+    if method == "sketch":
+        return QuantileSketch(by, column, compression).update(df).quantiles(q)
+    if method != "exact":
+        raise ValueError("method must be 'exact' or 'sketch'.")
+
+    codes, groups = _group_codes(df, by, sort=True)
+    values = df[column].to_numpy(dtype="float64", na_value=np.nan)
+    keep = (codes >= 0) & ~np.isnan(values)
+    codes, values = codes[keep], values[keep]
+
+    # Sort by group, then by value: each group is a sorted segment
+    order = np.lexsort((values, codes))
+    values = values[order]
+    counts = np.bincount(codes, minlength=len(groups))
+    starts = np.cumsum(counts) - counts
+
+    result = groups.to_frame(index=False)
+    has_values = counts > 0
+    for quantile in q:
+        # Linear interpolation between the closest ranks, as numpy/pandas
+        position = starts + quantile * np.maximum(counts - 1, 0)
+        below = np.floor(position).astype(np.int64)
+        above = np.minimum(below + 1, starts + counts - 1)
+        below, above = below[has_values], above[has_values]
+        fraction = position[has_values] - below
+        out = np.full(len(groups), np.nan)
+        out[has_values] = values[below] + (values[above] - values[below]) * fraction
+        result[_quantile_label(quantile)] = out
+    return result
+
+
+def median_by_canton(df: pd.DataFrame, column: str = "price_chf", method: str = "exact") -> pd.DataFrame:
+    """
+    Median of a column for each canton.
+
+    Returns
+    -------
+    pandas.DataFrame
+        DataFrame with:
+        - canton
+        - p50
+    """
+    return group_quantiles(df, "canton", column, (0.5,), method)
+
+
+def median_by_zip(df: pd.DataFrame, column: str = "price_chf", method: str = "exact") -> pd.DataFrame:
+    """
+    Median of a column for each zip code (and canton).
+
+    The zip column may be called 'zip' (raw files) or 'zip_code'.
+
+    Returns
+    -------
+    pandas.DataFrame
+        DataFrame with:
+        - zip / zip_code
+        - canton (if present)
+        - p50
+    """
+    zip_col = "zip_code" if "zip_code" in df.columns else "zip"
+    by = [zip_col, "canton"] if "canton" in df.columns else [zip_col]
+    return group_quantiles(df, by, column, (0.5,), method)
+
+
+def _compress(group, mean, weight, compression):
+    """
+    Merge centroids so each group keeps about ``compression`` of them.
+
+    Centroids are sorted by group and mean, and those falling in the same
+    unit of the t-digest k1 scale function are merged. The scale is finest
+    at both tails, so extreme quantiles stay accurate.
+    """
+    order = np.lexsort((mean, group))
+    group, mean, weight = group[order], mean[order], weight[order]
+
+    # Cumulative weight before each centroid, within its group
+    cum = np.cumsum(weight)
+    totals = np.bincount(group, weights=weight)
+    group_start = np.cumsum(totals) - totals
+    before = cum - weight - group_start[group]
+    q = (before + weight / 2) / totals[group]
+    k = np.floor(compression * (np.arcsin(2 * q - 1) / np.pi + 0.5))
+
+    new = np.ones(len(group), dtype=bool)
+    new[1:] = (group[1:] != group[:-1]) | (k[1:] != k[:-1])
+    starts = np.flatnonzero(new)
+    weight_sum = np.add.reduceat(weight, starts)
+    mean_sum = np.add.reduceat(weight * mean, starts)
+    return group[starts], mean_sum / weight_sum, weight_sum
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile summary of a column, one t-digest per group.
+
+    Feed it chunk by chunk with ``update``, combine sketches built on
+    different partitions with ``merge``, and read approximate quantiles with
+    ``quantiles``. The summary only holds a few hundred centroids per group,
+    whatever the number of rows, and can be stored with ``save``.
+
+    Parameters
+    ----------
+    by : str or list of str
+        Grouping column(s).
+    column : str
+        Column summarised. Missing values are skipped.
+    compression : int, optional
+        Number of t-digest scale units; more means more accurate.
+    """
+
+    def __init__(self, by, column: str, compression: int = DEFAULT_COMPRESSION):
+        self.by = [by] if isinstance(by, str) else list(by)
+        self.column = column
+        self.compression = compression
+        self.groups = pd.Index([], dtype=object) if len(self.by) == 1 else \
+            pd.MultiIndex.from_arrays([[] for _ in self.by])
+        self.groups.names = self.by
+        self._group = np.empty(0, dtype=np.int64)
+        self._mean = np.empty(0)
+        self._weight = np.empty(0)
+        self._min = np.empty(0)
+        self._max = np.empty(0)
+
+    def _add(self, groups, codes, values):
+        """Register the groups ``groups[codes]`` and the min and max of their (non-missing) values."""
+        # Map the local groups onto this sketch's groups, adding new ones
+        position = self.groups.get_indexer(groups)
+        unseen = position < 0
+        if unseen.any():
+            position[unseen] = len(self.groups) + np.arange(unseen.sum())
+            if len(self.groups):
+                self.groups = self.groups.append(groups[unseen])
+            else:
+                self.groups = groups[unseen]
+            self.groups.names = self.by
+            grow = np.full(unseen.sum(), np.nan)
+            self._min = np.concatenate([self._min, grow])
+            self._max = np.concatenate([self._max, grow])
+        codes = position[codes]
+
+        n_groups = len(self.groups)
+        low = np.full(n_groups, np.inf)
+        high = np.full(n_groups, -np.inf)
+        np.fmin.at(low, codes, values)
+        np.fmax.at(high, codes, values)
+        self._min = np.fmin(self._min, np.where(np.isinf(low), np.nan, low))
+        self._max = np.fmax(self._max, np.where(np.isinf(high), np.nan, high))
+        return codes
+
+    def update(self, df: pd.DataFrame) -> "QuantileSketch":
+        """
+        Add the rows of ``df`` (for example one chunk of a CSV). Returns self.
+
+        Groups whose values are all missing are kept, with no centroid, so
+        that ``quantiles`` lists them (with NaN) as ``group_quantiles`` does.
+        """
+        codes, groups = _group_codes(df, self.by, sort=False)
+        values = df[self.column].to_numpy(dtype="float64", na_value=np.nan)
+        has_key = codes >= 0
+        if not has_key.any():
+            return self
+
+        codes, values = self._add(groups, codes[has_key], values[has_key]), values[has_key]
+        keep = ~np.isnan(values)
+        self._group, self._mean, self._weight = _compress(
+            np.concatenate([self._group, codes[keep]]),
+            np.concatenate([self._mean, values[keep]]),
+            np.concatenate([self._weight, np.ones(keep.sum())]),
+            self.compression,
+        )
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """
+        Combine with a sketch of another partition of the same data.
+
+        Returns a new sketch; neither input is modified.
+        """
+        if other.by != self.by or other.column != self.column:
+            raise ValueError("Only sketches of the same column and groups can be merged.")
+
+        merged = QuantileSketch(self.by, self.column, max(self.compression, other.compression))
+        for sketch in (self, other):
+            if len(sketch.groups) == 0:
+                continue
+            codes = merged._add(sketch.groups, np.arange(len(sketch.groups)), sketch._min)
+            merged._add(sketch.groups, np.arange(len(sketch.groups)), sketch._max)
+            merged._group = np.concatenate([merged._group, codes[sketch._group]])
+            merged._mean = np.concatenate([merged._mean, sketch._mean])
+            merged._weight = np.concatenate([merged._weight, sketch._weight])
+        if len(merged._group):
+            merged._group, merged._mean, merged._weight = _compress(
+                merged._group, merged._mean, merged._weight, merged.compression
+            )
+        return merged
+
+    def count(self) -> pd.Series:
+        """Number of values summarised in each group."""
+        totals = np.bincount(self._group, weights=self._weight, minlength=len(self.groups))
+        return pd.Series(totals.astype(np.int64), index=self.groups, name="count")
+
+    def quantiles(self, q=(0.5,)) -> pd.DataFrame:
+        """
+        Approximate quantiles of each group.
+
+        Values are interpolated linearly between centroids, with the group's
+        minimum and maximum as end points. While a group's centroids are all
+        single values, the result equals the exact quantile.
+
+        Returns
+        -------
+        pandas.DataFrame
+            One row per group, sorted, with the group columns and one column
+            per quantile ('p50', 'p90', ...).
+        """
+        _check_quantiles(q)
+        n_groups = len(self.groups)
+        totals = np.bincount(self._group, weights=self._weight, minlength=n_groups)
+
+        # Anchor points (rank, value) per group: the minimum at rank 0.5,
+        # each centroid at the middle of its weight, the maximum at N - 0.5.
+        # Groups are laid out one after another on a single rank axis so one
+        # np.interp call serves every group.
+        span = totals.max() + 1 if n_groups else 1
+        cum = np.cumsum(self._weight)
+        group_start = np.cumsum(totals) - totals
+        centre = cum - self._weight / 2 - group_start[self._group]
+        groups = np.arange(n_groups)
+        xp = np.concatenate([groups * span + 0.5, self._group * span + centre,
+                             groups * span + np.maximum(totals - 0.5, 0.5)])
+        fp = np.concatenate([self._min, self._mean, self._max])
+        order = np.argsort(xp, kind="stable")
+        xp, fp = xp[order], fp[order]
+
+        result = self.groups.to_frame(index=False)
+        for quantile in q:
+            rank = quantile * np.maximum(totals - 1, 0) + 0.5
+            out = np.interp(groups * span + rank, xp, fp) if len(xp) else np.empty(0)
+            result[_quantile_label(quantile)] = np.where(totals > 0, out, np.nan)
+        return result.sort_values(self.by).reset_index(drop=True)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Centroids as a DataFrame: group columns, mean, weight, group min and max."""
+        frame = self.groups[self._group].to_frame(index=False)
+        frame["mean"] = self._mean
+        frame["weight"] = self._weight
+        frame["min"] = self._min[self._group]
+        frame["max"] = self._max[self._group]
+        return frame
+
+    def save(self, path: str) -> None:
+        """
+        Store the sketch in a Feather file. Groups without values have no
+        centroid: they are stored as a row of weight 0.
+        """
+        frame = self.to_frame()
+        empty = self.count().to_numpy() == 0
+        if empty.any():
+            groups = self.groups[empty].to_frame(index=False)
+            frame = pd.concat([frame, groups.assign(mean=np.nan, weight=0.0, min=np.nan, max=np.nan)],
+                              ignore_index=True)
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        settings = {"by": self.by, "column": self.column, "compression": self.compression}
+        metadata = dict(table.schema.metadata or {})
+        metadata[b"realestateCH.sketch"] = json.dumps(settings).encode()
+        feather.write_feather(table.replace_schema_metadata(metadata), path)
+
+    @classmethod
+    def load(cls, path: str) -> "QuantileSketch":
+        """Read a sketch stored with ``save``."""
+        table = feather.read_table(path)
+        settings = json.loads(table.schema.metadata[b"realestateCH.sketch"])
+        frame = table.to_pandas()
+
+        sketch = cls(settings["by"], settings["column"], settings["compression"])
+        if frame.empty:
+            return sketch
+        codes, groups = _group_codes(frame, sketch.by, sort=False)
+        sketch._add(groups, codes, frame["min"].to_numpy())
+        sketch._add(groups, codes, frame["max"].to_numpy())
+        centroids = frame["weight"].to_numpy() > 0
+        sketch._group = sketch.groups.get_indexer(groups)[codes[centroids]]
+        sketch._mean = frame["mean"].to_numpy()[centroids]
+        sketch._weight = frame["weight"].to_numpy()[centroids]
+        return sketch
+
+
+def sketch_csv(path: str, by, column: str, chunksize: int = DEFAULT_CHUNKSIZE,
+               compression: int = DEFAULT_COMPRESSION) -> QuantileSketch:
+    """
+    Build a ``QuantileSketch`` of a listings CSV, one cleaned chunk at a time.
+
+    The rows are the same as in ``stream.iter_clean_chunks``.
+    """
+    sketch = QuantileSketch(by, column, compression)
+    for chunk in iter_clean_chunks(path, chunksize):
+        sketch.update(chunk)
+    return sketch
@@ -0,0 +1,42 @@
+import pandas as pd
+
+# The 26 Swiss cantons (official two-letter abbreviations)
+CANTONS = (
+    "AG", "AI", "AR", "BE", "BL", "BS", "FR", "GE", "GL", "GR", "JU", "LU", "NE",
+    "NW", "OW", "SG", "SH", "SO", "SZ", "TG", "TI", "UR", "VD", "VS", "ZG", "ZH",
+)
+
+CANTON_DTYPE = pd.CategoricalDtype(categories=list(CANTONS))
+
+# Column types of the listing files (scraper output + canton).
+# Swiss zip codes have four digits, so they fit in a uint16. Rooms and areas
+# only need a few significant digits; prices keep float64 because purchase
+# prices go well above the range where float32 is exact to the franc.
+LISTING_DTYPES = {
+    "zip": "uint16",
+    "price_chf": "float64",
+    "rooms": "float32",
+    "area_m2": "float32",
+    "canton": CANTON_DTYPE,
+}
+
+
+def apply_listing_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cast the listing columns of a DataFrame to the declared schema.
+
+    Columns that are not part of the schema, or not present in ``df``, are
+    left untouched. Canton values outside the 26 cantons become NaN.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Listings dataset.
+
+    Returns
+    -------
+    pandas.DataFrame
+        DataFrame with the schema dtypes applied.
+    """
+    dtypes = {col: dtype for col, dtype in LISTING_DTYPES.items() if col in df.columns}
+    return df.astype(dtypes)
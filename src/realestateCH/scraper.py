@@ -0,0 +1,675 @@
+"""
+Homegate scraper for the rent and buy listings in ``data_raw/``.
+
+Every zip code is visited once per run. Result pages are first fetched
+over plain HTTP and parsed without a browser (see ``scraper_http``); only
+the markets where that fails are loaded in a browser, one after the other
+in the same browser context. Output files have the scraper format read by
+``ingest.ingest_batch`` (zip, url, price_chf, rooms, area_m2).
+
+Run it with::
+
+    python -m realestateCH.scraper --markets rent buy [--mode auto] [--resume]
+
+The browser fallback needs Playwright, an optional dependency
+(``pip install realestateCH[scrape]`` then ``playwright install chromium``).
+"""
+
+import argparse
+import asyncio
+import contextlib
+import csv
+import os
+import re
+from contextlib import asynccontextmanager
+
+import pandas as pd
+
+from .ingest import SCRAPER_COLUMNS, ZIP_CODES_FILE
+from .load import _raw_data_path
+from .scraper_http import FastPathError, HttpFetcher, fetch_result_pages
+from .scraper_telemetry import TelemetryWriter, ZipTrace, format_report, phase, summarize_telemetry
+from .scraper_throttle import (
+    EMPTY,
+    FAILURE_KINDS,
+    NAVIGATION,
+    THROTTLED,
+    TIMEOUT,
+    AdaptiveLimiter,
+    ScrapeError,
+    backoff_delay,
+    classify_exception,
+)
+
+HOMEGATE_URL = "https://www.homegate.ch"
+
+# Page texts meaning that a search has no results (the site is localised,
+# so every language it may answer in)
+EMPTY_TEXTS = [
+    "La pagina richiesta non può essere visualizzata",
+    "il n’y a aucun résultat",
+    "n’y a aucun résultat",
+    "aucun résultat",
+    "keine Ergebnisse",
+    "no results",
+]
+
+# Market registry: search URL ({ZIP} is replaced by the zip code), path of
+# the listing URLs, output file, and page texts meaning that the search has
+# no results
+MARKETS = {
+    "rent": {
+        "url": HOMEGATE_URL + "/louer/biens-immobiliers/npa-{ZIP}/liste-annonces",
+        "listing_path": "/louer/",
+        "output_csv": "rent_results.csv",
+        "empty_texts": EMPTY_TEXTS,
+    },
+    "buy": {
+        "url": HOMEGATE_URL + "/acheter/biens-immobiliers/npa-{ZIP}/liste-annonces",
+        "listing_path": "/acheter/",
+        "output_csv": "buy_results.csv",
+        "empty_texts": EMPTY_TEXTS,
+    },
+}
+
+# How result pages are loaded: HTTP with a browser fallback, or only one of them
+MODES = ("auto", "http", "browser")
+
+CONCURRENCY = 8  # Number of zip codes scraped at the same time at the start
+ZIP_TIMEOUT = 300  # Seconds before giving up on a zip code (all markets)
+ZIP_RETRIES = 2  # Further attempts for a zip code that failed
+GOTO_ATTEMPTS = 3
+MAX_PAGES = 50  # Result pages followed per zip code and market
+GOTO_TIMEOUT_MS = 60_000
+CARDS_TIMEOUT_MS = 15_000
+
+# Browser pool
+MAX_USES_PER_BROWSER = 50  # Restart a browser after this many zip codes
+HEADLESS = True
+COOKIE_STATE_FILE = "homegate_cookies.json"  # Saved once the cookie banner is accepted
+
+COOKIE_BUTTON = "#onetrust-accept-btn-handler"
+CARD_SELECTOR = "div[data-test='result-list-item']"
+MAIN_LIST_SELECTOR = "div[data-test='result-list'] " + CARD_SELECTOR
+FALLBACK_LIST_SELECTOR = "div[data-test='fallback-result-list'] " + CARD_SELECTOR
+
+
+def register_market(name: str, url: str, output_csv: str, empty_texts=EMPTY_TEXTS, listing_path: str = None) -> None:
+    """
+    Add a market to the registry (or replace one).
+
+    Parameters
+    ----------
+    name : str
+        Market name, used on the command line.
+    url : str
+        Search URL with a ``{ZIP}`` placeholder.
+    output_csv : str
+        Output file of the market.
+    empty_texts : sequence of str, optional
+        Page texts that mean the search has no results (default:
+        ``EMPTY_TEXTS``).
+    listing_path : str, optional
+        Path prefix of the listing URLs (default: '/<name>/').
+    """
+    if "{ZIP}" not in url:
+        raise ValueError("url must contain a {ZIP} placeholder.")
+    MARKETS[name] = {
+        "url": url,
+        "listing_path": listing_path or f"/{name}/",
+        "output_csv": output_csv,
+        "empty_texts": list(empty_texts),
+    }
+
+
+def clean_number(text):
+    """First number in a card text ('CHF 1’250.–' -> '1250'), or 'N/A'."""
+    if not text:
+        return "N/A"
+    text = text.replace("’", "").replace(" ", "")
+    m = re.search(r"(\d+(?:\.\d+)?)", text)
+    return m.group(1) if m else "N/A"
+
+
+def card_to_row(zip_code, card: dict) -> list:
+    """Output row of a card returned by ``EXTRACT_CARDS_JS``."""
+    href = card.get("href")
+    if href:
+        full_url = href if href.startswith("http") else HOMEGATE_URL + href
+    else:
+        full_url = "N/A"
+    return [zip_code, full_url, clean_number(card.get("price")),
+            clean_number(card.get("rooms")), clean_number(card.get("area"))]
+
+
+# Runs in the page and returns the raw text of every card field, plus the
+# number of the last result page found in the pagination links (?ep=N)
+EXTRACT_CARDS_JS = """
+(selector) => {
+    const text = (el) => (el ? el.innerText : null);
+    const cards = Array.from(document.querySelectorAll(selector), (card) => {
+        const link = card.querySelector("a.HgCardElevated_content_900d9");
+        const stats = card.querySelectorAll("div[class*='ListingRoomsLivingSpace'] strong");
+        return {
+            href: link ? link.getAttribute("href") : null,
+            price: text(card.querySelector("span[class*='price']")),
+            rooms: text(stats[0]),
+            area: text(stats[1]),
+        };
+    });
+    const pages = Array.from(document.querySelectorAll("nav a[href*='ep=']"), (a) => {
+        const m = a.getAttribute("href").match(/[?&]ep=(\\d+)/);
+        return m ? parseInt(m[1], 10) : 1;
+    });
+    return {cards: cards, lastPage: Math.max(1, ...pages)};
+}
+"""
+
+# Runs in the page: does it show a "no results" text, and how many cards are
+# in the main and in the fallback ("similar listings") result lists
+PAGE_STATUS_JS = """
+([texts, mainSelector, fallbackSelector]) => {
+    const body = (document.body ? document.body.innerText : "").toLowerCase();
+    return {
+        empty: texts.some((t) => body.includes(t.toLowerCase())),
+        main: document.querySelectorAll(mainSelector).length,
+        fallback: document.querySelectorAll(fallbackSelector).length,
+    };
+}
+"""
+
+
+class BrowserPool:
+    """
+    Set of at most ``size`` headless Chromium browsers (one per parallel zip
+    code), launched when first needed.
+
+    Each zip code gets a fresh context (clean tabs, no leftover state) from
+    one of the browsers instead of launching its own browser. A browser is
+    replaced after ``max_uses`` contexts to keep memory in check. Once the
+    cookie banner has been accepted, the cookie state is saved to
+    ``cookie_state_file`` and every new context starts from it.
+    """
+
+    def __init__(self, playwright, size=CONCURRENCY, max_uses=MAX_USES_PER_BROWSER,
+                 headless=HEADLESS, cookie_state_file=COOKIE_STATE_FILE):
+        self.playwright = playwright
+        self.size = size
+        self.max_uses = max_uses
+        self.headless = headless
+        self.cookie_state_file = cookie_state_file
+        self.cookies_saved = os.path.exists(cookie_state_file)
+        # Every slot is either idle in the stack (None while it has no
+        # browser) or borrowed by a page, so a failed launch never loses one.
+        # Slots given back go on top: browsers are reused before new ones
+        # are launched.
+        self._idle = asyncio.LifoQueue()
+        for _ in range(size):
+            self._idle.put_nowait(None)
+        self._browsers = []
+
+    async def start(self):
+        """Launch all the browsers up front."""
+        slots = []
+        try:
+            for _ in range(self.size):
+                slots.append(await self._take())
+        finally:
+            for slot in slots:
+                self._idle.put_nowait(slot)
+
+    async def _take(self):
+        """Wait for an idle slot; launch its browser if it has none or a dead one."""
+        slot = await self._idle.get()
+        try:
+            if slot is None:
+                return await self._launch()
+            if not slot["browser"].is_connected():
+                return await self._recycle(slot)
+            return slot
+        except BaseException:
+            self._idle.put_nowait(None)
+            raise
+
+    async def _launch(self):
+        browser = await self.playwright.chromium.launch(headless=self.headless)
+        self._browsers.append(browser)
+        return {"browser": browser, "uses": 0}
+
+    async def _recycle(self, slot):
+        self._browsers.remove(slot["browser"])
+        try:
+            await slot["browser"].close()
+        except Exception:
+            pass
+        return await self._launch()
+
+    @asynccontextmanager
+    async def page(self, trace: ZipTrace = None):
+        """
+        Borrow a browser and yield a page in a fresh context. The wait for
+        a browser, its launch and the context creation are the 'launch'
+        phase of ``trace``.
+        """
+        with phase(trace, "launch"):
+            slot = await self._take()
+        context = None
+        try:
+            with phase(trace, "launch"):
+                state = self.cookie_state_file if self.cookies_saved else None
+                context = await slot["browser"].new_context(storage_state=state)
+                page = await context.new_page()
+            yield page
+        finally:
+            if context is not None:
+                try:
+                    await context.close()
+                except Exception:
+                    pass
+            slot["uses"] += 1
+            if slot["uses"] >= self.max_uses:
+                try:
+                    slot = await self._recycle(slot)
+                except Exception as e:
+                    # The next page launches a browser in this slot again
+                    print(f"Browser relaunch failed ({classify_exception(e)}: {e}).")
+                    slot = None
+            self._idle.put_nowait(slot)
+
+    async def save_cookie_state(self, context):
+        """Save the cookies of a context where the banner was accepted."""
+        await context.storage_state(path=self.cookie_state_file)
+        self.cookies_saved = True
+
+    async def close(self):
+        for browser in self._browsers:
+            try:
+                await browser.close()
+            except Exception:
+                pass
+        self._browsers = []
+
+
+async def extract_cards(zip_code, page, url, selector=MAIN_LIST_SELECTOR, trace: ZipTrace = None) -> list:
+    """Cards of the current result page and of the following ones."""
+    with phase(trace, "extract"):
+        data = await page.evaluate(EXTRACT_CARDS_JS, selector)
+    cards = data["cards"]
+
+    last_page = min(data["lastPage"], MAX_PAGES)
+    for n in range(2, last_page + 1):
+        try:
+            with phase(trace, "goto"):
+                await page.goto(f"{url}?ep={n}", timeout=GOTO_TIMEOUT_MS)
+            with phase(trace, "wait"):
+                await page.wait_for_selector(selector, timeout=CARDS_TIMEOUT_MS)
+        except Exception as e:
+            print(f"ZIP {zip_code}: page {n}/{last_page} failed to load ({classify_exception(e)}), "
+                  f"keeping {len(cards)} listings.")
+            break
+        with phase(trace, "extract"):
+            cards += (await page.evaluate(EXTRACT_CARDS_JS, selector))["cards"]
+
+    return cards
+
+
+async def scrape_market(zip_code, page, pool: BrowserPool, market: str, trace: ZipTrace = None) -> list:
+    """
+    Rows of one market for one zip code, loaded in ``page``. The time spent
+    in each step is added to the phases of ``trace``.
+
+    Playwright errors are caught as ``Exception`` and classified with
+    ``classify_exception``: Playwright is an optional import.
+
+    Returns
+    -------
+    list
+        Output rows (empty when the search has no results of its own).
+
+    Raises
+    ------
+    ScrapeError
+        If the page could not be loaded or read ('timeout' or
+        'navigation'), or shows neither listings nor a "no results" text
+        ('empty').
+    """
+    try:
+        return await _scrape_market(zip_code, page, pool, market, trace)
+    except ScrapeError:
+        raise
+    except Exception as e:
+        # E.g. the page closed or crashed while it was read
+        url = MARKETS[market]["url"].replace("{ZIP}", str(zip_code))
+        raise ScrapeError(f"{url}: {e}", classify_exception(e)) from e
+
+
+async def _scrape_market(zip_code, page, pool: BrowserPool, market: str, trace: ZipTrace = None) -> list:
+    config = MARKETS[market]
+    url = config["url"].replace("{ZIP}", str(zip_code))
+    print(f"ZIP {zip_code} [{market}]: {url}")
+
+    # Load page, retrying with exponential backoff
+    for attempt in range(GOTO_ATTEMPTS):
+        try:
+            with phase(trace, "goto"):
+                await page.goto(url, timeout=GOTO_TIMEOUT_MS)
+            break
+        except Exception as e:
+            error = ScrapeError(f"{url}: {e}", classify_exception(e))
+            print(f"ZIP {zip_code} [{market}]: goto failed ({error.kind}, {attempt + 1}/{GOTO_ATTEMPTS}).")
+            if attempt + 1 < GOTO_ATTEMPTS:
+                if trace is not None:
+                    trace.retries += 1
+                await asyncio.sleep(backoff_delay(attempt))
+    else:
+        raise error
+
+    # Accept cookies once per run: later contexts reuse the saved state. No
+    # banner (it times out) is fine.
+    if not pool.cookies_saved:
+        try:
+            with phase(trace, "cookie"):
+                await page.click(COOKIE_BUTTON, timeout=3000)
+                await pool.save_cookie_state(page.context)
+        except Exception as e:
+            if classify_exception(e) != TIMEOUT:
+                print(f"ZIP {zip_code} [{market}]: cookie banner not accepted ({e}).")
+
+    # Wait for listings to appear (main or fallback list); a page without
+    # any is told apart below
+    try:
+        with phase(trace, "wait"):
+            await page.wait_for_selector(CARD_SELECTOR, timeout=CARDS_TIMEOUT_MS)
+    except Exception as e:
+        if classify_exception(e) != TIMEOUT:
+            raise ScrapeError(f"{url}: {e}") from e
+
+    with phase(trace, "extract"):
+        status = await page.evaluate(PAGE_STATUS_JS, [config["empty_texts"], MAIN_LIST_SELECTOR, FALLBACK_LIST_SELECTOR])
+    if status["main"] == 0 and not (status["empty"] or status["fallback"]):
+        # Neither listings nor a "no results" text, e.g. a bot check page
+        raise ScrapeError(f"{url}: no listings and no 'no results' text", EMPTY)
+    if status["empty"] or status["main"] == 0:
+        # Fallback results are listings near, not in, the zip code
+        reason = "only fallback results" if status["fallback"] else "no listings"
+        print(f"ZIP {zip_code} [{market}]: {reason}, skipping.")
+        return []
+
+    # Extract data ONLY from the real main list, following the result pages
+    cards = await extract_cards(zip_code, page, url, trace=trace)
+    print(f"ZIP {zip_code} [{market}]: found {len(cards)} listings")
+    return [card_to_row(zip_code, card) for card in cards]
+
+
+async def scrape_market_http(zip_code, fetcher: HttpFetcher, market: str, trace: ZipTrace = None) -> list:
+    """
+    Rows of one market for one zip code, fetched over HTTP.
+
+    Raises
+    ------
+    FastPathError
+        If the result page could not be fetched or read.
+    """
+    config = MARKETS[market]
+    url = config["url"].replace("{ZIP}", str(zip_code))
+    cards = await fetch_result_pages(fetcher, url, config["listing_path"], config["empty_texts"], MAX_PAGES, trace)
+    print(f"ZIP {zip_code} [{market}]: found {len(cards)} listings (http)")
+    return [card_to_row(zip_code, card) for card in cards]
+
+
+async def scrape_zip(zip_code, pool: BrowserPool, markets, fetcher: HttpFetcher = None,
+                     trace: ZipTrace = None) -> dict:
+    """
+    Rows of every market for one zip code.
+
+    With a ``fetcher``, every market is tried over HTTP first. The markets
+    left over are loaded in one browser context from ``pool`` (if any),
+    except those the site throttled: they are left to the retries, after
+    a backoff delay.
+    Phase timings and retries are recorded in ``trace``.
+
+    Returns
+    -------
+    dict
+        Per market: the output rows, or the ``ScrapeError`` of a market that
+        failed ('navigation' for every browser market when no browser page
+        could be opened).
+    """
+    results = {}
+    browser_markets = list(markets)
+    if fetcher is not None:
+        browser_markets = []
+        for market in markets:
+            try:
+                results[market] = await scrape_market_http(zip_code, fetcher, market, trace)
+            except FastPathError as e:
+                print(f"ZIP {zip_code} [{market}]: HTTP fast path failed ({e.kind}: {e}).")
+                results[market] = e
+                if e.kind != THROTTLED:
+                    browser_markets.append(market)
+
+    if browser_markets and pool is not None:
+        done = []
+        try:
+            async with pool.page(trace) as page:
+                for market in browser_markets:
+                    try:
+                        results[market] = await scrape_market(zip_code, page, pool, market, trace)
+                    except ScrapeError as e:
+                        print(f"ZIP {zip_code} [{market}]: failed ({e.kind}: {e}).")
+                        results[market] = e
+                    done.append(market)
+        except Exception as e:
+            # No browser page (launch or context failure): the markets left are retried
+            print(f"ZIP {zip_code}: no browser page ({e!r}).")
+            for market in browser_markets:
+                if market not in done:
+                    results[market] = ScrapeError(f"no browser page: {e}", NAVIGATION)
+    return results
+
+
+class CheckpointedCsv:
+    """
+    Output CSV of one market, written as soon as each zip code is done.
+
+    Once its rows are written, the zip code is added to a checkpoint file
+    next to the CSV. When resuming, the CSV is appended to and ``done``
+    holds the zip codes already in it.
+    """
+
+    def __init__(self, path: str, resume: bool = False):
+        self.path = path
+        self.checkpoint_path = os.path.splitext(path)[0] + ".checkpoint"
+        self.done = set()
+        resuming = resume and os.path.exists(path) and os.path.exists(self.checkpoint_path)
+        if resuming:
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                self.done = {int(line) for line in f if line.strip()}
+
+        mode = "a" if resuming else "w"
+        self._out = open(path, mode, newline="", encoding="utf-8")
+        self._checkpoint = open(self.checkpoint_path, mode, encoding="utf-8")
+        self._writer = csv.writer(self._out)
+        if not resuming:
+            self._writer.writerow(SCRAPER_COLUMNS)
+            self._out.flush()
+        self.rows_written = 0
+
+    def save(self, zip_code, rows) -> None:
+        self._writer.writerows(rows)
+        self._out.flush()
+        # A crash between the two writes only repeats this zip code's rows
+        # on resume; they are dropped later as duplicate listing IDs
+        self._checkpoint.write(f"{zip_code}\n")
+        self._checkpoint.flush()
+        self.done.add(zip_code)
+        self.rows_written += len(rows)
+
+    def close(self) -> None:
+        self._out.close()
+        self._checkpoint.close()
+
+
+async def run(markets=("rent", "buy"), zip_codes=None, output_dir=".", concurrency=CONCURRENCY,
+              zip_timeout=ZIP_TIMEOUT, resume=False, mode="auto", max_concurrency=None,
+              retries=ZIP_RETRIES, telemetry=None) -> dict:
+    """
+    Scrape the listings of the given markets for every zip code.
+
+    Parameters
+    ----------
+    markets : sequence of str, optional
+        Markets from ``MARKETS``.
+    zip_codes : list of int, optional
+        Zip codes to scrape (default: ``data_raw/zip_codes_selected.csv``).
+    output_dir : str, optional
+        Folder of the output CSV and checkpoint files.
+    concurrency : int, optional
+        Number of zip codes scraped at the same time at the start; a new zip
+        code starts as soon as one finishes. The number is then adjusted to
+        the latency and failure rate of the site (see ``AdaptiveLimiter``).
+    zip_timeout : float, optional
+        Seconds before giving up on a zip code. It is not checkpointed, so a
+        resumed run tries it again.
+    resume : bool, optional
+        Skip the zip codes already in the checkpoint of each market and
+        append to its output file.
+    mode : str, optional
+        'auto' (default): HTTP fast path, browser for the pages it cannot
+        read; 'http': no browser; 'browser': browser only. Without
+        Playwright installed, 'auto' runs as 'http'.
+    max_concurrency : int, optional
+        Upper bound of the adjusted concurrency (default:
+        ``max(concurrency, MAX_CONCURRENCY)``); equal to ``concurrency`` for
+        a fixed one.
+    retries : int, optional
+        Further attempts for the markets of a zip code that failed, after an
+        exponential backoff with jitter. Zip codes still failing are not
+        checkpointed.
+    telemetry : str, optional
+        JSONL file receiving a record for every zip code attempt (phase
+        timings, listings, retries, outcome, concurrency), appended to when
+        resuming; a summary is printed at the end (see ``scraper_telemetry``).
+
+    Returns
+    -------
+    dict
+        Number of rows written per market.
+    """
+    unknown = [m for m in markets if m not in MARKETS]
+    if unknown:
+        raise ValueError(f"Unknown market(s) {unknown}; known: {sorted(MARKETS)}")
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {MODES}")
+    async_playwright = None
+    if mode != "http":
+        try:
+            from playwright.async_api import async_playwright
+        except ImportError as e:
+            if mode == "browser":
+                raise ImportError("The browser mode needs Playwright: pip install 'realestateCH[scrape]'") from e
+            print("Playwright is not installed: pages the HTTP fast path cannot read are skipped.")
+
+    if zip_codes is None:
+        zip_codes = pd.read_csv(_raw_data_path(ZIP_CODES_FILE))["zip"].tolist()
+
+    outputs = {m: CheckpointedCsv(os.path.join(output_dir, MARKETS[m]["output_csv"]), resume) for m in markets}
+    todo = [(z, [m for m in markets if z not in outputs[m].done]) for z in zip_codes]
+    todo = [(z, ms) for z, ms in todo if ms]
+    if resume:
+        print(f"Resuming: {len(zip_codes) - len(todo)} zip codes already done, {len(todo)} to go")
+
+    limiter = AdaptiveLimiter(concurrency, maximum=max_concurrency)
+    telemetry_out = TelemetryWriter(telemetry, append=resume) if telemetry else None
+    try:
+        async with contextlib.AsyncExitStack() as stack:
+            fetcher = None
+            if mode != "browser":
+                fetcher = HttpFetcher(size=limiter.maximum)
+                stack.callback(fetcher.close)
+            pool = None
+            if async_playwright is not None:
+                pw = await stack.enter_async_context(async_playwright())
+                pool = BrowserPool(pw, size=limiter.maximum)
+                stack.push_async_callback(pool.close)
+
+            async def worker(zip_code, zip_markets):
+                for attempt in range(retries + 1):
+                    # A slow zip code only holds its own slot, and none while
+                    # waiting to retry
+                    async with limiter.slot():
+                        trace = ZipTrace(zip_code, zip_markets, attempt)
+                        try:
+                            results = await asyncio.wait_for(
+                                scrape_zip(zip_code, pool, zip_markets, fetcher, trace), zip_timeout
+                            )
+                        except asyncio.TimeoutError:
+                            error = ScrapeError(f"no result after {zip_timeout}s", TIMEOUT)
+                            results = {market: error for market in zip_markets}
+                        failed = [m for m in zip_markets if isinstance(results.get(m), ScrapeError)]
+                        # The most severe failure of the markets, as in the telemetry outcome
+                        kind = min((results[m].kind for m in failed), key=FAILURE_KINDS.index, default=None)
+                        limit = limiter.limit
+                        if limit != limiter.record(trace.finish(), kind):
+                            print(f"Concurrency {limit} -> {limiter.limit}")
+
+                    trace.failures = {m: results[m].kind for m in failed}
+                    trace.listings = {m: len(rows) for m, rows in results.items() if isinstance(rows, list)}
+                    if telemetry_out is not None:
+                        telemetry_out.write(trace.to_record(concurrency=limit))
+
+                    for market, rows in results.items():
+                        if isinstance(rows, list):
+                            outputs[market].save(zip_code, rows)
+                    if not failed:
+                        return
+                    zip_markets = failed
+                    kinds = sorted({results[m].kind for m in failed})
+                    if attempt < retries:
+                        delay = backoff_delay(attempt)
+                        print(f"ZIP {zip_code} {failed}: {', '.join(kinds)}; retry {attempt + 1}/{retries} in {delay:.1f}s")
+                        await asyncio.sleep(delay)
+                print(f"ZIP {zip_code} {failed}: {', '.join(kinds)}; giving up.")
+
+            await asyncio.gather(*[worker(z, ms) for z, ms in todo])
+    finally:
+        for output in outputs.values():
+            output.close()
+        if telemetry_out is not None:
+            telemetry_out.close()
+
+    written = {m: output.rows_written for m, output in outputs.items()}
+    for market, n in written.items():
+        print(f"DONE [{market}]: saved {n} rows to {outputs[market].path}")
+    if telemetry:
+        print(format_report(summarize_telemetry(telemetry)))
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape homegate listings per zip code.")
+    parser.add_argument("--markets", nargs="+", default=list(MARKETS), choices=sorted(MARKETS),
+                        help="markets scraped for every zip code (default: all)")
+    parser.add_argument("--output-dir", default=".", help="folder of the output CSV files")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY,
+                        help="number of zip codes scraped at the same time at the start")
+    parser.add_argument("--max-concurrency", type=int, default=None,
+                        help="upper bound of the adjusted concurrency (equal to --concurrency for a fixed one)")
+    parser.add_argument("--retries", type=int, default=ZIP_RETRIES,
+                        help="further attempts for a zip code that failed")
+    parser.add_argument("--zip-timeout", type=float, default=ZIP_TIMEOUT,
+                        help="seconds before giving up on a zip code")
+    parser.add_argument("--resume", action="store_true",
+                        help="skip the zip codes in the checkpoint files and append to the outputs")
+    parser.add_argument("--mode", choices=MODES, default="auto",
+                        help="HTTP with browser fallback (auto), HTTP only, or browser only")
+    parser.add_argument("--telemetry", default=None,
+                        help="JSONL file receiving the timings of every zip code, summarized at the end")
+    args = parser.parse_args(argv)
+    asyncio.run(run(args.markets, output_dir=args.output_dir, concurrency=args.concurrency,
+                    zip_timeout=args.zip_timeout, resume=args.resume, mode=args.mode,
+                    max_concurrency=args.max_concurrency, retries=args.retries, telemetry=args.telemetry))
+
+
+if __name__ == "__main__":
+    main()
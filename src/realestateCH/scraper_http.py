@@ -0,0 +1,458 @@
+"""
+HTTP fast path of the homegate scraper.
+
+Result pages are fetched with plain keep-alive HTTP requests, without a
+browser, and the listings are read from the page source: first from the
+JSON state embedded by the site, else from the result-list HTML. When a
+page cannot be fetched or holds neither, ``FastPathError`` is raised and
+the scraper falls back to the browser. Its ``kind`` tells a timeout, a
+navigation error (connection error, HTTP error status), a throttled
+request (HTTP 429 or 503) and an empty page apart.
+"""
+
+import asyncio
+import gzip
+import http.client
+import json
+import re
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit
+
+from .scraper_telemetry import phase
+from .scraper_throttle import EMPTY, NAVIGATION, THROTTLED, TIMEOUT, ScrapeError
+
+HTTP_TIMEOUT = 30  # Seconds per request
+MAX_REDIRECTS = 3
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+# Statuses with which the site asks to slow down
+THROTTLE_STATUSES = (429, 503)
+
+DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/124.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml",
+    "Accept-Language": "fr-CH,fr;q=0.9,de;q=0.8,en;q=0.7",
+    "Accept-Encoding": "gzip, deflate",
+}
+
+# Script that holds the page state, e.g. window.__INITIAL_STATE__ = {...}
+_STATE_PATTERN = re.compile(r"window\.__INITIAL_STATE__\s*=\s*")
+
+# Pagination links of the result list (?ep=N)
+_PAGE_PATTERN = re.compile(r"[?&]ep=(\d+)")
+
+
+class FastPathError(ScrapeError):
+    """The HTTP fast path could not read a result page."""
+
+
+class HttpFetcher:
+    """
+    Pool of keep-alive HTTP(S) connections, used from asyncio.
+
+    Requests run in a thread pool of ``size`` workers; connections are
+    reused between requests to the same host.
+
+    Parameters
+    ----------
+    size : int, optional
+        Maximum number of requests in flight.
+    timeout : float, optional
+        Seconds per request.
+    headers : dict, optional
+        Request headers (default: those of a desktop browser).
+    """
+
+    def __init__(self, size: int = 8, timeout: float = HTTP_TIMEOUT, headers: dict = None):
+        self.timeout = timeout
+        self.headers = dict(DEFAULT_HEADERS if headers is None else headers)
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="realestateCH-http")
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _open(self, scheme: str, netloc: str):
+        if scheme == "https":
+            return http.client.HTTPSConnection(netloc, timeout=self.timeout)
+        if scheme == "http":
+            return http.client.HTTPConnection(netloc, timeout=self.timeout)
+        raise FastPathError(f"Unsupported URL scheme: {scheme}")
+
+    def _connection(self, scheme: str, netloc: str):
+        """An idle connection to the host if there is one, else a new one; and whether it was idle."""
+        with self._lock:
+            idle = self._idle.get((scheme, netloc))
+            if idle:
+                return idle.pop(), True
+        return self._open(scheme, netloc), False
+
+    def _release(self, scheme: str, netloc: str, conn, response) -> None:
+        if response.will_close:
+            conn.close()
+            return
+        with self._lock:
+            self._idle.setdefault((scheme, netloc), []).append(conn)
+
+    def _send(self, scheme: str, netloc: str, path: str):
+        """
+        GET ``path`` from the host; returns (connection, response, body).
+
+        An idle keep-alive connection may have been closed by the server in
+        the meantime: the request is then sent once more on a new connection.
+        """
+        conn, reused = self._connection(scheme, netloc)
+        while True:
+            try:
+                conn.request("GET", path, headers=self.headers)
+                response = conn.getresponse()
+                return conn, response, response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if not reused:
+                    raise
+                conn, reused = self._open(scheme, netloc), False
+            except BaseException:
+                conn.close()
+                raise
+
+    def fetch(self, url: str):
+        """
+        GET ``url`` (following redirects) in the calling thread.
+
+        The connection goes back to the pool once the response is fully
+        handled; it is closed if the response cannot be read or decoded.
+
+        Returns
+        -------
+        tuple
+            (HTTP status, decoded body).
+        """
+        for _ in range(MAX_REDIRECTS + 1):
+            parts = urlsplit(url)
+            path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+            try:
+                conn, response, body = self._send(parts.scheme, parts.netloc, path)
+            except (OSError, http.client.HTTPException) as e:
+                kind = TIMEOUT if isinstance(e, TimeoutError) else NAVIGATION
+                raise FastPathError(f"{url}: {e!r}", kind) from e
+
+            location = response.getheader("Location")
+            if response.status in REDIRECT_STATUSES and location:
+                self._release(parts.scheme, parts.netloc, conn, response)
+                url = urljoin(url, location)
+                continue
+
+            try:
+                encoding = (response.getheader("Content-Encoding") or "").lower()
+                if encoding == "gzip":
+                    body = gzip.decompress(body)
+                elif encoding == "deflate":
+                    body = zlib.decompress(body)
+                charset = response.headers.get_content_charset() or "utf-8"
+                text = body.decode(charset, errors="replace")
+            except (OSError, EOFError, zlib.error, LookupError) as e:
+                conn.close()
+                raise FastPathError(f"{url}: unreadable response body ({e!r})") from e
+            self._release(parts.scheme, parts.netloc, conn, response)
+            return response.status, text
+
+        raise FastPathError(f"{url}: too many redirects")
+
+    async def get(self, url: str):
+        """``fetch`` run in the pool's threads."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.fetch, url)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            for conns in self._idle.values():
+                for conn in conns:
+                    conn.close()
+            self._idle = {}
+
+
+def _embedded_state(html: str):
+    """The JSON page state embedded in the HTML, or None."""
+    match = _STATE_PATTERN.search(html)
+    if not match:
+        return None
+    try:
+        state, _ = json.JSONDecoder().raw_decode(html, match.end())
+    except ValueError:
+        return None
+    return state
+
+
+def _first(data, *paths):
+    """First non-null value at one of the key paths in nested dicts."""
+    for path in paths:
+        value = data
+        for key in path:
+            value = value.get(key) if isinstance(value, dict) else None
+        if value is not None:
+            return value
+    return None
+
+
+def _text(value):
+    return None if value is None else str(value)
+
+
+def _listings_in_state(node, in_fallback=False):
+    """
+    Yield the listings in the page state, skipping the fallback ("similar
+    listings") results. A listing is a dict with an 'id', 'prices' and
+    'characteristics'.
+    """
+    if isinstance(node, dict):
+        if "id" in node and "prices" in node and "characteristics" in node:
+            if not in_fallback:
+                yield node
+            return
+        for key, value in node.items():
+            yield from _listings_in_state(value, in_fallback or "fallback" in str(key).lower())
+    elif isinstance(node, list):
+        for value in node:
+            yield from _listings_in_state(value, in_fallback)
+
+
+def _state_result_lists(node, in_fallback=False):
+    """Yield the 'listings' lists of the main search results in the page state."""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            fallback = in_fallback or "fallback" in str(key).lower()
+            if key == "listings" and isinstance(value, list):
+                if not fallback:
+                    yield value
+            else:
+                yield from _state_result_lists(value, fallback)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _state_result_lists(value, in_fallback)
+
+
+def _state_cards(state, listing_path: str):
+    """Cards of the main result list of the page state, or None if it has none."""
+    result_lists = list(_state_result_lists(state))
+    if not result_lists:
+        return None
+    cards = []
+    seen = set()
+    for listing in _listings_in_state(result_lists):
+        if listing["id"] in seen:
+            continue
+        seen.add(listing["id"])
+        cards.append({
+            "href": f"{listing_path}{listing['id']}",
+            "price": _text(_first(listing["prices"], ("rent", "gross"), ("rent", "net"), ("buy", "price"))),
+            "rooms": _text(_first(listing["characteristics"], ("numberOfRooms",))),
+            "area": _text(_first(listing["characteristics"], ("livingSpace",), ("totalFloorSpace",))),
+        })
+    return cards
+
+
+def _state_last_page(state) -> int:
+    counts = []
+
+    def walk(node):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key == "pageCount" and isinstance(value, int):
+                    counts.append(value)
+                else:
+                    walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    walk(state)
+    return max(counts, default=1)
+
+
+class _ResultListParser(HTMLParser):
+    """
+    Cards of the main result list (``div[data-test='result-list']``) with the
+    same fields as the browser extraction: link href, price text, rooms and
+    area texts. Also collects the pagination page numbers.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.cards = []
+        self.found_list = False
+        self.pages = [1]
+        self._stack = []  # (tag, role) of the open elements
+        self._card = None
+        self._capture = None  # (field, parts) being read
+
+    def _role(self, tag, attrs):
+        test = attrs.get("data-test")
+        cls = attrs.get("class") or ""
+        if tag == "div" and test == "result-list":
+            return "list"
+        if tag == "div" and test == "fallback-result-list":
+            return "fallback"
+        if tag == "div" and test == "result-list-item":
+            return "card"
+        if tag == "a" and "HgCardElevated_content_900d9" in cls.split():
+            return "link"
+        if tag == "span" and "price" in cls:
+            return "price"
+        if tag == "div" and "ListingRoomsLivingSpace" in cls:
+            return "stats"
+        if tag == "strong":
+            return "strong"
+        return None
+
+    def _inside(self, role):
+        return any(r == role for _, r in self._stack)
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "a" and attrs.get("href"):
+            match = _PAGE_PATTERN.search(attrs["href"])
+            if match and self._inside_nav():
+                self.pages.append(int(match.group(1)))
+
+        role = self._role(tag, attrs)
+        if tag in _VOID_TAGS:
+            return
+        self._stack.append((tag, role))
+
+        if role == "list":
+            self.found_list = True
+        in_main = self._inside("list") and not self._inside("fallback")
+        if role == "card" and in_main and self._card is None:
+            self._card = {"href": None, "price": None, "rooms": None, "area": None, "_stats": []}
+        elif self._card is not None:
+            if role == "link" and self._card["href"] is None:
+                self._card["href"] = attrs.get("href")
+            elif role == "price" and self._card["price"] is None and self._capture is None:
+                self._capture = ("price", [], len(self._stack))
+            elif role == "strong" and self._inside("stats") and self._capture is None:
+                self._capture = ("stats", [], len(self._stack))
+
+    def _inside_nav(self):
+        return any(tag == "nav" for tag, _ in self._stack)
+
+    def handle_data(self, data):
+        if self._capture is not None:
+            self._capture[1].append(data)
+
+    def handle_endtag(self, tag):
+        if tag in _VOID_TAGS:
+            return
+        # Close up to the matching open tag (tolerates unclosed children)
+        for i in range(len(self._stack) - 1, -1, -1):
+            if self._stack[i][0] == tag:
+                break
+        else:
+            return
+        while len(self._stack) > i:
+            depth = len(self._stack)
+            _, role = self._stack.pop()
+            if self._capture is not None and depth == self._capture[2]:
+                field, parts, _ = self._capture
+                text = "".join(parts).strip()
+                if field == "price":
+                    self._card["price"] = text
+                else:
+                    self._card["_stats"].append(text)
+                self._capture = None
+            if role == "card" and self._card is not None and not self._inside("card"):
+                stats = self._card.pop("_stats")
+                self._card["rooms"] = stats[0] if len(stats) > 0 else None
+                self._card["area"] = stats[1] if len(stats) > 1 else None
+                self.cards.append(self._card)
+                self._card = None
+
+
+_VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+
+def parse_result_page(html: str, listing_path: str, empty_texts=()) -> dict:
+    """
+    Listing cards of a homegate result page, read from its source.
+
+    The JSON page state is used when it holds the main result list;
+    otherwise the cards of the main result list are read from the HTML. Fallback ("similar listings")
+    results are left out in both cases.
+
+    Parameters
+    ----------
+    html : str
+        Page source.
+    listing_path : str
+        Path prefix of the listing URLs of the market, e.g. '/louer/'.
+    empty_texts : sequence of str, optional
+        Page texts that mean the search has no results.
+
+    Returns
+    -------
+    dict
+        - cards: list of dicts with href, price, rooms and area (raw texts)
+        - last_page: number of the last result page
+
+    Raises
+    ------
+    FastPathError
+        If the page holds neither a page state with a result list nor a
+        result list, and none of ``empty_texts`` (e.g. a bot check page).
+    """
+    state = _embedded_state(html)
+    if state is not None:
+        cards = _state_cards(state, listing_path)
+        if cards is not None:
+            return {"cards": cards, "last_page": _state_last_page(state)}
+
+    parser = _ResultListParser()
+    parser.feed(html)
+    parser.close()
+    if parser.found_list:
+        return {"cards": parser.cards, "last_page": max(parser.pages)}
+
+    lowered = html.lower()
+    if any(text.lower() in lowered for text in empty_texts) or "fallback-result-list" in html:
+        return {"cards": [], "last_page": 1}
+    raise FastPathError("No listings state or result list in the page", EMPTY)
+
+
+async def fetch_result_pages(fetcher: HttpFetcher, url: str, listing_path: str,
+                             empty_texts=(), max_pages: int = 50, trace=None) -> list:
+    """
+    Cards of every result page of a search, fetched over HTTP.
+
+    With a ``ZipTrace``, the time spent fetching and parsing is added to its
+    'fetch' and 'extract' phases.
+
+    Raises
+    ------
+    FastPathError
+        If the first page cannot be fetched or read ('throttled' for HTTP
+        429 and 503). Later pages that fail end the pagination with the
+        cards read so far.
+    """
+    with phase(trace, "fetch"):
+        status, html = await fetcher.get(url)
+    if status != 200:
+        raise FastPathError(f"{url}: HTTP {status}", THROTTLED if status in THROTTLE_STATUSES else NAVIGATION)
+    with phase(trace, "extract"):
+        page = parse_result_page(html, listing_path, empty_texts)
+    cards = page["cards"]
+
+    for n in range(2, min(page["last_page"], max_pages) + 1):
+        try:
+            with phase(trace, "fetch"):
+                status, html = await fetcher.get(f"{url}?ep={n}")
+            if status != 200:
+                break
+            with phase(trace, "extract"):
+                cards += parse_result_page(html, listing_path, empty_texts)["cards"]
+        except FastPathError:
+            break
+    return cards
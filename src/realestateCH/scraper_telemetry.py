@@ -0,0 +1,224 @@
+"""
+Per-zip telemetry of scraper runs.
+
+``run(..., telemetry="run.jsonl")`` writes one JSON line per zip code
+attempt: the time spent in each phase (browser launch, goto, cookie
+banner, waiting for the listings, extraction, HTTP fetches), the listings
+found per market, the retries and the outcome. ``summarize_telemetry``
+turns such a file into latency percentiles, throughput and the slowest
+zip codes::
+
+    python -m realestateCH.scraper_telemetry run.jsonl
+"""
+
+import argparse
+import json
+import os
+import time
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+from .scraper_throttle import FAILURE_KINDS
+
+# Phases timed in each zip code attempt
+PHASES = ("launch", "goto", "cookie", "wait", "extract", "fetch")
+
+PERCENTILES = (50, 95, 99)
+N_SLOWEST = 10
+
+
+class ZipTrace:
+    """
+    Timings and counts of one attempt at one zip code.
+
+    Phases can be entered several times (once per market or result page);
+    their durations add up.
+    """
+
+    def __init__(self, zip_code, markets=(), attempt: int = 0):
+        self.zip_code = zip_code
+        self.markets = list(markets)
+        self.attempt = attempt
+        self.phases = {}
+        self.listings = {}
+        self.retries = 0
+        self.failures = {}
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.duration = None
+
+    @contextmanager
+    def phase(self, name: str):
+        """Add the time spent in the block to phase ``name``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def finish(self) -> float:
+        """Stop the clock; returns the duration of the attempt in seconds."""
+        self.duration = time.perf_counter() - self._start
+        return self.duration
+
+    def to_record(self, **extra) -> dict:
+        """
+        The trace as a telemetry record, with ``extra`` fields. Its outcome
+        is 'ok', or the most severe failure of its markets (in the order of
+        ``FAILURE_KINDS``); 'failures' holds the failure of each market.
+        """
+        outcome = "ok"
+        if self.failures:
+            outcome = min(self.failures.values(), key=FAILURE_KINDS.index)
+        return {
+            "zip": int(self.zip_code),
+            "attempt": self.attempt,
+            "markets": self.markets,
+            "started": round(self.started, 3),
+            "duration": round(self.duration if self.duration is not None else self.finish(), 4),
+            "phases": {name: round(seconds, 4) for name, seconds in self.phases.items()},
+            "listings": self.listings,
+            "retries": self.retries,
+            "failures": self.failures,
+            "outcome": outcome,
+            **extra,
+        }
+
+
+def phase(trace, name: str):
+    """``trace.phase(name)``, or a no-op without a trace."""
+    return nullcontext() if trace is None else trace.phase(name)
+
+
+class TelemetryWriter:
+    """Writes telemetry records to a JSONL file, one line each (appended to
+    the file with ``append=True``)."""
+
+    def __init__(self, path: str, append: bool = False):
+        self.path = path
+        self._out = open(path, "a" if append else "w", encoding="utf-8")
+
+    def write(self, record: dict) -> None:
+        self._out.write(json.dumps(record) + "\n")
+        self._out.flush()
+
+    def close(self) -> None:
+        self._out.close()
+
+
+def read_telemetry(path: str) -> list:
+    """Records of a telemetry file (lines that are not valid JSON are skipped)."""
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+def _percentiles(values) -> dict:
+    if len(values) == 0:
+        return {f"p{p}": None for p in PERCENTILES}
+    return {f"p{p}": float(np.percentile(values, p)) for p in PERCENTILES}
+
+
+def summarize_telemetry(records, n_slowest: int = N_SLOWEST) -> dict:
+    """
+    Summary of a scraper run.
+
+    Parameters
+    ----------
+    records : str or list of dict
+        Telemetry file, or its records.
+    n_slowest : int, optional
+        Number of slowest zip code attempts listed.
+
+    Returns
+    -------
+    dict
+        - attempts, zip_codes: number of attempts and of distinct zip codes
+        - outcomes: number of zip codes per final outcome ('ok' or failure kind)
+        - retried: number of zip codes attempted more than once
+        - listings: listings found per market
+        - latency: p50/p95/p99 of the attempt durations (seconds)
+        - phases: p50/p95/p99 and total seconds of each phase
+        - zips_per_minute: zip codes finished per minute of wall time
+        - slowest: the slowest attempts (zip, attempt, duration, outcome)
+    """
+    if isinstance(records, (str, os.PathLike)):
+        records = read_telemetry(records)
+
+    final = {}
+    listings = {}
+    for record in records:
+        final[record["zip"]] = record
+        for market, n in record.get("listings", {}).items():
+            listings[market] = listings.get(market, 0) + n
+    outcomes = {}
+    for record in final.values():
+        outcomes[record["outcome"]] = outcomes.get(record["outcome"], 0) + 1
+
+    durations = np.array([r["duration"] for r in records], dtype=float)
+    phases = {}
+    for name in PHASES:
+        values = [r["phases"][name] for r in records if name in r.get("phases", {})]
+        if values:
+            phases[name] = {**_percentiles(values), "total": float(np.sum(values))}
+
+    zips_per_minute = None
+    if records:
+        wall = max(r["started"] + r["duration"] for r in records) - min(r["started"] for r in records)
+        if wall > 0:
+            zips_per_minute = outcomes.get("ok", 0) / wall * 60
+
+    slowest = sorted(records, key=lambda r: r["duration"], reverse=True)[:n_slowest]
+    return {
+        "attempts": len(records),
+        "zip_codes": len(final),
+        "outcomes": outcomes,
+        "retried": sum(r["attempt"] > 0 for r in final.values()),
+        "listings": listings,
+        "latency": _percentiles(durations),
+        "phases": phases,
+        "zips_per_minute": zips_per_minute,
+        "slowest": [{key: r[key] for key in ("zip", "attempt", "duration", "outcome")} for r in slowest],
+    }
+
+
+def format_report(summary: dict) -> str:
+    """Text report of ``summarize_telemetry``'s output."""
+
+    def seconds(values):
+        return "  ".join(f"{k} {v:.2f}s" if v is not None else f"{k} -" for k, v in values.items()
+                         if k.startswith("p"))
+
+    outcomes = ", ".join(f"{k} {v}" for k, v in sorted(summary["outcomes"].items()))
+    rate = summary["zips_per_minute"]
+    lines = [
+        f"Zip codes: {summary['zip_codes']} ({outcomes}), {summary['attempts']} attempts, "
+        f"{summary['retried']} retried",
+        "Listings: " + ", ".join(f"{m} {n}" for m, n in summary["listings"].items()),
+        f"Throughput: {rate:.1f} zip codes/min" if rate is not None else "Throughput: -",
+        f"Latency per zip code: {seconds(summary['latency'])}",
+    ]
+    for name, values in summary["phases"].items():
+        lines.append(f"  {name:<8} {seconds(values)}  total {values['total']:.1f}s")
+    lines.append("Slowest zip codes:")
+    for r in summary["slowest"]:
+        lines.append(f"  {r['zip']} (attempt {r['attempt'] + 1}): {r['duration']:.2f}s, {r['outcome']}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize the telemetry of a scraper run.")
+    parser.add_argument("path", help="telemetry file written by the scraper (--telemetry)")
+    parser.add_argument("--slowest", type=int, default=N_SLOWEST, help="number of slowest zip codes listed")
+    args = parser.parse_args(argv)
+    print(format_report(summarize_telemetry(args.path, args.slowest)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Failure classes, retry delays and adaptive concurrency for the scraper.
+
+Every failed page load is classified as a timeout, a navigation error
+(connection error, HTTP error status, browser navigation failure), a
+throttled request (HTTP 429 or 503: the site asks to slow down) or an
+empty result (a page that loaded without listings nor a "no results"
+text, e.g. a bot check). ``AdaptiveLimiter`` uses these outcomes and the
+latency of each zip code to adjust the number of zip codes in flight.
+"""
+
+import asyncio
+import random
+from contextlib import asynccontextmanager
+
+TIMEOUT = "timeout"
+NAVIGATION = "navigation"
+THROTTLED = "throttled"
+EMPTY = "empty"
+# From the most to the least severe: the outcome of a zip code whose
+# markets failed differently is the most severe of their failures
+FAILURE_KINDS = (TIMEOUT, THROTTLED, NAVIGATION, EMPTY)
+
+# Retries (exponential backoff with full jitter)
+RETRY_BASE_DELAY = 1.0  # Seconds, doubled at each attempt
+RETRY_MAX_DELAY = 60.0
+
+# Adaptive concurrency
+MAX_CONCURRENCY = 32
+WINDOW = 10  # Zip codes between two adjustments
+MAX_ERROR_RATE = 0.1  # Failure rate above which concurrency is cut
+LATENCY_TOLERANCE = 2.0  # Median latency (x the best one seen) above which concurrency is cut
+DECREASE_FACTOR = 0.5
+
+
+class ScrapeError(Exception):
+    """
+    A result page could not be scraped.
+
+    Parameters
+    ----------
+    message : str
+        What failed.
+    kind : str, optional
+        One of ``FAILURE_KINDS`` (default 'navigation').
+    """
+
+    def __init__(self, message: str, kind: str = NAVIGATION):
+        if kind not in FAILURE_KINDS:
+            raise ValueError(f"kind must be one of {FAILURE_KINDS}")
+        super().__init__(message)
+        self.kind = kind
+
+
+def classify_exception(error: BaseException) -> str:
+    """
+    Failure kind of an exception raised while loading a page.
+
+    Playwright is optional, so its ``TimeoutError`` is recognised by name.
+    """
+    if isinstance(error, ScrapeError):
+        return error.kind
+    if isinstance(error, TimeoutError) or type(error).__name__ == "TimeoutError":
+        return TIMEOUT
+    return NAVIGATION
+
+
+def backoff_delay(attempt: int, base: float = None, cap: float = None, rng=random) -> float:
+    """
+    Seconds to wait before retry number ``attempt`` (0 for the first one).
+
+    Uniform between 0 and ``min(cap, base * 2 ** attempt)``: the jitter keeps
+    the retries of zip codes that failed together from hitting the site at
+    the same time.
+    """
+    base = RETRY_BASE_DELAY if base is None else base
+    cap = RETRY_MAX_DELAY if cap is None else cap
+    return rng.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class AdaptiveLimiter:
+    """
+    Limit on the number of zip codes in flight, adjusted to the site's
+    responses (additive increase, multiplicative decrease).
+
+    Every ``window`` recorded zip codes, the limit is multiplied by
+    ``decrease`` if more than ``max_error_rate`` of them failed or if their
+    median latency exceeds ``latency_tolerance`` times the best median seen
+    so far (the site slows down before it starts refusing requests).
+    Otherwise it grows by one, up to ``maximum``. A throttled zip code
+    cuts the limit at once, without waiting for the end of the window.
+
+    Parameters
+    ----------
+    initial : int
+        Starting limit.
+    minimum, maximum : int, optional
+        Bounds of the limit (default 1 and ``max(initial, MAX_CONCURRENCY)``).
+        Equal bounds give a fixed limit.
+    window : int, optional
+        Number of zip codes between two adjustments.
+    max_error_rate, latency_tolerance, decrease : float, optional
+        See above.
+    """
+
+    def __init__(self, initial: int, minimum: int = 1, maximum: int = None, window: int = WINDOW,
+                 max_error_rate: float = MAX_ERROR_RATE, latency_tolerance: float = LATENCY_TOLERANCE,
+                 decrease: float = DECREASE_FACTOR):
+        maximum = max(initial, MAX_CONCURRENCY) if maximum is None else maximum
+        if not 1 <= minimum <= maximum:
+            raise ValueError("Concurrency bounds must satisfy 1 <= minimum <= maximum.")
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = min(max(initial, minimum), maximum)
+        self.window = window
+        self.max_error_rate = max_error_rate
+        self.latency_tolerance = latency_tolerance
+        self.decrease = decrease
+        self.in_flight = 0
+        self.best_latency = None
+        self.counts = {"ok": 0, **{kind: 0 for kind in FAILURE_KINDS}}
+        self._samples = []
+        self._changed = asyncio.Condition()
+
+    @asynccontextmanager
+    async def slot(self):
+        """Wait until fewer than ``limit`` zip codes are in flight, then hold a slot."""
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            async with self._changed:
+                self.in_flight -= 1
+                self._changed.notify_all()
+
+    def record(self, latency: float, kind: str = None) -> int:
+        """
+        Record the outcome of one zip code: its latency in seconds and its
+        failure kind (None for a success).
+
+        Returns
+        -------
+        int
+            The limit, possibly adjusted.
+        """
+        self.counts["ok" if kind is None else kind] += 1
+        if kind == THROTTLED:
+            self._samples = []
+            self.limit = max(self.minimum, int(self.limit * self.decrease))
+            return self.limit
+        self._samples.append((latency, kind))
+        if len(self._samples) < self.window:
+            return self.limit
+
+        failures = sum(kind is not None for _, kind in self._samples)
+        latencies = sorted(latency for latency, kind in self._samples if kind is None)
+        self._samples = []
+        median = latencies[len(latencies) // 2] if latencies else None
+        if median is not None and (self.best_latency is None or median < self.best_latency):
+            self.best_latency = median
+
+        slow = median is not None and median > self.latency_tolerance * self.best_latency
+        if failures > self.max_error_rate * self.window or slow:
+            self.limit = max(self.minimum, int(self.limit * self.decrease))
+        else:
+            self.limit = min(self.maximum, self.limit + 1)
+        return self.limit
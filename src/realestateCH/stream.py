@@ -0,0 +1,176 @@
+import numpy as np
+import pandas as pd
+
+from .clean import clean_data, listing_keys
+from .schema import LISTING_DTYPES
+
+# Rows per chunk when streaming a CSV
+DEFAULT_CHUNKSIZE = 100_000
+
+
+def iter_clean_chunks(path: str, chunksize: int = DEFAULT_CHUNKSIZE, dtype: dict = LISTING_DTYPES):
+    """
+    Read a listings CSV in chunks and clean each chunk with ``clean_data``.
+
+    Duplicate listings are removed across chunks as well, so concatenating
+    the chunks gives the same rows as ``clean_data(load_data(path))``. To do
+    so, the 64-bit deduplication key of every kept row (listing ID or row
+    hash, see ``clean.listing_keys``) is remembered: 8 bytes per listing.
+
+    Parameters
+    ----------
+    path : str
+        Path to the CSV file.
+    chunksize : int, optional
+        Number of rows read at a time.
+    dtype : dict, optional
+        Column types applied while parsing (default: the listing schema).
+        Columns missing from the file are ignored.
+
+    Yields
+    ------
+    pandas.DataFrame
+        Cleaned chunks, keeping the row labels of the original file.
+    """
+    # Keys of the kept rows, as sorted runs of decreasing size: a run is
+    # merged into the previous one once as large, so each key is merged
+    # O(log chunks) times rather than once per chunk
+    seen = []
+
+    with pd.read_csv(path, chunksize=chunksize, dtype=dtype) as reader:
+        for chunk in reader:
+            chunk = clean_data(chunk)
+            if chunk.empty:
+                continue
+
+            hashes = listing_keys(chunk)
+            new = np.ones(len(hashes), dtype=bool)
+            for run in seen:
+                positions = np.searchsorted(run, hashes).clip(max=len(run) - 1)
+                new &= run[positions] != hashes
+            chunk = chunk[new]
+            hashes = np.sort(hashes[new])
+
+            if len(hashes):
+                seen.append(hashes)
+                while len(seen) > 1 and len(seen[-2]) <= len(seen[-1]):
+                    run = seen.pop()
+                    seen[-1] = np.insert(seen[-1], np.searchsorted(seen[-1], run), run)
+                yield chunk
+
+
+class GroupMean:
+    """
+    Exact mean of a column per group, folded chunk by chunk.
+
+    Only the running sum and count of each group are kept, so memory depends
+    on the number of groups (cantons, zip codes), not on the number of rows.
+
+    Parameters
+    ----------
+    by : str or list of str
+        Grouping column(s).
+    column : str
+        Column to average. Missing values are skipped, as in ``groupby.mean``.
+    """
+
+    def __init__(self, by, column: str):
+        self.by = by
+        self.column = column
+        self._totals = None
+
+    def update(self, df: pd.DataFrame) -> None:
+        """Add the rows of ``df`` to the running totals."""
+        totals = df.groupby(self.by, observed=True)[self.column].agg(["sum", "count"])
+        if self._totals is not None:
+            totals = pd.concat([self._totals, totals])
+            totals = totals.groupby(level=list(range(totals.index.nlevels))).sum()
+        self._totals = totals
+
+    def result(self) -> pd.Series:
+        """Mean of ``column`` per group (NaN for groups with only missing values)."""
+        if self._totals is None:
+            return pd.Series(dtype="float64", name=self.column)
+        counts = self._totals["count"].where(self._totals["count"] > 0)
+        return (self._totals["sum"] / counts).rename(self.column)
+
+
+def stream_average_rent_per_m2_by_canton(path: str, chunksize: int = DEFAULT_CHUNKSIZE) -> pd.DataFrame:
+    """
+    Streaming version of ``average_rent_per_m2_by_canton`` on a cleaned CSV.
+
+    Gives the same result as
+    ``average_rent_per_m2_by_canton(clean_data(load_data(path)))`` while only
+    holding one chunk in memory.
+
+    Parameters
+    ----------
+    path : str
+        Path to a rent listings CSV.
+    chunksize : int, optional
+        Number of rows read at a time.
+
+    Returns
+    -------
+    pandas.DataFrame
+        DataFrame with:
+        - canton
+        - avg_rent_per_m2
+    """
+    acc = GroupMean("canton", "rent_per_m2")
+
+    for chunk in iter_clean_chunks(path, chunksize):
+        if not {"canton", "price_chf", "area_m2"}.issubset(chunk.columns):
+            raise ValueError("DataFrame must contain canton, price_chf and area_m2 columns.")
+        chunk = chunk.assign(rent_per_m2=chunk["price_chf"] / chunk["area_m2"])
+        acc.update(chunk)
+
+    return (
+        acc.result()
+        .reset_index(name="avg_rent_per_m2")
+        .sort_values("avg_rent_per_m2", ascending=False)
+    )
+
+
+def stream_rank_cantons_by_rent(path: str, chunksize: int = DEFAULT_CHUNKSIZE) -> pd.DataFrame:
+    """
+    Streaming version of ``rank_cantons_by_rent`` on a cleaned CSV.
+
+    Returns
+    -------
+    pandas.DataFrame
+        DataFrame with:
+        - canton
+        - avg_rent_per_m2
+    """
+    result = stream_average_rent_per_m2_by_canton(path, chunksize)
+    return result.sort_values("avg_rent_per_m2", ascending=False).reset_index(drop=True)
+
+
+def stream_average_price_by_zip(path: str, chunksize: int = DEFAULT_CHUNKSIZE) -> pd.DataFrame:
+    """
+    Mean listing price per zip code (and canton, if present) of a cleaned CSV.
+
+    The output uses the ``zip_code`` / ``price_chf`` columns expected by
+    ``compute_price_to_rent_ratio``, so the per-zip means of a rent file and a
+    buy file can be passed to it directly.
+
+    Returns
+    -------
+    pandas.DataFrame
+        DataFrame with:
+        - zip_code
+        - canton (if the file has a canton column)
+        - price_chf
+    """
+    acc = None
+
+    for chunk in iter_clean_chunks(path, chunksize):
+        if acc is None:
+            by = ["zip", "canton"] if "canton" in chunk.columns else ["zip"]
+            acc = GroupMean(by, "price_chf")
+        acc.update(chunk)
+
+    if acc is None:
+        return pd.DataFrame(columns=["zip_code", "price_chf"])
+    return acc.result().reset_index().rename(columns={"zip": "zip_code"})
@@ -0,0 +1,211 @@
+import numpy as np
+import pandas as pd
+
+# Swiss zip codes have four digits: one slot per possible code
+N_ZIP_SLOTS = 10_000
+
+# Canton code of a slot with no listings, or with listings in several cantons
+NO_CANTON = -1
+MIXED_CANTONS = -2
+
+
+class ZipIndex:
+    """
+    Per-zip aggregates of one market, in dense arrays indexed by zip code.
+
+    Slot ``z`` of each array holds the number of rows, the sum and count of
+    (non-missing) prices for zip code ``z``, and the canton of that zip. Two indexes are aligned by
+    construction, so the price-to-rent ratio is plain array arithmetic,
+    without any join.
+
+    Build it with ``ZipIndex.from_listings``.
+    """
+
+    def __init__(self, rows, price_sum, price_count, canton_codes, cantons, zip_dtype="int64"):
+        self.rows = rows
+        self.price_sum = price_sum
+        self.price_count = price_count
+        self.canton_codes = canton_codes
+        self.cantons = list(cantons)
+        self.zip_dtype = np.dtype(zip_dtype)
+
+    @classmethod
+    def from_listings(cls, df: pd.DataFrame, column: str = "price_chf", cantons=None) -> "ZipIndex":
+        """
+        Aggregate listings (or per-zip means) by zip code.
+
+        Listing-level input is aggregated here, so each zip code ends up with
+        exactly one mean price, whatever the number of rows per zip. Rows
+        with a missing zip code are left out.
+
+        Parameters
+        ----------
+        df : pandas.DataFrame
+            Rows with 'zip' or 'zip_code', the price column and optionally
+            'canton'.
+        column : str, optional
+            Price column (default 'price_chf').
+        cantons : list, optional
+            Canton labels, so that two indexes share the same canton codes.
+            By default the categories of a categorical 'canton' column, else
+            the sorted cantons found in ``df``.
+
+        Returns
+        -------
+        ZipIndex
+        """
+        zip_col = "zip_code" if "zip_code" in df.columns else "zip"
+        if zip_col not in df.columns or column not in df.columns:
+            raise ValueError(f"DataFrame must contain 'zip_code' (or 'zip') and '{column}' columns.")
+
+        zip_dtype = df[zip_col].dtype if isinstance(df[zip_col].dtype, np.dtype) else np.dtype("float64")
+        zips = df[zip_col].to_numpy(dtype="float64", na_value=np.nan)
+        # Rows without a zip code are left out, as by a groupby on it
+        has_zip = ~np.isnan(zips)
+        zips = zips[has_zip]
+        if len(zips) and (zips.min() < 0 or zips.max() >= N_ZIP_SLOTS or (zips % 1).any()):
+            raise ValueError("Zip codes must be integers between 0 and 9999.")
+        zips = zips.astype(np.intp)
+        prices = df[column].to_numpy(dtype="float64", na_value=np.nan)[has_zip]
+        has_price = ~np.isnan(prices)
+
+        rows = np.bincount(zips, minlength=N_ZIP_SLOTS)
+        price_sum = np.bincount(zips[has_price], weights=prices[has_price], minlength=N_ZIP_SLOTS)
+        price_count = np.bincount(zips[has_price], minlength=N_ZIP_SLOTS)
+
+        canton = df["canton"][has_zip] if "canton" in df.columns else None
+        if cantons is None:
+            cantons = _canton_labels(canton) if canton is not None else []
+        canton_codes = np.full(N_ZIP_SLOTS, NO_CANTON, dtype=np.int16)
+        if canton is not None and len(zips):
+            if isinstance(canton.dtype, pd.CategoricalDtype) and list(canton.cat.categories) == list(cantons):
+                codes = canton.cat.codes.to_numpy().astype(np.int16)
+            else:
+                codes = pd.Index(cantons).get_indexer(canton.astype(str)).astype(np.int16)
+            # Rows without a canton do not vote
+            zips, codes = zips[codes >= 0], codes[codes >= 0]
+            low = np.full(N_ZIP_SLOTS, np.iinfo(np.int16).max, dtype=np.int16)
+            high = np.full(N_ZIP_SLOTS, NO_CANTON, dtype=np.int16)
+            np.minimum.at(low, zips, codes)
+            np.maximum.at(high, zips, codes)
+            seen = high != NO_CANTON
+            canton_codes[seen] = np.where(low[seen] == high[seen], high[seen], MIXED_CANTONS)
+
+        return cls(rows, price_sum, price_count, canton_codes, cantons, zip_dtype)
+
+    def merge(self, other: "ZipIndex") -> "ZipIndex":
+        """
+        Index of the rows of both indexes, as if built from all of them.
+
+        A zip code whose rows fall in different cantons in the two indexes
+        is marked as lying in several cantons.
+        """
+        cantons = self.cantons + [c for c in other.cantons if c not in self.cantons]
+        mapping = np.asarray(pd.Index(cantons).get_indexer(other.cantons), dtype=np.int16)
+        other_codes = other.canton_codes.copy()
+        other_codes[other_codes >= 0] = mapping[other_codes[other_codes >= 0]]
+
+        codes = np.where(self.canton_codes == NO_CANTON, other_codes, self.canton_codes)
+        conflict = (self.canton_codes != NO_CANTON) & (other_codes != NO_CANTON) \
+            & (self.canton_codes != other_codes)
+        codes[conflict] = MIXED_CANTONS
+        return ZipIndex(
+            self.rows + other.rows,
+            self.price_sum + other.price_sum,
+            self.price_count + other.price_count,
+            codes.astype(np.int16),
+            cantons,
+            self.zip_dtype,
+        )
+
+    def append(self, df: pd.DataFrame, column: str = "price_chf") -> "ZipIndex":
+        """Index of the current rows plus the rows of ``df``."""
+        return self.merge(ZipIndex.from_listings(df, column))
+
+    @property
+    def mean_price(self) -> np.ndarray:
+        """Mean price per zip slot (NaN where there is no price)."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.price_count > 0, self.price_sum / self.price_count, np.nan)
+
+    def zip_codes(self) -> np.ndarray:
+        """Zip codes that have at least one row."""
+        return np.flatnonzero(self.rows > 0).astype(self.zip_dtype)
+
+
+def _canton_labels(canton: pd.Series) -> list:
+    """Categories of a categorical canton column, else its sorted values."""
+    if isinstance(canton.dtype, pd.CategoricalDtype):
+        return list(canton.cat.categories)
+    return sorted(canton.dropna().astype(str).unique())
+
+
+def price_to_rent_ratio_by_zip(buy, rent) -> pd.DataFrame:
+    """
+    Price-to-rent ratio per zip code, computed on dense zip-indexed arrays.
+
+    Formula: ratio = mean buy price / (12 * mean monthly rent)
+
+    Listing-level frames can be passed directly: they are aggregated per zip
+    first instead of being joined row by row. A zip is kept when it has rows
+    in both markets (its ratio is NaN if one side has no price). When both
+    markets have cantons, it must also lie in a single canton, the same in
+    both.
+
+    This matches ``compute_price_to_rent_ratio`` given the mean prices per
+    zip code (and canton), except for zip codes whose listings lie in
+    several cantons: the merge gives them one row per canton, while here
+    they are left out, since a zip slot holds a single canton. Without
+    cantons on either side, all the listings of a zip code are averaged
+    together.
+
+    Parameters
+    ----------
+    buy, rent : ZipIndex or pandas.DataFrame
+        Buy and rent prices, as ``ZipIndex`` or as frames accepted by
+        ``ZipIndex.from_listings``.
+
+    Returns
+    -------
+    pandas.DataFrame
+        DataFrame sorted by zip code, with columns:
+        - zip_code
+        - canton (if both markets have one)
+        - buy_price_chf
+        - rent_price_chf
+        - price_to_rent_ratio
+    """
+    if isinstance(buy, pd.DataFrame) and isinstance(rent, pd.DataFrame) \
+            and "canton" in buy.columns and "canton" in rent.columns:
+        cantons = _canton_labels(buy["canton"])
+        if _canton_labels(rent["canton"]) != cantons:
+            cantons = sorted(set(cantons) | set(_canton_labels(rent["canton"])))
+    else:
+        cantons = None
+    if isinstance(buy, pd.DataFrame):
+        buy = ZipIndex.from_listings(buy, cantons=cantons)
+    if isinstance(rent, pd.DataFrame):
+        rent = ZipIndex.from_listings(rent, cantons=cantons)
+
+    keep = (buy.rows > 0) & (rent.rows > 0)
+    with_cantons = bool(buy.cantons) and bool(rent.cantons)
+    if with_cantons:
+        if buy.cantons != rent.cantons:
+            # Re-code the rent cantons with the buy labels
+            mapping = pd.Index(buy.cantons).get_indexer(rent.cantons)
+            rent_codes = np.where(rent.canton_codes >= 0, mapping[rent.canton_codes], rent.canton_codes)
+        else:
+            rent_codes = rent.canton_codes
+        keep &= (buy.canton_codes >= 0) & (buy.canton_codes == rent_codes)
+
+    zip_codes = np.flatnonzero(keep)
+    buy_price = buy.mean_price[zip_codes]
+    rent_price = rent.mean_price[zip_codes]
+
+    result = {"zip_code": zip_codes.astype(buy.zip_dtype)}
+    if with_cantons:
+        result["canton"] = pd.Categorical.from_codes(buy.canton_codes[zip_codes], categories=buy.cantons)
+    result["buy_price_chf"] = buy_price
+    result["rent_price_chf"] = rent_price
+    result["price_to_rent_ratio"] = buy_price / (12 * rent_price)
+    return pd.DataFrame(result)
@@ -0,0 +1,93 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from realestateCH import batch
+from realestateCH.batch import filter_grid, run_batch, run_spec
+from realestateCH.listingindex import ListingIndex
+from realestateCH.load import load_buy_data, load_rent_data
+from realestateCH.metrics import rank_cantons_visual
+
+
+def test_filter_grid():
+    specs = filter_grid([(1, 3), (3, None)], [(None, 2000)], markets=("rent", "buy"))
+
+    assert len(specs) == 4
+    assert specs[0] == {"market": "rent", "cantons": None, "rooms": (1, 3), "price": (None, 2000)}
+
+
+def test_run_batch_in_process_pool_matches_serial():
+    rent = load_rent_data()
+    buy = load_buy_data()
+    specs = filter_grid([(1, 2.5), (3, None)], [(None, 3000), (None, 800000)], cantons=["GE", "VD", "ZH"])
+
+    serial = run_batch(specs, rent, buy, processes=1)
+    parallel = run_batch(specs, rent, buy, processes=2)
+
+    assert [r["spec"] for r in parallel] == specs
+    for a, b in zip(serial, parallel):
+        pd.testing.assert_frame_equal(a["ranking"], b["ranking"], check_dtype=False)
+        pd.testing.assert_frame_equal(a["ratio"], b["ratio"], check_dtype=False)
+
+    # First spec: rent, 1 to 2.5 rooms, up to CHF 3000
+    selected = rent[rent["rooms"].between(1, 2.5) & (rent["price_chf"] <= 3000)
+                    & rent["canton"].isin(["GE", "VD", "ZH"])]
+    expected = rank_cantons_visual(selected, metric_name="Avg Rent/m²")
+    pd.testing.assert_frame_equal(serial[0]["ranking"], expected)
+
+
+def test_run_batch_maps_the_shared_listings_by_default():
+    specs = filter_grid([(3, None)], [(None, 3000), (None, 900000)], cantons=["GE", "ZH"])
+
+    shared = run_batch(specs, processes=2)
+    given = run_batch(specs, load_rent_data(), load_buy_data(), processes=1)
+
+    for a, b in zip(shared, given):
+        pd.testing.assert_frame_equal(a["ranking"], b["ranking"], check_dtype=False)
+        pd.testing.assert_frame_equal(a["ratio"], b["ratio"], check_dtype=False)
+
+
+def _worker_columns_outside_mapping(paths: dict) -> dict:
+    """Columns of the worker's frames that are not views of their mapped file."""
+    ranges = {market: [] for market in paths}
+    with open("/proc/self/maps") as f:
+        for line in f:
+            for market, path in paths.items():
+                if line.rstrip().endswith(os.path.realpath(path)):
+                    low, high = line.split()[0].split("-")
+                    ranges[market].append((int(low, 16), int(high, 16)))
+    outside = {}
+    for market, df in batch._frames.items():
+        outside[market] = []
+        for col in df.columns:
+            values = df[col].array.codes if col == "canton" else df[col].to_numpy()
+            address = values.__array_interface__["data"][0]
+            if not any(low <= address < high for low, high in ranges[market]):
+                outside[market].append(col)
+    return outside
+
+
+def test_batch_workers_share_the_mapped_listings(tmp_path):
+    paths = {}
+    for market, df in (("rent", load_rent_data()), ("buy", load_buy_data())):
+        paths[market] = str(tmp_path / f"{market}.feather")
+        batch._write_shared(df, paths[market])
+
+    with ProcessPoolExecutor(1, initializer=batch._init_worker, initargs=(paths,)) as pool:
+        outside = pool.submit(_worker_columns_outside_mapping, paths).result()
+
+    # No worker holds a private copy of the listings
+    assert outside == {"rent": [], "buy": []}
+
+
+def test_run_spec_on_listing_indexes():
+    rent = load_rent_data().rename(columns={"zip": "zip_code"})
+    buy = load_buy_data().rename(columns={"zip": "zip_code"})
+    indexes = ListingIndex(rent), ListingIndex(buy)
+
+    for spec in filter_grid([(1, 2.5), (3, None)], [(None, 3000)], cantons=["GE", "VD", "ZH"]):
+        expected = run_spec(spec, rent, buy)
+        result = run_spec(spec, *indexes)
+        pd.testing.assert_frame_equal(result["ranking"], expected["ranking"])
+        pd.testing.assert_frame_equal(result["ratio"], expected["ratio"])
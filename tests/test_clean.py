@@ -1,5 +1,6 @@
+import pytest
 import pandas as pd
-from realestateCH.clean import clean_data
+from realestateCH.clean import clean_data, extract_listing_ids
 
 def test_clean_data():
     sample = pd.DataFrame({
@@ -14,3 +15,49 @@ def test_clean_data():
     assert cleaned["price_chf"].dtype != object
     assert cleaned["rooms"].dtype != object
     assert cleaned["area_m2"].dtype != object
+
+
+def test_clean_data_keeps_categorical_canton():
+    sample = pd.DataFrame({
+        "price_chf": [1000.0, 2000.0],
+        "area_m2": [50.0, 80.0],
+        "canton": pd.Categorical(["VD", "ZH"], categories=["VD", "ZH", "GE"]),
+    })
+
+    cleaned = clean_data(sample)
+
+    assert isinstance(cleaned["canton"].dtype, pd.CategoricalDtype)
+    assert cleaned["canton"].tolist() == ["VD", "ZH"]
+
+
+def test_extract_listing_ids():
+    urls = pd.Series(["https://www.homegate.ch/acheter/4002635527", "N/A", "https://www.homegate.ch/louer/17/"])
+
+    ids = extract_listing_ids(urls)
+
+    assert ids.tolist() == [4002635527, pd.NA, 17]
+
+
+def test_clean_data_dedupes_on_listing_id():
+    sample = pd.DataFrame({
+        "zip": [1000, 1003, 1000, 1000, 1000],
+        "url": [
+            "https://www.homegate.ch/louer/4000000001",
+            # Same listing found again from a neighbouring zip, new price format
+            "https://www.homegate.ch/louer/4000000001",
+            "https://www.homegate.ch/louer/4000000002",
+            "N/A",
+            "N/A",
+        ],
+        "price_chf": ["2000", "2000.0", "1500", "1800", "1800"],
+        "area_m2": [50, 50, 30, 40, 40],
+    })
+
+    first = clean_data(sample)
+    last = clean_data(sample, keep="last")
+
+    assert first["zip"].tolist() == [1000, 1000, 1000]
+    assert first["listing_id"].tolist() == [4000000001, 4000000002, pd.NA]
+    assert last["zip"].tolist() == [1003, 1000, 1000]
+    with pytest.raises(ValueError):
+        clean_data(sample, keep="latest")
@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from realestateCH.cube import ListingCube, price_to_rent_ratio_from_cubes
+from realestateCH.load import load_buy_data, load_rent_data
+from realestateCH.metrics import compute_price_to_rent_ratio, rank_cantons_visual
+
+
+def sample_listings():
+    return pd.DataFrame({
+        "zip": [1000, 1000, 1003, 8001, 8001, 1200, 1200],
+        "price_chf": [2000, 1550, 3000, 4000, np.nan, 2500, 1000],
+        "rooms": [2.5, 1.5, 3.5, 4.5, 3.0, np.nan, 2.0],
+        "area_m2": [50, 30, 100, np.nan, 70, 60, 25],
+        "canton": ["VD", "VD", "VD", "ZH", "ZH", "GE", "GE"],
+    })
+
+
+def test_rollup_by_canton_matches_groupby():
+    df = sample_listings()
+    cube = ListingCube.from_listings(df)
+
+    result = cube.rollup("canton").set_index("canton")
+
+    expected = df.groupby("canton")["price_chf"].agg(["count", "mean", "std"])
+    assert result["listings"].tolist() == [2, 3, 2]
+    assert result["price_chf_count"].tolist() == expected["count"].tolist()
+    np.testing.assert_allclose(result["price_chf_mean"], expected["mean"])
+    np.testing.assert_allclose(result["price_chf_std"], expected["std"])
+
+
+def test_range_filters_include_bounds():
+    df = sample_listings()
+    cube = ListingCube.from_listings(df)
+
+    # 1550 and 2000 are in range, 2500 is just above, 1000 just below
+    result = cube.summary(rooms=(1.5, 2.5), price=(1500, 2000))
+
+    assert result["listings"] == 2
+    assert result["avg_price"] == (2000 + 1550) / 2
+    assert result["avg_area"] == (50 + 30) / 2
+
+
+def test_missing_values_only_count_without_filter():
+    cube = ListingCube.from_listings(sample_listings())
+
+    assert cube.summary()["listings"] == 7
+    assert cube.summary(rooms=(0, 10))["listings"] == 6
+    assert cube.summary(price=(0, 10000))["listings"] == 6
+
+
+def test_numpy_engine_builds_the_same_cells():
+    rent = load_rent_data()
+    expected = ListingCube.from_listings(rent)
+    cube = ListingCube.from_listings(rent, engine="numpy")
+
+    keys = ["canton", "zip_code", "rooms_bucket", "price_bucket", "rooms_edge", "price_edge"]
+    left = expected.cells.sort_values(keys, ignore_index=True)
+    right = cube.cells.sort_values(keys, ignore_index=True)
+    pd.testing.assert_frame_equal(right, left, check_exact=False, rtol=1e-9)
+
+
+def test_cube_matches_listing_scan_on_real_data():
+    rent = load_rent_data().rename(columns={"zip": "zip_code"})
+    buy = load_buy_data().rename(columns={"zip": "zip_code"})
+    rent_cube = ListingCube.from_listings(rent)
+    buy_cube = ListingCube.from_listings(buy)
+    cantons, rooms, price = ["GE", "VD", "ZH"], (2.0, 4.5), (1000, 3000)
+
+    m_rent = rent["canton"].isin(cantons) & rent["rooms"].between(*rooms) & rent["price_chf"].between(*price)
+    m_buy = buy["canton"].isin(cantons) & buy["rooms"].between(*rooms)
+
+    ranking = rent_cube.rank_cantons_visual("Avg Rent/m²", cantons, rooms, price)
+    expected = rank_cantons_visual(rent[m_rent])
+    assert ranking["Canton"].tolist() == expected["Canton"].tolist()
+    np.testing.assert_allclose(ranking["Avg Rent/m²"], expected["Avg Rent/m²"])
+
+    ratio = price_to_rent_ratio_from_cubes(buy_cube, rent_cube, cantons, rooms, rent_price=price)
+    r_agg = rent[m_rent].groupby(["zip_code", "canton"], observed=True)["price_chf"].mean().reset_index()
+    b_agg = buy[m_buy].groupby(["zip_code", "canton"], observed=True)["price_chf"].mean().reset_index()
+    expected = compute_price_to_rent_ratio(b_agg, r_agg)
+    assert ratio["zip_code"].tolist() == expected["zip_code"].tolist()
+    np.testing.assert_allclose(ratio["price_to_rent_ratio"], expected["price_to_rent_ratio"])
+
+
+def test_off_grid_bounds_match_listing_mask():
+    rent = load_rent_data().rename(columns={"zip": "zip_code"})
+    buy = load_buy_data().rename(columns={"zip": "zip_code"})
+    half = len(rent) // 2
+    rent_cube = ListingCube.from_listings(rent.iloc[:half]).append(rent.iloc[half:])
+    buy_cube = ListingCube.from_listings(buy, engine="numpy")
+    cantons, rooms, price = ["GE", "VD", "ZH"], (1.2, 4.7), (1550, 2999)
+
+    m_rent = rent["canton"].isin(cantons) & rent["rooms"].between(*rooms) & rent["price_chf"].between(*price)
+    m_buy = buy["canton"].isin(cantons) & buy["rooms"].between(*rooms)
+
+    summary = rent_cube.summary(None, (1.0, 10.0), price)
+    everywhere = rent["rooms"].between(1.0, 10.0) & rent["price_chf"].between(*price)
+    assert summary["listings"] == everywhere.sum()
+    np.testing.assert_allclose(summary["avg_price"], rent.loc[everywhere, "price_chf"].mean())
+
+    ranking = rent_cube.rank_cantons_visual("Avg Rent/m²", cantons, rooms, price)
+    expected = rank_cantons_visual(rent[m_rent])
+    assert ranking["Canton"].tolist() == expected["Canton"].tolist()
+    np.testing.assert_allclose(ranking["Avg Rent/m²"], expected["Avg Rent/m²"])
+
+    ratio = price_to_rent_ratio_from_cubes(buy_cube, rent_cube, cantons, rooms, rent_price=price)
+    r_agg = rent[m_rent].groupby(["zip_code", "canton"], observed=True)["price_chf"].mean().reset_index()
+    b_agg = buy[m_buy].groupby(["zip_code", "canton"], observed=True)["price_chf"].mean().reset_index()
+    expected = compute_price_to_rent_ratio(b_agg, r_agg)
+    assert ratio["zip_code"].tolist() == expected["zip_code"].tolist()
+    np.testing.assert_allclose(ratio["price_to_rent_ratio"], expected["price_to_rent_ratio"])
+
+    # Without its listings, a cube only answers bounds on the grid
+    cube = ListingCube(rent_cube.cells)
+    assert cube.summary(price=(1500, 3000)) == rent_cube.summary(price=(1500, 3000))
+    with pytest.raises(ValueError):
+        cube.summary(price=price)
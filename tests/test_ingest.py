@@ -0,0 +1,151 @@
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from realestateCH.cube import ListingCube
+from realestateCH.clean import extract_listing_ids
+from realestateCH.ingest import CantonAssignmentWarning, assign_canton, canton_coverage, ingest_batch, zip_canton_codes
+from realestateCH import load
+from realestateCH.load import _cache_path, _delta_paths, _raw_data_path, load_data
+from realestateCH.schema import LISTING_DTYPES
+from realestateCH.zipindex import ZipIndex
+
+
+def write_files(tmp_path):
+    stored = tmp_path / "Total-Rent-WithCanton.csv"
+    stored.write_text(
+        "zip,url,price_chf,rooms,area_m2,canton\n"
+        "1000,https://www.homegate.ch/louer/4000000001,2000.0,2.5,50.0,VD\n"
+        "8001,https://www.homegate.ch/louer/4000000002,3000.0,3.5,70.0,ZH\n"
+    )
+    batch = tmp_path / "rent_results.csv"
+    batch.write_text(
+        "zip,url,price_chf,rooms,area_m2\n"
+        "1000,https://www.homegate.ch/louer/4000000001,2100.0,2.5,50.0\n"
+        "1003,https://www.homegate.ch/louer/4000000003,1800.0,1.5,N/A\n"
+        "1003,https://www.homegate.ch/louer/4000000003,1800.0,1.5,N/A\n"
+        "8001,https://www.homegate.ch/louer/4000000004,2500.0,2.0,45.0\n"
+    )
+    zip_codes = tmp_path / "zip_codes_selected.csv"
+    zip_codes.write_text('zip,locality,canton\n1000,Lausanne,VD\n1003,Lausanne,VD\n8001,"Zürich",ZH\n')
+    return stored, batch, zip_codes
+
+
+def test_ingest_batch_appends_only_new_listings(tmp_path):
+    stored, batch, zip_codes = write_files(tmp_path)
+    # Build the columnar cache first: ingestion updates it
+    load_data(stored, dtype=LISTING_DTYPES)
+
+    added = ingest_batch(batch, "rent", target_path=stored, zip_codes_path=zip_codes)
+
+    assert extract_listing_ids(added["url"]).tolist() == [4000000003, 4000000004]
+    assert added["canton"].astype(str).tolist() == ["VD", "ZH"]
+
+    # The cached copy matches a fresh parse of the appended CSV
+    cached = load_data(stored, dtype=LISTING_DTYPES)
+    parsed = pd.read_csv(stored, dtype=LISTING_DTYPES)
+    pd.testing.assert_frame_equal(cached, parsed)
+    assert len(parsed) == 4
+
+    # Ingesting the same batch again adds nothing
+    assert ingest_batch(batch, "rent", target_path=stored, zip_codes_path=zip_codes).empty
+    assert len(pd.read_csv(stored)) == 4
+
+
+def test_aggregates_can_be_updated_with_new_rows(tmp_path):
+    stored, batch, zip_codes = write_files(tmp_path)
+    before = pd.read_csv(stored, dtype=LISTING_DTYPES)
+    cube = ListingCube.from_listings(before)
+    index = ZipIndex.from_listings(before)
+
+    added = ingest_batch(batch, "rent", target_path=stored, zip_codes_path=zip_codes)
+
+    after = pd.read_csv(stored, dtype=LISTING_DTYPES)
+    pd.testing.assert_frame_equal(cube.append(added).rollup("canton"), ListingCube.from_listings(after).rollup("canton"))
+    full = ZipIndex.from_listings(after)
+    updated = index.append(added)
+    np.testing.assert_array_equal(updated.rows, full.rows)
+    np.testing.assert_array_equal(updated.price_sum, full.price_sum)
+    np.testing.assert_array_equal(updated.canton_codes, full.canton_codes)
+
+
+def test_ingest_batch_writes_deltas_instead_of_rewriting(tmp_path, monkeypatch):
+    stored, _, zip_codes = write_files(tmp_path)
+    load_data(stored, dtype=LISTING_DTYPES)
+    cache_path = _cache_path(stored, LISTING_DTYPES)
+    monkeypatch.setattr(load, "MAX_CACHE_DELTAS", 3)
+
+    for i in range(4):
+        batch = tmp_path / f"batch_{i}.csv"
+        batch.write_text(
+            "zip,url,price_chf,rooms,area_m2\n"
+            f"1000,https://www.homegate.ch/louer/40000001{i}0,2100.0,2.5,50.0\n"
+            f"1003,https://www.homegate.ch/louer/40000001{i}1,1800.0,1.5,N/A\n"
+        )
+        base = os.stat(cache_path).st_mtime_ns
+        ingest_batch(batch, "rent", target_path=stored, zip_codes_path=zip_codes)
+
+        # Only the new rows are written, next to the untouched cache
+        assert os.stat(cache_path).st_mtime_ns == base
+        assert len(_delta_paths(cache_path)) == i + 1
+        if i < 3:
+            pd.testing.assert_frame_equal(load_data(stored, dtype=LISTING_DTYPES), pd.read_csv(stored, dtype=LISTING_DTYPES))
+
+    # One more delta than allowed: the next load rewrites the cache as one file
+    cached = load_data(stored, dtype=LISTING_DTYPES)
+    assert _delta_paths(cache_path) == []
+    pd.testing.assert_frame_equal(cached, pd.read_csv(stored, dtype=LISTING_DTYPES))
+    pd.testing.assert_frame_equal(load_data(stored, dtype=LISTING_DTYPES), cached)
+
+
+def test_ingest_batch_skips_stored_rows_without_listing_id(tmp_path):
+    stored, _, zip_codes = write_files(tmp_path)
+    batch = tmp_path / "rent_results.csv"
+    batch.write_text(
+        "zip,url,price_chf,rooms,area_m2\n"
+        "1000,N/A,2100.0,2.5,50.0\n"
+        "1000,N/A,2100.0,2.5,50.0\n"
+        "8001,N/A,2500.0,2.0,N/A\n"
+    )
+
+    added = ingest_batch(batch, "rent", target_path=stored, zip_codes_path=zip_codes)
+    assert len(added) == 2
+
+    # Matched against the stored rows, through the key index and when the
+    # index is rebuilt from the file
+    assert ingest_batch(batch, "rent", target_path=stored, zip_codes_path=zip_codes).empty
+    for path in glob.glob(str(tmp_path / ".cache" / "*-keys.feather*")):
+        os.remove(path)
+    assert ingest_batch(batch, "rent", target_path=stored, zip_codes_path=zip_codes).empty
+    assert len(pd.read_csv(stored)) == 4
+
+
+def test_assign_canton_reports_unmapped_and_ambiguous_zips():
+    table = pd.DataFrame({"zip": [1000, 1003, 8001, 4000, 4000], "canton": ["VD", "VD", "ZH", "BS", "BL"]})
+    codes = zip_canton_codes(table)
+    listings = pd.DataFrame({"zip": [1003, 8001, 4000, 9999, 1000], "price_chf": [1.0, 2.0, 3.0, 4.0, 5.0]})
+
+    with pytest.warns(CantonAssignmentWarning, match="1 unmapped zip code"):
+        result = assign_canton(listings, codes=codes)
+
+    assert result["canton"].tolist()[:2] == ["VD", "ZH"]
+    assert result["canton"].isna().tolist() == [False, False, True, True, False]
+    assert result["canton"].dtype == LISTING_DTYPES["canton"]
+    assert "canton" not in listings.columns
+    coverage = canton_coverage(listings["zip"], codes=codes)
+    assert coverage["unmapped"].tolist() == [9999]
+    assert coverage["ambiguous"].tolist() == [4000]
+    with pytest.raises(ValueError):
+        assign_canton(listings, codes=codes, errors="raise")
+
+
+def test_assign_canton_matches_the_enriched_files():
+    raw = load_data(_raw_data_path("Total-Rent.csv"), dtype={"zip": "uint16"}).drop(columns="canton")
+
+    result = assign_canton(raw, errors="raise")
+
+    stored = load_data(_raw_data_path("Total-Rent-WithCanton.csv"), dtype=LISTING_DTYPES)
+    assert result["canton"].equals(stored["canton"])
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from realestateCH.kernels import GroupIndex
+from realestateCH.load import load_rent_data
+
+
+def test_group_index_matches_groupby():
+    df = pd.DataFrame({
+        "canton": pd.Categorical(["VD", "ZH", "VD", None, "GE", "ZH", "VD"],
+                                 categories=["GE", "VD", "ZH", "TI"]),
+        "zip_code": np.array([1003, 8001, 1000, 1000, 1200, 8001, 1003], dtype="uint16"),
+        "price_chf": [2000, 4000, 1500, 900, np.nan, 3000, 2500],
+    })
+    groups = GroupIndex(df, ["zip_code", "canton"])
+    grouped = df.groupby(["zip_code", "canton"], observed=True)["price_chf"]
+
+    # Only observed keys, in sorted order; the row without a canton is left out
+    expected = grouped.mean().reset_index()
+    pd.testing.assert_frame_equal(groups.keys, expected[["zip_code", "canton"]])
+    assert groups.size().tolist() == grouped.size().tolist()
+    assert groups.count(df["price_chf"]).tolist() == grouped.count().tolist()
+    np.testing.assert_allclose(groups.sum(df["price_chf"]), grouped.sum())
+    np.testing.assert_allclose(groups.mean(df["price_chf"]), expected["price_chf"])
+    np.testing.assert_allclose(groups.median(df["price_chf"]), grouped.median())
+
+
+def test_group_index_on_real_data():
+    rent = load_rent_data(include_url=False)
+    groups = GroupIndex(rent, "canton")
+    grouped = rent.groupby("canton", observed=True)["price_chf"]
+
+    assert groups.keys["canton"].tolist() == grouped.mean().index.tolist()
+    np.testing.assert_allclose(groups.mean(rent["price_chf"]), grouped.mean())
+    np.testing.assert_allclose(groups.median(rent["price_chf"]), grouped.median())
+
+    with pytest.raises(ValueError):
+        groups.sum(rent["price_chf"].iloc[:10])
+    with pytest.raises(ValueError):
+        GroupIndex(rent, "municipality")
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from realestateCH.listingindex import ListingIndex
+from realestateCH.load import load_buy_data, load_rent_data
+
+
+def test_rows_match_masks():
+    df = pd.DataFrame({
+        "canton": ["VD", "ZH", "VD", None, "GE", "ZH", "VD", "GE"],
+        "rooms": [2.5, 3.0, np.nan, 2.0, 4.5, 3.0, 3.5, 1.0],
+        "price_chf": [2000, 4000, 1500, 900, np.nan, 3000, 2500, 1200],
+    })
+    index = ListingIndex(df)
+
+    # Missing values only match open ranges, rows without a canton no canton filter
+    assert index.rows().tolist() == list(range(8))
+    assert index.rows(["VD", "ZH"]).tolist() == [0, 1, 2, 5, 6]
+    assert index.rows(rooms=(2.5, None)).tolist() == [0, 1, 4, 5, 6]
+    assert index.rows(["VD", "GE", "VD"], rooms=(None, 3.5), price=(1200, 2500)).tolist() == [0, 6, 7]
+    assert index.rows(["ZH"], rooms=(3.0, 3.0), price=(3000, 3000)).tolist() == [5]
+    assert index.rows(["TI"]).tolist() == []
+    pd.testing.assert_frame_equal(index.select(["GE"]), df[df["canton"] == "GE"])
+
+    with pytest.raises(ValueError):
+        index.rows(area=(50, None))
+
+
+def between(values, low, high):
+    mask = values.notna()
+    if low is not None:
+        mask &= values >= low
+    if high is not None:
+        mask &= values <= high
+    return mask
+
+
+def test_select_matches_dashboard_masks_on_real_data():
+    rent = load_rent_data()
+    buy = load_buy_data()
+    rent_index, buy_index = ListingIndex(rent), ListingIndex(buy)
+
+    for cantons, rooms, price in [(["GE", "VD", "ZH"], (2.0, 4.5), (1000, 3000)),
+                                  (None, (1.0, 10.0), (0, 10000)),
+                                  (["TI"], (3.5, None), (None, 2000))]:
+        m_rent = between(rent["rooms"], *rooms) & between(rent["price_chf"], *price)
+        m_buy = between(buy["rooms"], *rooms)
+        if cantons:
+            m_rent &= rent["canton"].isin(cantons)
+            m_buy &= buy["canton"].isin(cantons)
+
+        pd.testing.assert_frame_equal(rent_index.select(cantons, rooms, price), rent[m_rent])
+        pd.testing.assert_frame_equal(buy_index.select(cantons, rooms), buy[m_buy])
+        assert rent_index.count(cantons, rooms, price) == m_rent.sum()
@@ -1,12 +1,17 @@
 import os
+import numpy as np
 import pandas as pd
 
+from realestateCH import load
 from realestateCH.load import (
     load_data,
     load_rent_data,
     load_buy_data,
+    load_listing_urls,
+    load_shared_data,
 )
 from realestateCH.metrics import average_rent_per_m2_by_canton
+from realestateCH.schema import CANTON_DTYPE
 
 
 def test_load_data_with_temp_file(tmp_path):
@@ -79,3 +84,130 @@ def test_average_rent_per_m2_by_canton_on_real_data():
 
     # At least a few cantons should be present
     assert result["canton"].nunique() >= 2
+
+
+def test_load_data_writes_and_reuses_cache(tmp_path, monkeypatch):
+    """
+    The first load writes a columnar cache; the second one reads it
+    without parsing the CSV again.
+    """
+    path = tmp_path / "listings.csv"
+    pd.DataFrame({"zip": [1000, 1003], "price_chf": [1500.0, 2100.0]}).to_csv(path, index=False)
+
+    first = load_data(path)
+    assert (tmp_path / ".cache" / "listings.feather").exists()
+
+    def fail_read_csv(*args, **kwargs):
+        raise AssertionError("CSV should not be parsed again")
+
+    monkeypatch.setattr(pd, "read_csv", fail_read_csv)
+    second = load_data(path)
+
+    pd.testing.assert_frame_equal(first, second)
+
+
+def test_load_data_rebuilds_cache_when_csv_changes(tmp_path):
+    """
+    Editing the CSV must invalidate the cached copy.
+    """
+    path = tmp_path / "listings.csv"
+    pd.DataFrame({"price_chf": [1500.0]}).to_csv(path, index=False)
+    load_data(path)
+
+    pd.DataFrame({"price_chf": [1500.0, 900.0]}).to_csv(path, index=False)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    reloaded = load_data(path)
+
+    assert reloaded["price_chf"].tolist() == [1500.0, 900.0]
+
+
+def test_load_rent_data_applies_listing_schema():
+    """
+    Listing columns are typed while parsing: categorical canton,
+    uint16 zip and float32 rooms/area.
+    """
+    df = load_rent_data()
+
+    assert isinstance(df["canton"].dtype, pd.CategoricalDtype)
+    assert len(df["canton"].cat.categories) == 26
+    assert df["zip"].dtype == "uint16"
+    assert df["rooms"].dtype == "float32"
+    assert df["area_m2"].dtype == "float32"
+
+
+def test_load_buy_data_without_url_and_lazy_urls():
+    """
+    The url column can be skipped at load time and fetched later,
+    aligned on the same row index.
+    """
+    df = load_buy_data(include_url=False)
+    urls = load_listing_urls("buy")
+
+    assert "url" not in df.columns
+    assert len(urls) == len(df)
+    assert urls.index.equals(df.index)
+    assert urls.str.startswith("https://www.homegate.ch/").all()
+
+
+def _columns_outside_mapping(df, path) -> list:
+    """Columns of ``df`` whose values are not in this process's mapping of ``path``."""
+    ranges = []
+    with open("/proc/self/maps") as f:
+        for line in f:
+            if line.rstrip().endswith(os.path.realpath(path)):
+                low, high = line.split()[0].split("-")
+                ranges.append((int(low, 16), int(high, 16)))
+    outside = []
+    for col in df.columns:
+        values = df[col].array.codes if col == "canton" else df[col].to_numpy()
+        address = values.__array_interface__["data"][0]
+        if not any(low <= address < high for low, high in ranges):
+            outside.append(col)
+    return outside
+
+
+def test_shared_data_is_mapped_once_and_follows_the_csv(tmp_path, monkeypatch):
+    csv = tmp_path / "Total-Rent-WithCanton.csv"
+    csv.write_text(
+        "zip,url,price_chf,rooms,area_m2,canton\n"
+        "1000,https://www.homegate.ch/louer/1,2000,2.5,50,VD\n"
+        "8001,https://www.homegate.ch/louer/2,3000,3.5,,ZH\n"
+    )
+    monkeypatch.setattr(load, "_raw_data_path", lambda filename: str(tmp_path / filename))
+    monkeypatch.setattr(load, "_shared_frames", {})
+
+    shared = load_shared_data("rent")
+
+    expected = load_rent_data(include_url=False).rename(columns={"zip": "zip_code"})
+    pd.testing.assert_frame_equal(shared, expected[shared.columns.tolist()])
+    assert shared["canton"].dtype == CANTON_DTYPE
+    assert not shared["price_chf"].to_numpy().flags.writeable
+    # Every column is a view of the file pages, not a private copy
+    assert _columns_outside_mapping(shared, load.shared_data_path("rent")) == []
+    assert load_shared_data("rent") is shared
+
+    with open(csv, "a") as f:
+        f.write("1200,https://www.homegate.ch/louer/3,2500,3.0,60,GE\n")
+    assert load_shared_data("rent")["zip_code"].tolist() == [1000, 8001, 1200]
+
+
+def test_shared_data_of_many_rows_is_mapped_without_copy(tmp_path):
+    # Large enough for Feather's default record batches to split the columns
+    n = 200_000
+    df = pd.DataFrame({
+        "canton": pd.Categorical(["VD", "ZH"] * (n // 2)),
+        "zip_code": np.arange(n),
+        "rooms": np.full(n, 3.5),
+        "price_chf": np.where(np.arange(n) % 7 == 0, np.nan, 2000.0),
+        "area_m2": np.full(n, 70.0),
+    })
+    path = str(tmp_path / "shared.feather")
+    load._write_shared(df, path)
+
+    shared = load._map_shared(path)
+
+    # The canton comes back with the 26 categories of the listing schema
+    pd.testing.assert_frame_equal(shared, df.astype({"canton": CANTON_DTYPE}))
+    assert _columns_outside_mapping(shared, path) == []
@@ -0,0 +1,87 @@
+import pandas as pd
+
+from realestateCH.memo import MetricCache, cached, frame_fingerprint
+from realestateCH.metrics import compute_price_to_rent_ratio, rank_cantons_visual
+
+
+def listings():
+    return pd.DataFrame({
+        "canton": pd.Categorical(["VD", "VD", "ZH", "GE"]),
+        "zip_code": [1003, 1000, 8001, 1200],
+        "price_chf": [2000.0, 1500.0, 3000.0, 4000.0],
+        "area_m2": [50.0, 30.0, 100.0, 80.0],
+        "url": ["a", "b", "c", "d"],
+    })
+
+
+def test_fingerprint_follows_content():
+    df = listings()
+
+    assert frame_fingerprint(df) == frame_fingerprint(listings())
+    assert frame_fingerprint(df) != frame_fingerprint(df.assign(url=["a", "b", "c", "e"]))
+    assert frame_fingerprint(df) != frame_fingerprint(df.iloc[::-1])
+    # Only the listed columns are hashed
+    columns = ("canton", "price_chf", "area_m2")
+    assert frame_fingerprint(df, columns) == frame_fingerprint(df.assign(url=list("wxyz")), columns)
+
+
+def test_memory_tier_hits_and_copies():
+    cache = MetricCache()
+    rank = cached(rank_cantons_visual, cache)
+    df = listings()
+
+    first = rank(df)
+    first.loc[1, "Avg Rent/m²"] = 0.0
+    pd.testing.assert_frame_equal(rank(listings()), rank_cantons_visual(df))
+    rank(df, metric_name="Avg Buy Price/m²")
+    rank(df.assign(price_chf=df["price_chf"] * 2))
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 3, 3)
+    assert stats["hit_rate"] == 0.25
+
+
+def test_size_eviction_and_disk_tier(tmp_path):
+    df = listings()
+    ratio = MetricCache(max_bytes=1, directory=str(tmp_path)).wrap(compute_price_to_rent_ratio)
+    expected = compute_price_to_rent_ratio(df, df, duplicates="aggregate")
+
+    pd.testing.assert_frame_equal(ratio(df, df, duplicates="aggregate"), expected)
+    assert ratio.cache.stats()["entries"] == 0
+
+    # Another process (here, another cache) reads the result from disk
+    other = MetricCache(directory=str(tmp_path)).wrap(compute_price_to_rent_ratio)
+    pd.testing.assert_frame_equal(other(df, df, duplicates="aggregate"), expected)
+    assert other.cache.stats()["disk_hits"] == 1
+
+    # Over the disk budget, the least recently used files go first
+    small = MetricCache(directory=str(tmp_path), max_disk_bytes=1).wrap(compute_price_to_rent_ratio)
+    small(df, df)
+    assert small.cache.stats()["disk_evictions"] == 2
+    assert list(tmp_path.glob("*.pkl")) == []
+
+    # In memory, room for two results: the oldest ones are evicted
+    one = MetricCache()
+    one.wrap(rank_cantons_visual)(df)
+    cache = MetricCache(max_bytes=2 * one.stats()["bytes"])
+    rank = cache.wrap(rank_cantons_visual)
+    for factor in range(1, 6):
+        rank(df.assign(price_chf=df["price_chf"] * factor))
+    rank(df.assign(price_chf=df["price_chf"] * 5))
+    stats = cache.stats()
+    assert (stats["entries"], stats["evictions"], stats["hits"]) == (2, 3, 1)
+
+
+def test_stale_disk_results_are_misses(tmp_path):
+    df = listings()
+    cached(rank_cantons_visual, MetricCache(directory=str(tmp_path)))(df)
+    (path,) = tmp_path.glob("*.pkl")
+
+    # Pickled by an older version: a class that moved, then one that is gone
+    for stale in (b"cos\nno_such_function\n.", b"cno_such_module\nResult\n."):
+        path.write_bytes(stale)
+        rank = cached(rank_cantons_visual, MetricCache(directory=str(tmp_path)))
+        pd.testing.assert_frame_equal(rank(df), rank_cantons_visual(df))
+        assert rank.cache.stats()["misses"] == 1
+        # The stale file was replaced by the new result
+        assert path.read_bytes() != stale
@@ -1,3 +1,4 @@
+import pytest
 import pandas as pd
 from realestateCH.metrics import (
     compute_rent_per_m2,
@@ -5,6 +6,8 @@ from realestateCH.metrics import (
     compute_price_to_rent_ratio,
     average_rent_per_m2_by_canton,
     rank_cantons_by_rent,
+    price_per_m2,
+    rank_cantons_visual,
 )
 
 
@@ -104,3 +107,77 @@ def test_rank_cantons_by_rent():
     expected_order = ["GE", "VD", "ZH"]  # highest to lowest
 
     assert list(result["canton"]) == expected_order
+
+
+def test_compute_rent_per_m2_leaves_input_unchanged():
+    df = pd.DataFrame({
+        "price_chf": [2000, 1500],
+        "area_m2": [50, 30]
+    })
+
+    result = compute_rent_per_m2(df)
+    result.loc[0, "price_chf"] = 0
+
+    assert "rent_per_m2" not in df.columns
+    assert df.loc[0, "price_chf"] == 2000
+
+
+def test_compute_per_m2_inplace():
+    df = pd.DataFrame({
+        "price_chf": [800000, 500000],
+        "area_m2": [100, 50]
+    })
+
+    assert compute_buy_price_per_m2(df, inplace=True) is None
+    assert compute_rent_per_m2(df, inplace=True) is None
+
+    assert df["buy_price_per_m2"].tolist() == [8000, 10000]
+    assert df["rent_per_m2"].tolist() == [8000, 10000]
+
+
+def test_price_per_m2_returns_series():
+    df = pd.DataFrame({
+        "price_chf": [2000, 1500],
+        "area_m2": [50, 30]
+    }, index=[10, 20])
+
+    result = price_per_m2(df)
+
+    assert isinstance(result, pd.Series)
+    assert result.index.tolist() == [10, 20]
+    assert result.tolist() == [2000 / 50, 1500 / 30]
+
+
+def test_price_to_rent_ratio_guarded_modes():
+    buy = pd.DataFrame({"zip_code": [1000, 1000], "price_chf": [900000, 1100000]})
+    rent = pd.DataFrame({"zip_code": [1000, 1000], "price_chf": [1500, 2500]})
+
+    # Listing-level input: every buy x rent pair becomes a row
+    assert len(compute_price_to_rent_ratio(buy, rent)) == 4
+
+    with pytest.raises(ValueError):
+        compute_price_to_rent_ratio(buy, rent, duplicates="raise")
+
+    result = compute_price_to_rent_ratio(buy, rent, duplicates="aggregate")
+    assert len(result) == 1
+    assert result.loc[0, "price_to_rent_ratio"] == 1000000 / (12 * 2000)
+
+
+def test_numpy_engine_matches_pandas():
+    df = pd.DataFrame({
+        "canton": pd.Categorical(["VD", "VD", "ZH", "GE", "ZH", None]),
+        "zip_code": [1003, 1000, 8001, 1200, 8001, 1000],
+        "price_chf": [2000, 1500, 3000, 4000, None, 1200],
+        "area_m2": [50, 30, 100, 80, 70, 40],
+    })
+
+    for function in (average_rent_per_m2_by_canton, rank_cantons_by_rent, rank_cantons_visual):
+        pd.testing.assert_frame_equal(function(df, engine="numpy"), function(df))
+
+    pd.testing.assert_frame_equal(
+        compute_price_to_rent_ratio(df, df, duplicates="aggregate", engine="numpy"),
+        compute_price_to_rent_ratio(df, df, duplicates="aggregate"),
+    )
+
+    with pytest.raises(ValueError):
+        average_rent_per_m2_by_canton(df, engine="polars")
@@ -0,0 +1,22 @@
+import subprocess
+import sys
+
+import realestateCH
+
+
+def test_core_functions_do_not_import_matplotlib():
+    code = (
+        "import sys; from realestateCH import clean_data, compute_rent_per_m2, load_data; "
+        "print('matplotlib' in sys.modules)"
+    )
+    out = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True)
+
+    assert out.stdout.strip() == "False"
+
+
+def test_lazy_exports_resolve():
+    from realestateCH.metrics import compute_rent_per_m2
+
+    assert realestateCH.compute_rent_per_m2 is compute_rent_per_m2
+    assert realestateCH.zipindex.N_ZIP_SLOTS == 10_000
+    assert "clean_data" in dir(realestateCH)
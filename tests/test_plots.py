@@ -1,4 +1,8 @@
 import pandas as pd
+import pytest
+
+pytest.importorskip("matplotlib")
+
 from realestateCH.plots import (
     plot_average_rent_per_canton,
     plot_price_to_rent_ratio_hist,
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from realestateCH.load import load_rent_data
+from realestateCH.quantiles import (
+    QuantileSketch,
+    group_quantiles,
+    median_by_canton,
+    median_by_zip,
+    sketch_csv,
+)
+
+
+def test_group_quantiles_exact_matches_pandas():
+    df = pd.DataFrame({
+        "canton": ["VD", "VD", "VD", "ZH", "ZH", "GE"],
+        "price_chf": [2000, 1500, np.nan, 3000, 1000, 2500],
+    })
+
+    result = group_quantiles(df, "canton", "price_chf", q=(0.25, 0.5))
+    expected = df.groupby("canton")["price_chf"].quantile([0.25, 0.5]).unstack()
+
+    assert result["canton"].tolist() == ["GE", "VD", "ZH"]
+    np.testing.assert_allclose(result["p25"], expected[0.25])
+    np.testing.assert_allclose(result["p50"], expected[0.5])
+
+
+def test_median_by_zip_on_real_data():
+    rent = load_rent_data()
+
+    result = median_by_zip(rent)
+    expected = rent.groupby(["zip", "canton"], observed=True)["price_chf"].median().reset_index()
+
+    assert result["zip"].tolist() == expected["zip"].tolist()
+    np.testing.assert_allclose(result["p50"], expected["price_chf"])
+
+
+def test_sketch_is_exact_for_small_groups():
+    df = pd.DataFrame({
+        "canton": ["VD", "VD", "VD", "ZH", "ZH", "GE"],
+        "price_chf": [2000, 1500, 1800, 3000, 1000, 2500],
+    })
+
+    exact = median_by_canton(df)
+    sketch = median_by_canton(df, method="sketch")
+
+    pd.testing.assert_frame_equal(sketch, exact)
+
+
+def test_sketch_merge_of_partitions_is_close_to_exact():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "canton": rng.choice(["BE", "VD", "ZH"], 30_000),
+        "price_chf": rng.lognormal(7.8, 0.4, 30_000),
+    })
+    left = QuantileSketch("canton", "price_chf").update(df.iloc[:12_000])
+    right = QuantileSketch("canton", "price_chf")
+    for start in range(12_000, 30_000, 4_000):
+        right.update(df.iloc[start:start + 4_000])
+
+    merged = left.merge(right)
+    approx = merged.quantiles((0.05, 0.5, 0.95)).set_index("canton")
+    exact = group_quantiles(df, "canton", "price_chf", (0.05, 0.5, 0.95)).set_index("canton")
+
+    assert merged.count().sum() == len(df)
+    assert len(merged.to_frame()) <= 3 * (200 + 1)
+    np.testing.assert_allclose(approx, exact, rtol=0.01)
+
+
+def test_sketch_save_and_load(tmp_path):
+    path = "data_raw/Total-Rent-WithCanton.csv"
+    sketch = sketch_csv(path, "canton", "price_chf", chunksize=5000)
+
+    sketch.save(tmp_path / "rent.sketch")
+    loaded = QuantileSketch.load(tmp_path / "rent.sketch")
+
+    pd.testing.assert_frame_equal(loaded.quantiles((0.5, 0.9)), sketch.quantiles((0.5, 0.9)))
+
+
+def test_quantiles_keep_key_dtypes_and_groups_without_values(tmp_path):
+    df = pd.DataFrame({
+        "canton": pd.Categorical(["VD", "VD", "ZH", "GE", "GE"], categories=["GE", "VD", "ZH"]),
+        "zip_code": np.array([1000, 1000, 8001, 1200, 1201], dtype=np.uint16),
+        "price_chf": [2000, 1500, 3000, np.nan, np.nan],
+    })
+
+    exact = group_quantiles(df, ["zip_code", "canton"], "price_chf")
+    assert exact["canton"].dtype == df["canton"].dtype
+    assert exact["zip_code"].dtype == df["zip_code"].dtype
+
+    # GE only has missing prices: listed with NaN, also after a save
+    sketch = QuantileSketch("canton", "price_chf").update(df)
+    sketch.save(tmp_path / "rent.sketch")
+    for result in (median_by_canton(df), sketch.quantiles(), QuantileSketch.load(tmp_path / "rent.sketch").quantiles()):
+        assert result["canton"].dtype == df["canton"].dtype
+        assert result["canton"].tolist() == ["GE", "VD", "ZH"]
+        assert np.isnan(result["p50"].iloc[0])
+        assert result["p50"].iloc[1:].tolist() == [1750.0, 3000.0]
+
+
+def test_quantiles_must_be_between_0_and_1():
+    df = pd.DataFrame({"canton": ["VD"], "price_chf": [2000.0]})
+
+    for q in [(1.5,), (-0.1,), (np.nan,)]:
+        with pytest.raises(ValueError):
+            group_quantiles(df, "canton", "price_chf", q=q)
+        with pytest.raises(ValueError):
+            QuantileSketch("canton", "price_chf").update(df).quantiles(q)
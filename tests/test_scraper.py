@@ -0,0 +1,161 @@
+import asyncio
+import contextlib
+import sys
+import types
+
+import pandas as pd
+import pytest
+
+from realestateCH import scraper
+from realestateCH.scraper_http import parse_result_page
+
+
+def test_clean_number_and_card_to_row():
+    card = {"href": "/louer/4000000001", "price": "CHF 1’250.–", "rooms": "3.5 pièces", "area": None}
+
+    assert scraper.card_to_row(1000, card) == [1000, "https://www.homegate.ch/louer/4000000001", "1250", "3.5", "N/A"]
+    assert scraper.clean_number("Prix sur demande") == "N/A"
+
+
+def test_register_market_needs_zip_placeholder():
+    with pytest.raises(ValueError):
+        scraper.register_market("office", "https://www.homegate.ch/louer/bureaux", "office_results.csv")
+
+
+def test_markets_recognise_no_results_in_every_language():
+    pages = [
+        "<p>Malheureusement, il n’y a aucun résultat</p>",
+        "<p>Leider keine Ergebnisse gefunden</p>",
+        "<p>La pagina richiesta non può essere visualizzata</p>",
+    ]
+
+    for market in ("rent", "buy"):
+        for html in pages:
+            page = parse_result_page(html, scraper.MARKETS[market]["listing_path"], scraper.MARKETS[market]["empty_texts"])
+            assert page["cards"] == []
+
+
+def test_run_scrapes_each_zip_once_and_resumes(tmp_path, monkeypatch):
+    @contextlib.asynccontextmanager
+    async def fake_playwright():
+        yield None
+
+    class FakePool:
+        def __init__(self, playwright, size):
+            pass
+
+        async def start(self):
+            pass
+
+        async def close(self):
+            pass
+
+    visits = []
+
+    async def fake_scrape_zip(zip_code, pool, markets, fetcher=None, trace=None):
+        visits.append((zip_code, tuple(markets)))
+        if zip_code == 1001 and "rent" in markets:
+            return {"rent": [[zip_code, "https://www.homegate.ch/louer/1", "1500", "2", "40"]], "buy": None}
+        return {m: [[zip_code, f"https://www.homegate.ch/{m}/{zip_code}", "1", "1", "1"]] for m in markets}
+
+    api = types.ModuleType("playwright.async_api")
+    api.async_playwright = fake_playwright
+    monkeypatch.setitem(sys.modules, "playwright", types.ModuleType("playwright"))
+    monkeypatch.setitem(sys.modules, "playwright.async_api", api)
+    monkeypatch.setattr(scraper, "BrowserPool", FakePool)
+    monkeypatch.setattr(scraper, "scrape_zip", fake_scrape_zip)
+
+    written = asyncio.run(scraper.run(["rent", "buy"], [1000, 1001], output_dir=tmp_path))
+
+    assert written == {"rent": 2, "buy": 1}
+    assert visits == [(1000, ("rent", "buy")), (1001, ("rent", "buy"))]
+
+    # Buy failed to load for 1001: only that market is scraped again
+    written = asyncio.run(scraper.run(["rent", "buy"], [1000, 1001], output_dir=tmp_path, resume=True))
+
+    assert written == {"rent": 0, "buy": 1}
+    assert visits[2:] == [(1001, ("buy",))]
+    buy = pd.read_csv(tmp_path / "buy_results.csv")
+    assert buy["zip"].tolist() == [1000, 1001]
+    assert list(buy.columns) == ["zip", "url", "price_chf", "rooms", "area_m2"]
+
+
+def test_browser_pool_survives_failed_launches(tmp_path):
+    class FakeBrowser:
+        def is_connected(self):
+            return True
+
+        async def new_context(self, storage_state=None):
+            context = types.SimpleNamespace(new_page=None, close=None)
+
+            async def new_page():
+                return "page"
+
+            async def close():
+                pass
+
+            context.new_page, context.close = new_page, close
+            return context
+
+        async def close(self):
+            pass
+
+    launches = []
+
+    async def launch(headless=True):
+        launches.append(headless)
+        if len(launches) in (2, 3):
+            raise RuntimeError("browser crashed on start")
+        return FakeBrowser()
+
+    playwright = types.SimpleNamespace(chromium=types.SimpleNamespace(launch=launch))
+
+    async def main():
+        pool = scraper.BrowserPool(playwright, size=1, max_uses=1, cookie_state_file=str(tmp_path / "cookies.json"))
+        # The browser is replaced after one use, and its relaunch fails
+        async with pool.page() as page:
+            assert page == "page"
+        # The slot is kept: the next page launches a browser again
+        with pytest.raises(RuntimeError):
+            async with pool.page():
+                pass
+        async with pool.page() as page:
+            assert page == "page"
+
+    asyncio.run(asyncio.wait_for(main(), 5))
+    assert len(launches) == 5
+
+
+def test_scrape_zip_turns_browser_errors_into_failures(monkeypatch):
+    class FakePage:
+        async def goto(self, url, timeout=None):
+            pass
+
+        async def wait_for_selector(self, selector, timeout=None):
+            pass
+
+        async def evaluate(self, script, arg=None):
+            raise RuntimeError("Target page, context or browser has been closed")
+
+    class FakePool:
+        cookies_saved = True
+
+        def __init__(self, error=None):
+            self.error = error
+
+        @contextlib.asynccontextmanager
+        async def page(self, trace=None):
+            if self.error is not None:
+                raise self.error
+            yield FakePage()
+
+    monkeypatch.setattr(scraper, "backoff_delay", lambda attempt: 0)
+
+    results = asyncio.run(scraper.scrape_zip(1000, FakePool(), ["rent", "buy"]))
+    assert {m: e.kind for m, e in results.items()} == {"rent": "navigation", "buy": "navigation"}
+    assert "closed" in str(results["rent"])
+
+    # A browser that cannot be launched fails every browser market
+    results = asyncio.run(scraper.scrape_zip(1000, FakePool(RuntimeError("launch failed")), ["rent", "buy"]))
+    assert all(isinstance(e, scraper.ScrapeError) and e.kind == "navigation" for e in results.values())
+    assert list(results) == ["rent", "buy"]
@@ -0,0 +1,182 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from realestateCH import scraper, scraper_throttle
+from realestateCH.scraper_http import FastPathError, HttpFetcher, fetch_result_pages, parse_result_page
+from realestateCH.scraper_telemetry import read_telemetry
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def test_parse_embedded_state_skips_fallback_results():
+    html = (FIXTURES / "homegate_state_page.html").read_text(encoding="utf-8")
+
+    page = parse_result_page(html, "/louer/")
+
+    rows = [scraper.card_to_row(1000, card) for card in page["cards"]]
+    assert rows == [
+        [1000, "https://www.homegate.ch/louer/4000000001", "2150", "3.5", "82"],
+        [1000, "https://www.homegate.ch/louer/4000000002", "1400", "2", "N/A"],
+    ]
+    assert page["last_page"] == 2
+
+
+def test_parse_result_list_html():
+    html = (FIXTURES / "homegate_cards_page.html").read_text(encoding="utf-8")
+
+    page = parse_result_page(html, "/acheter/")
+
+    rows = [scraper.card_to_row(1000, card) for card in page["cards"]]
+    assert rows == [
+        [1000, "https://www.homegate.ch/acheter/4002635527", "1250000", "4.5", "120"],
+        [1000, "https://www.homegate.ch/acheter/4002451968", "N/A", "9.5", "N/A"],
+    ]
+    assert page["last_page"] == 3
+
+
+def test_unreadable_page_raises():
+    with pytest.raises(FastPathError):
+        parse_result_page("<html><body>Please verify you are a human</body></html>", "/louer/")
+
+    page = parse_result_page("<p>Malheureusement, il n’y a aucun résultat</p>", "/acheter/", ["aucun résultat"])
+    assert page["cards"] == []
+
+
+def test_unrecognised_page_state_is_not_an_empty_result():
+    state = '{"searchPage": {"items": [{"uid": "4000000001", "price": 2150}], "pageCount": 1}}'
+    html = f"<script>window.__INITIAL_STATE__ = {state};</script>"
+
+    with pytest.raises(FastPathError) as error:
+        parse_result_page(html, "/louer/")
+    assert error.value.kind == "empty"
+
+    # The result list in the HTML is read instead
+    cards = (FIXTURES / "homegate_cards_page.html").read_text(encoding="utf-8")
+    page = parse_result_page(cards.replace("<body>", f"<body><script>window.__INITIAL_STATE__ = {state};</script>", 1), "/acheter/")
+    assert len(page["cards"]) == 2
+
+    # A state whose result list is empty is a search without results
+    page = parse_result_page('<script>window.__INITIAL_STATE__ = {"result": {"listings": []}};</script>', "/louer/")
+    assert page["cards"] == []
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serves the fixtures as homegate result pages: zip 1000 has two
+    pages, zip 1001 one, zip 1002 is blocked and zip 1003 throttled.
+    With 'close' in the query, the connection is closed after the response
+    without telling the client, as an idle keep-alive connection would be."""
+
+    protocol_version = "HTTP/1.1"  # Keep-alive
+
+    def do_GET(self):
+        self.close_connection = "close" in self.path
+        for zip_code, status in (("npa-1002", 403), ("npa-1003", 429)):
+            if zip_code in self.path:
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+        if "gzip" in self.path:
+            self.send_response(200)
+            self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", "7")
+            self.end_headers()
+            self.wfile.write(b"garbage")
+            return
+        if "npa-1000" in self.path and "ep=2" not in self.path:
+            body = (FIXTURES / "homegate_state_page.html").read_bytes()
+        elif "npa-1000" in self.path:
+            body = b'<div data-test="result-list"><div data-test="result-list-item">' \
+                   b'<a class="HgCardElevated_content_900d9" href="/louer/4000000003">' \
+                   b'<span class="price">CHF 1800.-</span></a></div></div>'
+        else:
+            body = b'<div data-test="result-list"></div>'
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetcher_reuses_connections(stub_server):
+    fetcher = HttpFetcher(size=2)
+    try:
+        for _ in range(3):
+            status, html = fetcher.fetch(stub_server + "/npa-1001")
+            assert status == 200
+        assert sum(len(conns) for conns in fetcher._idle.values()) == 1
+    finally:
+        fetcher.close()
+
+
+def test_fetcher_retries_a_connection_closed_while_idle(stub_server):
+    fetcher = HttpFetcher(size=1)
+    try:
+        assert fetcher.fetch(stub_server + "/npa-1001?close")[0] == 200
+        # The pooled connection was closed by the server: sent again on a new one
+        assert fetcher.fetch(stub_server + "/npa-1001")[0] == 200
+    finally:
+        fetcher.close()
+
+
+def test_fetcher_closes_connections_it_cannot_read(stub_server):
+    fetcher = HttpFetcher(size=1)
+    try:
+        with pytest.raises(FastPathError, match="unreadable response body"):
+            fetcher.fetch(stub_server + "/npa-1001?gzip")
+        assert sum(len(conns) for conns in fetcher._idle.values()) == 0
+    finally:
+        fetcher.close()
+
+
+def test_throttled_first_page_has_its_own_kind(stub_server):
+    fetcher = HttpFetcher(size=1)
+    try:
+        with pytest.raises(FastPathError) as error:
+            asyncio.run(fetch_result_pages(fetcher, stub_server + "/npa-1003", "/louer/"))
+        assert error.value.kind == "throttled"
+        with pytest.raises(FastPathError) as error:
+            asyncio.run(fetch_result_pages(fetcher, stub_server + "/npa-1002", "/louer/"))
+        assert error.value.kind == "navigation"
+    finally:
+        fetcher.close()
+
+
+def test_http_mode_against_stub_server(stub_server, tmp_path, monkeypatch):
+    monkeypatch.setattr(scraper_throttle, "RETRY_BASE_DELAY", 0.01)
+    monkeypatch.setitem(scraper.MARKETS, "stub", None)
+    scraper.register_market("stub", stub_server + "/npa-{ZIP}/liste-annonces", "stub_results.csv", listing_path="/louer/")
+
+    written = asyncio.run(scraper.run(["stub"], [1000, 1001, 1002], output_dir=tmp_path, mode="http",
+                                      telemetry=tmp_path / "run.jsonl"))
+
+    assert written == {"stub": 3}
+    result = pd.read_csv(tmp_path / "stub_results.csv")
+    assert result["url"].str.rsplit("/", n=1).str[-1].tolist() == ["4000000001", "4000000002", "4000000003"]
+    # The blocked zip code is left for a resumed run (or the browser)
+    assert sorted((tmp_path / "stub_results.checkpoint").read_text().split()) == ["1000", "1001"]
+
+    records = read_telemetry(tmp_path / "run.jsonl")
+    by_zip = {r["zip"]: r for r in records}
+    assert by_zip[1000]["listings"] == {"stub": 3} and by_zip[1000]["outcome"] == "ok"
+    assert set(by_zip[1000]["phases"]) == {"fetch", "extract"}
+    assert [r["attempt"] for r in records if r["zip"] == 1002] == [0, 1, 2]
+    assert by_zip[1002]["failures"] == {"stub": "navigation"}
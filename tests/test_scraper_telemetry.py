@@ -0,0 +1,58 @@
+import time
+
+import pytest
+
+from realestateCH.scraper_telemetry import ZipTrace, format_report, summarize_telemetry
+
+
+def test_trace_adds_up_phases():
+    trace = ZipTrace(1000, ["rent", "buy"])
+    for _ in range(2):
+        with trace.phase("goto"):
+            time.sleep(0.01)
+    trace.listings = {"rent": 3, "buy": 0}
+    trace.failures = {"buy": "empty"}
+
+    record = trace.to_record(concurrency=8)
+
+    assert record["phases"]["goto"] >= 0.02
+    assert record["duration"] >= record["phases"]["goto"]
+    assert record["outcome"] == "empty"
+    assert record["concurrency"] == 8
+
+
+def test_trace_outcome_is_the_most_severe_failure():
+    trace = ZipTrace(1000, ["rent", "buy"])
+
+    trace.failures = {"rent": "empty", "buy": "timeout"}
+    assert trace.to_record()["outcome"] == "timeout"
+    trace.failures = {"rent": "navigation", "buy": "throttled"}
+    assert trace.to_record()["outcome"] == "throttled"
+
+
+def test_summary_of_a_run():
+    records = [
+        {"zip": 1000 + i, "attempt": 0, "started": 100.0 + i, "duration": float(i + 1),
+         "phases": {"goto": i * 0.5, "extract": 0.1}, "listings": {"rent": 2}, "outcome": "ok"}
+        for i in range(100)
+    ]
+    records[0]["attempt"] = 1
+    # 1000 failed once before succeeding, 1100 never did
+    records.insert(0, {"zip": 1000, "attempt": 0, "started": 99.0, "duration": 1.0,
+                       "phases": {}, "listings": {}, "outcome": "timeout"})
+    records.append({"zip": 1100, "attempt": 0, "started": 150.0, "duration": 0.5,
+                    "phases": {}, "listings": {}, "outcome": "navigation"})
+
+    summary = summarize_telemetry(records, n_slowest=3)
+
+    assert summary["attempts"] == 102 and summary["zip_codes"] == 101
+    assert summary["outcomes"] == {"ok": 100, "navigation": 1}
+    assert summary["retried"] == 1
+    assert summary["listings"] == {"rent": 200}
+    assert summary["latency"]["p50"] == pytest.approx(50, abs=1)
+    assert summary["latency"]["p99"] > summary["latency"]["p95"] > summary["latency"]["p50"]
+    assert summary["phases"]["extract"]["total"] == pytest.approx(10.0)
+    # 100 zip codes done between t=99 and t=299
+    assert summary["zips_per_minute"] == pytest.approx(30.0)
+    assert [r["zip"] for r in summary["slowest"]] == [1099, 1098, 1097]
+    assert "zip codes/min" in format_report(summary)
@@ -0,0 +1,144 @@
+import asyncio
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+from realestateCH import scraper, scraper_throttle
+from realestateCH.scraper_throttle import (
+    EMPTY,
+    NAVIGATION,
+    THROTTLED,
+    TIMEOUT,
+    AdaptiveLimiter,
+    ScrapeError,
+    backoff_delay,
+    classify_exception,
+)
+
+
+def test_failure_classes_and_backoff():
+    class TimeoutError(Exception):  # Same name as Playwright's
+        pass
+
+    assert classify_exception(asyncio.TimeoutError()) == TIMEOUT
+    assert classify_exception(TimeoutError("page.goto: Timeout 60000ms exceeded")) == TIMEOUT
+    assert classify_exception(RuntimeError("net::ERR_CONNECTION_RESET")) == NAVIGATION
+    assert classify_exception(ScrapeError("bot check", EMPTY)) == EMPTY
+    with pytest.raises(ValueError):
+        ScrapeError("?", "blocked")
+
+    rng = random.Random(0)
+    delays = [backoff_delay(attempt, base=1.0, cap=10.0, rng=rng) for attempt in range(8) for _ in range(50)]
+    assert all(0 <= d <= min(10.0, 2 ** (i // 50)) for i, d in enumerate(delays))
+    assert max(delays[:50]) < 1.0 < max(delays[-50:])
+
+
+def test_limiter_adjusts_to_failures_and_latency():
+    limiter = AdaptiveLimiter(8, maximum=10, window=4)
+
+    for _ in range(8):
+        limiter.record(1.0)
+    assert limiter.limit == 10  # +1 per healthy window, up to the maximum
+
+    for kind in [None, None, TIMEOUT, None]:
+        limiter.record(1.0, kind)
+    assert limiter.limit == 5
+
+    # The site slows down: median latency above twice the best one
+    for _ in range(4):
+        limiter.record(2.5)
+    assert limiter.limit == 2
+    for _ in range(8):
+        limiter.record(2.5, NAVIGATION)
+    assert limiter.limit == 1
+    assert limiter.counts == {"ok": 15, TIMEOUT: 1, NAVIGATION: 8, THROTTLED: 0, EMPTY: 0}
+
+
+def test_limiter_cuts_at_once_when_throttled():
+    limiter = AdaptiveLimiter(8, window=4)
+
+    limiter.record(1.0)
+    assert limiter.record(1.0, THROTTLED) == 4
+    assert limiter.record(1.0, THROTTLED) == 2
+    assert limiter.counts[THROTTLED] == 2
+
+
+def test_limiter_caps_zips_in_flight():
+    limiter = AdaptiveLimiter(3, maximum=3)
+    peak = 0
+
+    async def task():
+        nonlocal peak
+        async with limiter.slot():
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.001)
+
+    async def main():
+        await asyncio.gather(*[task() for _ in range(20)])
+
+    asyncio.run(main())
+    assert peak == 3
+    assert limiter.in_flight == 0
+
+
+class ThrottlingHandler(BaseHTTPRequestHandler):
+    """Stand-in for the site: refuses requests (HTTP 429) when more than
+    two are in flight."""
+
+    protocol_version = "HTTP/1.1"
+    lock = threading.Lock()
+    in_flight = 0
+    refused = 0
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight += 1
+            throttled = cls.in_flight > 2
+            cls.refused += throttled
+        try:
+            time.sleep(0.02)
+            if throttled:
+                body, status = b"Too many requests", 429
+            else:
+                zip_code = self.path.split("npa-")[1].split("/")[0]
+                body = (f'<div data-test="result-list"><div data-test="result-list-item">'
+                        f'<a class="HgCardElevated_content_900d9" href="/louer/4{zip_code}">'
+                        f'<span class="price">CHF 1500.-</span></a></div></div>').encode()
+                status = 200
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+def test_run_backs_off_a_throttling_server(tmp_path, monkeypatch, capsys):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ThrottlingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(scraper_throttle, "RETRY_BASE_DELAY", 0.01)
+    monkeypatch.setitem(scraper.MARKETS, "stub", None)
+    url = f"http://127.0.0.1:{server.server_address[1]}/npa-{{ZIP}}/liste"
+    scraper.register_market("stub", url, "stub_results.csv", listing_path="/louer/")
+    zip_codes = list(range(1000, 1040))
+
+    try:
+        written = asyncio.run(scraper.run(["stub"], zip_codes, output_dir=tmp_path, mode="http",
+                                          concurrency=8, retries=8))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert written == {"stub": len(zip_codes)}
+    assert sorted(pd.read_csv(tmp_path / "stub_results.csv")["zip"]) == zip_codes
+    assert ThrottlingHandler.refused > 0
+    assert "Concurrency 8 -> 4" in capsys.readouterr().out
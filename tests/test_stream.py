@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+from realestateCH.clean import clean_data
+from realestateCH.load import load_data
+from realestateCH.metrics import average_rent_per_m2_by_canton, rank_cantons_by_rent
+from realestateCH.schema import LISTING_DTYPES
+from realestateCH.stream import (
+    iter_clean_chunks,
+    stream_average_price_by_zip,
+    stream_average_rent_per_m2_by_canton,
+    stream_rank_cantons_by_rent,
+)
+
+
+def write_listings(path):
+    pd.DataFrame({
+        "zip": [1000, 1000, 8001, 1000, 8001, 1200],
+        "url": ["a", "b", "c", "a", "d", "e"],
+        "price_chf": [2000, 1500, 3000, 2000, 4000, 2500],
+        "rooms": [2.5, 1.5, 3.5, 2.5, 4.5, 3.0],
+        "area_m2": [50, 30, 100, 50, None, 60],
+        "canton": ["VD", "VD", "ZH", "VD", "ZH", "GE"],
+    }).to_csv(path, index=False)
+
+
+def test_iter_clean_chunks_drops_duplicates_across_chunks(tmp_path):
+    path = tmp_path / "rent.csv"
+    write_listings(path)
+
+    streamed = pd.concat(iter_clean_chunks(path, chunksize=2))
+    expected = clean_data(load_data(path, dtype=LISTING_DTYPES, cache=False))
+
+    # Row 3 repeats row 0 in another chunk, row 4 has no area
+    assert streamed.index.tolist() == [0, 1, 2, 5]
+    pd.testing.assert_frame_equal(streamed, expected)
+
+
+def test_stream_rank_cantons_by_rent_matches_in_memory(tmp_path):
+    path = tmp_path / "rent.csv"
+    write_listings(path)
+    in_memory = clean_data(load_data(path, dtype=LISTING_DTYPES, cache=False))
+
+    streamed = stream_rank_cantons_by_rent(path, chunksize=2)
+    expected = rank_cantons_by_rent(in_memory)
+
+    assert streamed["canton"].tolist() == expected["canton"].tolist() == ["VD", "GE", "ZH"]
+    assert (streamed["avg_rent_per_m2"] - expected["avg_rent_per_m2"]).abs().max() < 1e-9
+
+
+def test_stream_average_rent_per_m2_by_canton_on_real_data():
+    path = "data_raw/Total-Rent-WithCanton.csv"
+
+    streamed = stream_average_rent_per_m2_by_canton(path, chunksize=5000)
+    expected = average_rent_per_m2_by_canton(clean_data(load_data(path, dtype=LISTING_DTYPES)))
+
+    assert streamed["canton"].tolist() == expected["canton"].tolist()
+    np.testing.assert_allclose(streamed["avg_rent_per_m2"], expected["avg_rent_per_m2"], rtol=0, atol=1e-9)
+
+
+def test_stream_average_price_by_zip(tmp_path):
+    path = tmp_path / "rent.csv"
+    write_listings(path)
+
+    result = stream_average_price_by_zip(path, chunksize=2)
+    prices = dict(zip(result["zip_code"], result["price_chf"]))
+
+    assert list(result.columns) == ["zip_code", "canton", "price_chf"]
+    assert prices == {1000: 1750.0, 1200: 2500.0, 8001: 3000.0}
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+from realestateCH.metrics import compute_price_to_rent_ratio
+from realestateCH.zipindex import ZipIndex, price_to_rent_ratio_by_zip
+
+
+def sample_markets():
+    buy = pd.DataFrame({
+        "zip": [1000, 1000, 1003, 8001, 8001, 1200],
+        "price_chf": [900000, 1100000, 750000, 1500000, np.nan, 1200000],
+        "canton": ["VD", "VD", "VD", "ZH", "ZH", "GE"],
+    })
+    rent = pd.DataFrame({
+        "zip": [1000, 1000, 8001, 1200, 3000],
+        "price_chf": [1500, 2500, 3000, 2000, 1800],
+        "canton": ["VD", "VD", "ZH", "VD", "BE"],
+    })
+    return buy, rent
+
+
+def test_zip_index_aggregates_per_zip():
+    buy, _ = sample_markets()
+
+    index = ZipIndex.from_listings(buy)
+
+    assert index.zip_codes().tolist() == [1000, 1003, 1200, 8001]
+    assert index.rows[8001] == 2
+    assert index.price_count[8001] == 1
+    assert index.mean_price[1000] == 1000000
+    assert np.isnan(index.mean_price[1001])
+
+
+def test_ratio_by_zip_matches_merge_of_means():
+    buy, rent = sample_markets()
+
+    result = price_to_rent_ratio_by_zip(buy, rent)
+
+    means = [
+        df.rename(columns={"zip": "zip_code"}).groupby(["zip_code", "canton"])["price_chf"].mean().reset_index()
+        for df in (buy, rent)
+    ]
+    expected = compute_price_to_rent_ratio(*means)
+    # 1200 is in GE for buy but in VD for rent: no match, as with the merge
+    assert result["zip_code"].tolist() == expected["zip_code"].tolist() == [1000, 8001]
+    assert result["canton"].astype(str).tolist() == ["VD", "ZH"]
+    np.testing.assert_allclose(result["price_to_rent_ratio"], expected["price_to_rent_ratio"])
+
+
+def test_ratio_by_zip_skips_missing_and_multi_canton_zips():
+    buy, rent = sample_markets()
+    # A listing without zip code, and 1000 also listed in FR on both sides
+    buy = pd.concat([buy, pd.DataFrame({"zip": [np.nan, 1000], "price_chf": [2e6, 8e5], "canton": ["BE", "FR"]})])
+    rent = pd.concat([rent, pd.DataFrame({"zip": [np.nan, 1000], "price_chf": [900, 1200], "canton": ["BE", "FR"]})])
+    assert buy["zip"].dtype == np.float64
+
+    result = price_to_rent_ratio_by_zip(buy, rent)
+
+    means = [
+        df.rename(columns={"zip": "zip_code"}).groupby(["zip_code", "canton"])["price_chf"].mean().reset_index()
+        for df in (buy, rent)
+    ]
+    expected = compute_price_to_rent_ratio(*means)
+    # The merge keeps 1000 once per canton; the zip index leaves it out
+    assert expected["zip_code"].tolist() == [1000, 1000, 8001]
+    assert result["zip_code"].tolist() == [8001]
+    np.testing.assert_allclose(result["price_to_rent_ratio"], expected["price_to_rent_ratio"].iloc[[2]])
+    assert ZipIndex.from_listings(buy).rows.sum() == len(buy) - 1